@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Crawl benchmark for the broken link checker.
+
+Serves a deterministic synthetic website from local HTTP servers (one for
+the site itself plus stand-ins for external hosts), runs crawl_website
+against it and saves the run's numbers as JSON so crawls can be compared
+across commits:
+
+    python benchmark.py --pages 2000 --engine async --output after.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.request import urlopen
+
+from broken_link_checker import BrokenLinkChecker
+
+# Site shape used unless overridden on the command line
+DEFAULT_SITE = {
+    "pages": 500,
+    "links_per_page": 20,
+    "broken_ratio": 0.05,
+    "external_ratio": 0.2,
+    "external_hosts": 5,
+    "redirect_ratio": 0.05,
+    "redirect_hops": 2,
+    "latency_ms": 5.0,
+    "latency_jitter": 0.5,
+    "slow_hosts": 1,
+    "slow_latency_ms": 200.0,
+    "head_rejecting_hosts": 1,
+    "page_bytes": 4096,
+    "seed": 1,
+}
+
+
+class SyntheticSite:
+    """Deterministic site layout: the same settings always give the same pages and links.
+
+    The site has pages /page/0 .. /page/N-1 (each linking to the next, so all
+    are reachable), broken links to /missing/K, redirect chains
+    /redirect/HOPS/K ending at /page/K, one stylesheet per page, and links
+    to external hosts serving /ok/K and /gone/K. The first slow_hosts
+    external hosts add slow_latency_ms to every response and the next
+    head_rejecting_hosts answer HEAD with 405.
+    """
+
+    def __init__(self, settings: Dict):
+        self.settings = settings
+        self.base_url = ''
+        self.external_urls: List[str] = []
+
+    def page_links(self, page: int) -> List[Tuple[str, str]]:
+        """(tag, url) pairs for a page's links."""
+        s = self.settings
+        rng = random.Random(f"{s['seed']}:{page}")
+        links = [('a', f"{self.base_url}/page/{(page + 1) % s['pages']}"),
+                 ('link', f"{self.base_url}/asset/{page % 10}.css")]
+        for _ in range(s['links_per_page']):
+            target = rng.randrange(s['pages'])
+            roll = rng.random()
+            if roll < s['broken_ratio']:
+                links.append(('a', f"{self.base_url}/missing/{target}"))
+            elif roll < s['broken_ratio'] + s['external_ratio'] and self.external_urls:
+                host = self.external_urls[rng.randrange(len(self.external_urls))]
+                path = 'gone' if rng.random() < s['broken_ratio'] else 'ok'
+                links.append(('a', f"{host}/{path}/{target}"))
+            elif roll < s['broken_ratio'] + s['external_ratio'] + s['redirect_ratio']:
+                links.append(('a', f"{self.base_url}/redirect/{s['redirect_hops']}/{target}"))
+            else:
+                links.append(('a', f"{self.base_url}/page/{target}"))
+        return links
+
+    def page_html(self, page: int) -> str:
+        parts = [f"<html><head><title>Page {page}</title>"]
+        body = []
+        for number, (tag, url) in enumerate(self.page_links(page)):
+            if tag == 'link':
+                parts.append(f'<link rel="stylesheet" href="{url}">')
+            else:
+                body.append(f'<p><a href="{url}">Link {number}</a></p>')
+        filler = 'x' * max(0, self.settings['page_bytes'] - sum(len(line) for line in body))
+        parts.append(f"</head><body><h1>Page {page}</h1>{''.join(body)}<p>{filler}</p></body></html>")
+        return ''.join(parts)
+
+    def latency(self, path: str, slow: bool) -> float:
+        """Seconds to wait before answering; log-normal around latency_ms, fixed per path."""
+        s = self.settings
+        seconds = s['latency_ms'] / 1000 * random.Random(f"{s['seed']}:{path}").lognormvariate(0, s['latency_jitter'])
+        if slow:
+            seconds += s['slow_latency_ms'] / 1000
+        return seconds
+
+
+class RequestStats:
+    """Requests and body bytes served, shared by all of the benchmark's servers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.bytes = 0
+
+    def record(self, method: str, url: str, nbytes: int):
+        with self.lock:
+            key = f"{method} {url}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes += nbytes
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {'requests': dict(self.requests), 'bytes': self.bytes}
+
+
+def make_handler(site: SyntheticSite, stats: RequestStats, host_index: int):
+    """Request handler for the site itself (host_index -1) or external host host_index."""
+    settings = site.settings
+    slow = 0 <= host_index < settings['slow_hosts']
+    rejects_head = settings['slow_hosts'] <= host_index < settings['slow_hosts'] + settings['head_rejecting_hosts']
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, as real servers do
+
+        def log_message(self, format, *args):
+            pass
+
+        def respond(self, status: int, body: bytes = b'', content_type: str = 'text/html', headers: Dict = None):
+            send_body = self.command != 'HEAD'
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            stats.record(self.command, f"{self.headers.get('Host')}{self.path}", len(body) if send_body else 0)
+
+        def do_GET(self):
+            if self.path == '/__stats':
+                body = json.dumps(stats.to_dict()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            time.sleep(site.latency(self.path, slow))
+            parts = self.path.strip('/').split('/')
+            if host_index >= 0:
+                if self.command == 'HEAD' and rejects_head:
+                    self.respond(405)
+                elif len(parts) == 2 and parts[0] == 'ok':
+                    self.respond(200, b'<html><body>External page</body></html>')
+                else:
+                    self.respond(404, b'Not found')
+            elif parts == [''] or (len(parts) == 2 and parts[0] == 'page' and int(parts[1]) < settings['pages']):
+                page = int(parts[1]) if parts != [''] else 0
+                self.respond(200, site.page_html(page).encode())
+            elif len(parts) == 2 and parts[0] == 'asset':
+                self.respond(200, b'body { color: #333; }', 'text/css')
+            elif len(parts) == 3 and parts[0] == 'redirect':
+                hops = int(parts[1])
+                location = f"/redirect/{hops - 1}/{parts[2]}" if hops > 1 else f"/page/{parts[2]}"
+                self.respond(301, headers={'Location': location})
+            else:
+                self.respond(404, b'Not found')
+
+        do_HEAD = do_GET
+
+    return Handler
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections (e.g. after reading only headers) is normal
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve_site(settings: Dict, ports: multiprocessing.Queue):
+    """Server process: bind the site and external hosts on free ports and serve forever."""
+    site = SyntheticSite(settings)
+    stats = RequestStats()
+    servers = [SiteServer(('127.0.0.1', 0), None) for _ in range(settings['external_hosts'] + 1)]
+    site.base_url = f"http://127.0.0.1:{servers[0].server_address[1]}"
+    site.external_urls = [f"http://127.0.0.1:{server.server_address[1]}" for server in servers[1:]]
+    for host_index, server in enumerate(servers, -1):
+        server.RequestHandlerClass = make_handler(site, stats, host_index)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    ports.put(site.base_url)
+    threading.Event().wait()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(settings: Dict, checker_config: Dict) -> Dict:
+    """Crawl a fresh synthetic site and return the benchmark result."""
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_site, args=(settings, ports), daemon=True)
+    server.start()
+    base_url = ports.get(timeout=30)
+
+    config = {
+        "start_url": f"{base_url}/",
+        "delay_between_requests": 0,
+        "timeout": 30,
+        "cache": {"enabled": False},
+        "email": {"enabled": False},
+        **checker_config,
+    }
+    workdir = tempfile.mkdtemp(prefix='link_checker_bench_')
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with open('config.json', 'w') as f:
+            json.dump(config, f)
+        checker = BrokenLinkChecker('config.json')
+        try:
+            checker.console.setLevel(logging.WARNING)
+            rss_before = peak_rss_mb()
+            started = time.perf_counter()
+            checker.crawl_website()
+            wall_seconds = time.perf_counter() - started
+            broken_links = len(checker.broken_links)
+            pages_crawled = checker.pages_crawled
+        finally:
+            # The session and the DNS cache's socket.getaddrinfo patch must not outlive the iteration
+            checker.close()
+
+        with urlopen(f"{base_url}/__stats") as response:
+            stats = json.load(response)
+    finally:
+        os.chdir(previous_dir)
+        server.terminate()
+
+    requests_by_method: Dict[str, int] = {}
+    urls = set()
+    for key, count in stats['requests'].items():
+        method, url = key.split(' ', 1)
+        requests_by_method[method] = requests_by_method.get(method, 0) + count
+        urls.add(url)
+    total_requests = sum(requests_by_method.values())
+
+    return {
+        'commit': current_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'site': settings,
+        'checker_config': checker_config,
+        'results': {
+            'wall_seconds': round(wall_seconds, 3),
+            'pages_crawled': pages_crawled,
+            'pages_per_second': round(pages_crawled / wall_seconds, 2),
+            'requests': total_requests,
+            'requests_by_method': requests_by_method,
+            # Every request after the first for the same URL, whatever the method
+            'redundant_requests': total_requests - len(urls),
+            'bytes_downloaded': stats['bytes'],
+            'broken_links_found': broken_links,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_rss_before_crawl_mb': rss_before,
+        },
+    }
+
+
+def compare(baseline_file: str, candidate_file: str):
+    """Print how each result changed between two saved benchmark runs."""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    with open(candidate_file) as f:
+        candidate = json.load(f)
+    print(f"Baseline:  {baseline_file} ({baseline.get('commit')})")
+    print(f"Candidate: {candidate_file} ({candidate.get('commit')})")
+    if baseline['site'] != candidate['site']:
+        print("⚠️  The runs used different site settings")
+    for name, before in baseline['results'].items():
+        after = candidate['results'].get(name)
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"   • {name}: {before} → {after} ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the link checker against a synthetic local site')
+    for name, default in DEFAULT_SITE.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default,
+                            help=f"Site setting (default: {default})")
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                       help='Crawl engine to benchmark')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=JSON',
+                       help='Override a checker config setting, e.g. --set parse_workers=2')
+    parser.add_argument('--output', help='Result file (default: benchmark_<commit>_<engine>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                       help='Compare two saved results instead of running a benchmark')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    settings = {name: getattr(args, name) for name in DEFAULT_SITE}
+    checker_config = {'engine': args.engine}
+    for override in args.set:
+        key, _, value = override.partition('=')
+        try:
+            checker_config[key] = json.loads(value)
+        except ValueError:
+            # Bare strings, e.g. --set extractor=lxml
+            checker_config[key] = value
+
+    print(f"🏁 Benchmarking {args.engine} engine on a {settings['pages']}-page synthetic site...")
+    result = run_benchmark(settings, checker_config)
+    for name, value in result['results'].items():
+        print(f"   • {name}: {value}")
+
+    output = args.output or f"benchmark_{result['commit'] or 'unknown'}_{args.engine}.json"
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved: {output}")
+
+
+if __name__ == "__main__":
+    main()
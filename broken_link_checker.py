@@ -25,56 +25,2617 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, urlunparse
-from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, urlunparse, urldefrag, unquote
+from datetime import datetime, timezone
 import logging
+import logging.handlers
+import queue
+import sys
 import argparse
 import json
 import os
-from typing import Set, List, Dict, Tuple
+import re
+import importlib
+import sqlite3
+import gzip
+import hashlib
+import heapq
+import math
+import tempfile
+import csv
+import cProfile
+from bisect import bisect_left
+from html import escape
+from itertools import chain, count, groupby
+from xml.etree import ElementTree
+from typing import Set, List, Dict, Tuple, Optional, Callable
 import concurrent.futures
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import multiprocessing
+import socket
+import ssl
+import asyncio
+import threading
+from fnmatch import fnmatch
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict, deque
+from requests.adapters import DEFAULT_POOLBLOCK, BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3 import PoolManager
+from urllib3.util.retry import RequestHistory, Retry
+
+try:
+    import aiohttp  # Only needed for the async engine
+except ImportError:
+    aiohttp = None
+
+try:
+    import redis  # Only needed for distributed crawls with a Redis store
+except ImportError:
+    redis = None
+
+try:
+    import httpx  # Only needed for HTTP/2 (with the h2 package)
+except ImportError:
+    httpx = None
+
+def extract_links_bs4(html: str, base_url: str) -> Tuple[List[Dict[str, str]], Set[str]]:
+    """Extract links and anchor names with BeautifulSoup (the reference implementation).
+    
+    Every extractor returns (links, anchors), where anchors holds the id of
+    every element and the name of every <a>: the fragments that can be
+    linked to on the page. Links and anchors are collected in a single walk
+    over the tree, driven by LINK_ATTRIBUTES. Markup inside <textarea> and
+    <title> is text to a browser, so it is skipped.
+    
+    Known differences between the backends (tests/test_extractors.py checks
+    them against the fixtures in tests/fixtures/extractors):
+    - Nested and unclosed <a> tags: html.parser (bs4, scanner) nests them, so
+      an outer link's text includes the inner one's; lxml and selectolax
+      close the outer link first, as browsers do, and its text stops there.
+      selectolax may also report an unclosed link twice where the browser's
+      recovery rules reopen it.
+    - <template> content: selectolax doesn't see links or ids in it. The
+      other backends report its links with no link text.
+    - Entity names without a ';' in attribute values: html.parser decodes
+      them (href="?a=1&copy=2" becomes "?a=1©=2"); lxml and selectolax
+      leave them alone, as browsers do.
+    """
+    soup = BeautifulSoup(html, 'html.parser', multi_valued_attributes=None)
+    tagged_links = []
+    anchors = set()
+    # Tags that html.parser parses inside <textarea>/<title>, where browsers see only text
+    text_only = {id(tag) for parent in soup.find_all(TEXT_ONLY_TAGS) for tag in parent.find_all(True)}
+    
+    for tag in soup.find_all(True):
+        if text_only and id(tag) in text_only:
+            continue
+        attrs = tag.attrs
+        if attrs.get('id'):
+            anchors.add(attrs['id'])
+        if tag.name == 'a' and attrs.get('name'):
+            anchors.add(attrs['name'])
+        if tag.name in LINK_ATTRIBUTES:
+            # Get the link text, handling nested tags
+            text = tag.get_text(strip=True) if tag.name == 'a' else ''
+            tagged_links.append((tag.name, make_links(tag.name, attrs, text, base_url)))
+    
+    return group_links(tagged_links), anchors
+
+
+# Link-bearing tags, in the order their links are reported:
+# tag -> ((attribute, link type, label for the link text), ...)
+LINK_ATTRIBUTES = {
+    'a': (('href', 'link', ''),),
+    'link': (('href', 'stylesheet', ''),),
+    'img': (('src', 'image', 'Image'), ('srcset', 'image', 'Image')),
+    'script': (('src', 'script', 'Script'),),
+    'iframe': (('src', 'iframe', 'Iframe'),),
+    'video': (('src', 'media', 'Video'), ('poster', 'image', 'Video poster')),
+    'audio': (('src', 'media', 'Audio'),),
+    'source': (('src', 'media', 'Source'), ('srcset', 'image', 'Source')),
+    'track': (('src', 'media', 'Track'),),
+    'meta': (('content', 'link', 'Meta refresh'),)
+}
+
+# CSS selector for the same tags, for selectolax; :is() matches each element once
+LINK_SELECTOR = ', '.join(
+    f"{tag_name}:is({', '.join(f'[{attribute}]' for attribute, _, _ in attributes)})"
+    for tag_name, attributes in LINK_ATTRIBUTES.items()
+)
+
+# "5; url=/next" in <meta http-equiv="refresh" content="...">
+META_REFRESH_URL = re.compile(r'^\s*[\d.]+(?![\d.])\s*[;,]?\s*(?:url\s*=\s*)?(["\']?)(.+?)\1\s*$', re.I)
+
+# One srcset candidate URL: everything up to the next whitespace
+SRCSET_URL = re.compile(r'[\s,]*(\S*)')
+
+
+def srcset_urls(srcset: str) -> List[str]:
+    """Candidate URLs of a srcset attribute, with their width/density descriptors dropped."""
+    urls = []
+    position = 0
+    while position < len(srcset):
+        match = SRCSET_URL.match(srcset, position)
+        url = match.group(1)
+        position = match.end()
+        if not url:
+            break
+        if url.endswith(','):
+            # "a.jpg, b.jpg 2x": no descriptors, the next candidate follows
+            url = url.rstrip(',')
+        else:
+            comma = srcset.find(',', position)
+            position = len(srcset) if comma == -1 else comma + 1
+        if url:
+            urls.append(url)
+    return urls
+
+
+def attribute_urls(tag_name: str, attribute: str, attrs: Dict[str, Optional[str]]) -> List[str]:
+    """The URLs held by one attribute of a link-bearing tag."""
+    value = attrs.get(attribute)
+    if not value:
+        return []
+    if attribute == 'srcset':
+        return srcset_urls(value)
+    if tag_name == 'meta':
+        if (attrs.get('http-equiv') or '').lower() != 'refresh':
+            return []
+        match = META_REFRESH_URL.match(value)
+        return [match.group(2)] if match else []
+    return [value]
+
+
+def make_links(tag_name: str, attrs: Dict[str, Optional[str]], text: str, base_url: str) -> List[Dict[str, str]]:
+    """Build the link dicts of one tag in LINK_ATTRIBUTES, the same for every extractor.
+    
+    Inline data: URLs are left out; there is nothing to fetch.
+    """
+    links = []
+    title = (attrs.get('title') or '')[:100]
+    for attribute, link_type, label in LINK_ATTRIBUTES[tag_name]:
+        for url in attribute_urls(tag_name, attribute, attrs):
+            if url.startswith('data:'):
+                continue
+            if tag_name == 'a':
+                link_text = (text or "[No text]")[:100]
+            elif tag_name == 'link':
+                rels = (attrs.get('rel') or '').split()
+                link_text = f"[{rels[0]} stylesheet]" if rels else "[stylesheet]"
+            elif tag_name == 'img' and attrs.get('alt'):
+                link_text = f"[IMG: {attrs['alt']}]"
+            elif tag_name == 'iframe' and title:
+                link_text = f"[Iframe: {title}]"
+            else:
+                link_text = f"[{label}]"
+            links.append({
+                'url': urljoin(base_url, url),
+                'text': link_text,
+                'title': '' if tag_name == 'link' else title,
+                'type': link_type
+            })
+    return links
+
+
+def anchor_fragment(url: str) -> str:
+    """Fragment of a link that should name an anchor, or '' if there is nothing to check.
+    
+    "#top" always works, and text fragments (#:~:text=) and client-side
+    routes (#/path, #!path) don't refer to anchors.
+    """
+    fragment = urldefrag(url)[1]
+    if fragment == 'top' or fragment.startswith((':~:', '/', '!')):
+        return ''
+    return fragment
+
+
+# url(...) and @import references in CSS; comments are matched first so their contents are skipped
+CSS_REFERENCE = re.compile(
+    r'/\*.*?\*/'
+    r'|@import\s+(?:url\(\s*(["\']?)(?P<import_url>.*?)\1\s*\)|(["\'])(?P<import>.*?)\3)'
+    r'|url\(\s*(["\']?)(?P<url>.*?)\5\s*\)',
+    re.S | re.I
+)
+
+
+def extract_css_links(css: str, base_url: str) -> List[Dict[str, str]]:
+    """Links for the url() and @import references of a stylesheet.
+    
+    Imported stylesheets keep the 'stylesheet' type so they are scanned in
+    turn; data: URLs and #fragment references (SVG filters) are skipped.
+    """
+    links = []
+    for match in CSS_REFERENCE.finditer(css):
+        imported = match.group('import_url') or match.group('import')
+        url = (imported or match.group('url') or '').strip()
+        if not url or url.startswith(('data:', '#')):
+            continue
+        links.append({
+            'url': urljoin(base_url, url),
+            'text': "[CSS @import]" if imported else "[CSS url()]",
+            'title': '',
+            'type': 'stylesheet' if imported else 'asset'
+        })
+    return links
+
+
+# Links that point at resources rather than pages: checked with HEAD even
+# when internal, since there is no page body for crawl_page to reuse
+NON_PAGE_LINK_TYPES = ('stylesheet', 'image', 'script', 'media', 'asset')
+NON_PAGE_EXTENSIONS = frozenset((
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp', '.tif', '.tiff',
+    '.css', '.js', '.mjs', '.json', '.xml', '.txt', '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.mp3', '.mp4', '.m4a', '.m4v', '.webm', '.ogg', '.ogv', '.wav', '.mov', '.avi', '.vtt',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.csv',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar', '.dmg', '.exe', '.msi', '.apk', '.iso',
+))
+
+
+# Tags whose text BeautifulSoup's get_text() leaves out of link text
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+# Tags whose content is plain text to a browser, though html.parser parses tags in it
+TEXT_ONLY_TAGS = ('textarea', 'title')
+
+
+def group_links(tagged_links: List[Tuple[str, List[Dict[str, str]]]]) -> List[Dict[str, str]]:
+    """Order single-pass results by tag, in LINK_ATTRIBUTES order: anchors, then <link>s, then images, ..."""
+    by_tag = {tag_name: [] for tag_name in LINK_ATTRIBUTES}
+    for tag_name, links in tagged_links:
+        by_tag[tag_name].extend(links)
+    return [link for links in by_tag.values() for link in links]
+
+
+class LinkScanner(HTMLParser):
+    """Streaming tag scanner that collects link-bearing tags in one pass without building a tree."""
+    
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        # Tags in document order: (tag_name, attrs, text parts)
+        self.tags: List[Tuple[str, Dict[str, Optional[str]], List[str]]] = []
+        self.open_anchors: List[List[str]] = []
+        self.non_text_depth = 0
+        # Open <textarea>/<title>, whose content is text rather than tags
+        self.text_only_tag: Optional[str] = None
+        self.anchors: Set[str] = set()
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if self.text_only_tag:
+            return
+        if tag in TEXT_ONLY_TAGS:
+            self.text_only_tag = tag
+        for name, value in attrs:
+            if value and (name == 'id' or (name == 'name' and tag == 'a')):
+                self.anchors.add(value)
+        if tag in NON_TEXT_TAGS:
+            self.non_text_depth += 1
+        if tag in LINK_ATTRIBUTES:
+            text_parts = []
+            self.tags.append((tag, dict(attrs), text_parts))
+            if tag == 'a':
+                self.open_anchors.append(text_parts)
+
+    def handle_endtag(self, tag: str):
+        if self.text_only_tag:
+            if tag == self.text_only_tag:
+                self.text_only_tag = None
+            return
+        if tag in NON_TEXT_TAGS and self.non_text_depth:
+            self.non_text_depth -= 1
+        elif tag == 'a' and self.open_anchors:
+            self.open_anchors.pop()
+
+    def handle_data(self, data: str):
+        if self.open_anchors and not self.non_text_depth:
+            stripped = data.strip()
+            if stripped:
+                # Nested anchors include the text of their children, like get_text()
+                for text_parts in self.open_anchors:
+                    text_parts.append(stripped)
+
+    def links(self) -> List[Dict[str, str]]:
+        return group_links([
+            (tag, make_links(tag, attrs, ''.join(text_parts), self.base_url))
+            for tag, attrs, text_parts in self.tags
+        ])
+
+
+def extract_links_scanner(html: str, base_url: str) -> Tuple[List[Dict[str, str]], Set[str]]:
+    """Extract links and anchor names with the stdlib streaming tag scanner."""
+    scanner = LinkScanner(base_url)
+    scanner.feed(html)
+    scanner.close()
+    return scanner.links(), scanner.anchors
+
+
+def lxml_link_text(element) -> str:
+    """get_text(strip=True) equivalent for an lxml element."""
+    parts = [element.text.strip()] if isinstance(element.tag, str) and element.text else []
+    for child in element:
+        # Comments and processing instructions have non-string tags; only their tail is text
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            parts.append(lxml_link_text(child))
+        if child.tail:
+            parts.append(child.tail.strip())
+    return ''.join(parts)
+
+
+def extract_links_lxml(html: str, base_url: str) -> Tuple[List[Dict[str, str]], Set[str]]:
+    """Extract links in a single lxml iterparse pass, then anchor names from the parsed tree.
+    
+    Link-bearing elements are collected as they start, so they keep document
+    order; link text is read once the tree is complete. See
+    extract_links_bs4 for how the backends differ.
+    """
+    from io import BytesIO
+    from lxml import etree
+    
+    elements = []
+    anchors = set()
+    events = etree.iterparse(BytesIO(html.encode('utf-8')), events=('start',), tag=tuple(LINK_ATTRIBUTES),
+                             html=True, encoding='utf-8', recover=True)
+    try:
+        for _, element in events:
+            elements.append(element)
+        anchors.update(str(value) for value in events.root.xpath('//@id | //a/@name') if value)
+    except etree.XMLSyntaxError:
+        # Empty or unparseable document
+        pass
+    tagged_links = []
+    for element in elements:
+        text = ''
+        # Like get_text(), the text of <template> content doesn't count
+        if element.tag == 'a' and not any(True for _ in element.iterancestors('template')):
+            text = lxml_link_text(element)
+        tagged_links.append((element.tag, make_links(element.tag, dict(element.attrib), text, base_url)))
+    return group_links(tagged_links), anchors
+
+
+def extract_links_selectolax(html: str, base_url: str) -> Tuple[List[Dict[str, str]], Set[str]]:
+    """Extract links with selectolax's lexbor backend in a single selector pass, plus anchor names.
+    
+    Misses links and ids inside <template>; see extract_links_bs4.
+    """
+    from selectolax.lexbor import LexborHTMLParser
+    
+    parser = LexborHTMLParser(html)
+    tagged_links = []
+    for node in parser.css(LINK_SELECTOR):
+        text = ''
+        if node.tag == 'a':
+            text = ''.join(
+                child.text_content.strip() for child in node.traverse(include_text=True)
+                if child.tag == '-text' and child.parent.tag not in NON_TEXT_TAGS
+            )
+        tagged_links.append((node.tag, make_links(node.tag, node.attributes, text, base_url)))
+    anchors = set()
+    for node in parser.css('[id], a[name]'):
+        attributes = node.attributes
+        anchors.update(value for value in (attributes.get('id'), node.tag == 'a' and attributes.get('name')) if value)
+    return group_links(tagged_links), anchors
+
+
+# Link extractor backends, selected with the "extractor" config setting:
+# name -> (extract function, module it needs)
+LINK_EXTRACTORS = {
+    'bs4': (extract_links_bs4, 'bs4'),
+    'scanner': (extract_links_scanner, 'html.parser'),
+    'lxml': (extract_links_lxml, 'lxml'),
+    'selectolax': (extract_links_selectolax, 'selectolax')
+}
+
+LINK_FIELDS = ('url', 'text', 'title', 'type')
+
+
+def parse_page_links(extractor_name: str, html: str,
+                     base_url: str) -> Tuple[List[Tuple[str, str, str, str]], Set[str], float]:
+    """Parse-stage worker: extract a page's links as compact tuples in LINK_FIELDS order.
+    
+    Also returns the page's anchor names and the seconds spent parsing, so
+    metrics leave out time spent waiting for a worker.
+    """
+    started = time.perf_counter()
+    extract = LINK_EXTRACTORS[extractor_name][0]
+    links, anchors = extract(html, base_url)
+    return [tuple(link[field] for field in LINK_FIELDS) for link in links], anchors, time.perf_counter() - started
+
+
+class HostRateLimiter:
+    """Per-host token bucket rate limiter with adaptive backoff.
+    
+    Each host gets its own bucket, so slow or strict hosts don't hold up
+    checks against other hosts. Rules are matched against the hostname with
+    shell-style patterns (e.g. "*.example.com"); a rate of 0 means unlimited.
+    A 429/503 response halves the host's rate and pauses it for Retry-After
+    seconds (or an exponential backoff); successful responses slowly restore
+    the configured rate. Throttled requests are sent again up to
+    THROTTLE_RETRIES times, waiting their turn in the bucket like any other.
+    """
+    
+    THROTTLE_STATUSES = (429, 503)
+    THROTTLE_RETRIES = 3
+    MAX_BACKOFF = 300
+    
+    def __init__(self, default_rule: Dict, host_rules: Optional[Dict[str, Dict]] = None):
+        self.default_rule = default_rule
+        self.host_rules = host_rules or {}
+        self.buckets: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'HostRateLimiter':
+        """Limiter for a config's rate_limits; defaults to one request per delay_between_requests."""
+        rate_limits = config.get('rate_limits', {})
+        delay = config.get('delay_between_requests', 1)
+        default_rule = rate_limits.get('default', {
+            'requests_per_second': 1 / delay if delay > 0 else 0,
+            'burst': config.get('max_workers', 3)
+        })
+        return cls(default_rule, rate_limits.get('hosts', {}))
+
+    def rule_for(self, hostname: str) -> Dict:
+        for pattern, rule in self.host_rules.items():
+            if fnmatch(hostname, pattern.lower()):
+                return rule
+        return self.default_rule
+
+    def bucket(self, url: str) -> Dict:
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        if host not in self.buckets:
+            rule = self.rule_for(parsed.hostname or host)
+            rate = float(rule.get('requests_per_second', 0))
+            burst = max(1.0, float(rule.get('burst', 1)))
+            self.buckets[host] = {
+                'rate': rate,
+                'max_rate': rate,
+                'burst': burst,
+                'tokens': burst,
+                'updated': time.monotonic(),
+                'blocked_until': 0.0,
+                'strikes': 0
+            }
+        return self.buckets[host]
+
+    def reserve(self, url: str) -> float:
+        """Take a token for the URL's host and return how long to wait before sending."""
+        with self.lock:
+            bucket = self.bucket(url)
+            now = time.monotonic()
+            wait = max(0.0, bucket['blocked_until'] - now)
+            if bucket['rate'] > 0:
+                elapsed = now - bucket['updated']
+                bucket['tokens'] = min(bucket['burst'], bucket['tokens'] + elapsed * bucket['rate'])
+                bucket['updated'] = now
+                # Tokens go negative while requests queue up behind each other
+                bucket['tokens'] -= 1
+                if bucket['tokens'] < 0:
+                    wait = max(wait, -bucket['tokens'] / bucket['rate'])
+            return wait
+
+    def acquire(self, url: str) -> float:
+        """Block until a request to the URL's host is allowed; returns the seconds waited."""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        """Asyncio version of acquire()."""
+        wait = self.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def update(self, url: str, status_code: int, retry_after: Optional[str] = None):
+        """Adapt the host's rate to a response status and Retry-After header."""
+        with self.lock:
+            bucket = self.bucket(url)
+            if status_code in self.THROTTLE_STATUSES:
+                bucket['strikes'] += 1
+                if bucket['rate'] > 0:
+                    bucket['rate'] = max(bucket['max_rate'] / 16, bucket['rate'] / 2)
+                delay = self.parse_retry_after(retry_after)
+                if delay is None:
+                    delay = min(self.MAX_BACKOFF, 2 ** bucket['strikes'])
+                bucket['blocked_until'] = max(bucket['blocked_until'], time.monotonic() + delay)
+            elif status_code:
+                bucket['strikes'] = 0
+                if bucket['rate'] < bucket['max_rate']:
+                    bucket['rate'] = min(bucket['max_rate'], bucket['rate'] * 1.1)
+
+    def parse_retry_after(self, value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given in seconds or as an HTTP date."""
+        if not value:
+            return None
+        try:
+            return min(self.MAX_BACKOFF, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return min(self.MAX_BACKOFF, max(0.0, retry_at.timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+class SQLiteStore:
+    """Thread-safe wrapper around one SQLite table, committing writes in batches."""
+    
+    SCHEMA = ""
+    COMMIT_EVERY = 100
+    # Seconds to wait for another process's write lock
+    TIMEOUT = 5.0
+    
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.pending_writes = 0
+        # Writes per commit; the write lock on the file is held until the commit
+        self.commit_every = self.COMMIT_EVERY
+        self.conn = sqlite3.connect(path, timeout=self.TIMEOUT, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def write(self, sql: str, params: Tuple):
+        self.write_many(sql, [params])
+
+    def write_many(self, sql: str, rows: List[Tuple]):
+        with self.lock:
+            self.conn.executemany(sql, rows)
+            self.pending_writes += 1
+            if self.pending_writes >= self.commit_every:
+                self.conn.commit()
+                self.pending_writes = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    @staticmethod
+    def validator_headers(entry: Dict) -> Dict[str, str]:
+        """Conditional request headers from an entry's stored ETag/Last-Modified."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+
+class LinkVerdictCache(SQLiteStore):
+    """SQLite store of link verdicts that persists between runs.
+    
+    Verdicts stay fresh for a TTL that depends on the link type and whether
+    the link is internal or external; broken verdicts use a shorter TTL so
+    fixes show up quickly. Stale entries keep their ETag/Last-Modified so the
+    next check can be a conditional request. Permanent redirect hops are
+    kept alongside, for RedirectCache, and so are the pages broken links were
+    last found on, for crawl priorities.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS link_verdicts (
+            url TEXT PRIMARY KEY,
+            status_code INTEGER,
+            reason TEXT,
+            content_type TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            checked_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS redirects (
+            url TEXT PRIMARY KEY,
+            target TEXT,
+            status_code INTEGER,
+            checked_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS broken_pages (
+            url TEXT PRIMARY KEY,
+            found_at REAL
+        );
+    """
+    DEFAULT_TTL_HOURS = {
+        'internal': {'link': 24, 'image': 72, 'stylesheet': 72, 'script': 72, 'media': 72, 'asset': 72},
+        'external': {'link': 72, 'image': 168, 'stylesheet': 168, 'script': 168, 'media': 168, 'asset': 168}
+    }
+    
+    def __init__(self, path: str, ttl_hours: Optional[Dict] = None, broken_ttl_hours: float = 6,
+                 redirect_ttl_hours: float = 168):
+        super().__init__(path)
+        self.ttl_hours = ttl_hours or self.DEFAULT_TTL_HOURS
+        self.broken_ttl_hours = broken_ttl_hours
+        self.redirect_ttl_hours = redirect_ttl_hours
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+
+    @classmethod
+    def from_config(cls, cache_config: Dict) -> Optional['LinkVerdictCache']:
+        """Cache for a config's cache settings, or None if it is disabled."""
+        if not cache_config.get('enabled', True):
+            return None
+        return cls(
+            cache_config.get('path', 'link_checker_cache.sqlite'),
+            cache_config.get('ttl_hours'),
+            cache_config.get('broken_ttl_hours', 6),
+            cache_config.get('redirect_ttl_hours', 168)
+        )
+
+    def get(self, url: str) -> Optional[Dict]:
+        rows = self.query(
+            "SELECT status_code, reason, content_type, etag, last_modified, checked_at "
+            "FROM link_verdicts WHERE url = ?", (url,)
+        )
+        if not rows:
+            return None
+        return dict(zip(('status_code', 'reason', 'content_type', 'etag', 'last_modified', 'checked_at'), rows[0]))
+
+    def is_fresh(self, entry: Dict, link_type: str, internal: bool) -> bool:
+        if not entry['status_code'] or entry['status_code'] >= 400:
+            ttl = self.broken_ttl_hours
+        else:
+            ttls = self.ttl_hours.get('internal' if internal else 'external', {})
+            ttl = ttls.get(link_type, ttls.get('link', 0))
+        return time.time() - entry['checked_at'] < ttl * 3600
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        """Headers that turn a re-check of a stale entry into a conditional request."""
+        if entry and entry['status_code'] and entry['status_code'] < 400:
+            return self.validator_headers(entry)
+        return {}
+
+    def put(self, url: str, status_code: int, reason: str, headers=None):
+        headers = headers or {}
+        self.write(
+            "INSERT OR REPLACE INTO link_verdicts VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, status_code, reason, headers.get('content-type', '').lower(),
+             headers.get('ETag'), headers.get('Last-Modified'), time.time())
+        )
+
+    def touch(self, url: str):
+        """Mark an entry as just checked (after a 304 Not Modified)."""
+        self.write("UPDATE link_verdicts SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def get_redirect(self, url: str) -> Optional[Tuple[str, int]]:
+        """(target, status_code) of a permanent redirect from url seen within redirect_ttl_hours."""
+        rows = self.query(
+            "SELECT target, status_code FROM redirects WHERE url = ? AND checked_at > ?",
+            (url, time.time() - self.redirect_ttl_hours * 3600)
+        )
+        return tuple(rows[0]) if rows else None
+
+    def put_redirect(self, url: str, target: str, status_code: int):
+        self.write("INSERT OR REPLACE INTO redirects VALUES (?, ?, ?, ?)", (url, target, status_code, time.time()))
+
+    def put_broken_page(self, page_key: str):
+        """Note that a broken link was found on a page (by normalized URL)."""
+        self.write("INSERT OR REPLACE INTO broken_pages VALUES (?, ?)", (page_key, time.time()))
+
+    def broken_history(self, days: float) -> Tuple[List[str], List[str]]:
+        """(links checked as broken, pages broken links were found on) within the last days."""
+        since = time.time() - days * 86400
+        links = self.query("SELECT url FROM link_verdicts WHERE (status_code = 0 OR status_code >= 400) "
+                           "AND checked_at > ?", (since,))
+        pages = self.query("SELECT url FROM broken_pages WHERE found_at > ?", (since,))
+        return [url for url, in links], [url for url, in pages]
+
+
+class RedirectCache:
+    """Permanent redirect hops (301/308), so a known chain is followed without requesting it.
+    
+    Hops are keyed on the URL without its fragment. They are kept for the
+    run and, when there is a verdict cache, stored in it for later runs.
+    Temporary redirects are never cached: they are requested every time.
+    """
+    
+    STATUSES = (301, 302, 303, 307, 308)
+    PERMANENT = (301, 308)
+    
+    def __init__(self, store: Optional[LinkVerdictCache] = None):
+        self.store = store
+        # None marks a URL already looked up in the store with no hop
+        self.hops: Dict[str, Optional[Tuple[str, int]]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, url: str) -> Optional[Tuple[str, int]]:
+        key = urldefrag(url)[0]
+        with self.lock:
+            if key in self.hops:
+                return self.hops[key]
+        hop = self.store.get_redirect(key) if self.store else None
+        with self.lock:
+            self.hops[key] = hop
+        return hop
+
+    def add(self, url: str, target: str, status_code: int):
+        if status_code not in self.PERMANENT:
+            return
+        key = urldefrag(url)[0]
+        with self.lock:
+            self.hops[key] = (target, status_code)
+        if self.store:
+            self.store.put_redirect(key, target, status_code)
+
+    def follow(self, url: str, hops: List[Tuple[str, int]], limit: int) -> str:
+        """Follow known hops from url, appending (url, status_code) to hops; returns where they lead."""
+        hop = self.get(url)
+        while hop and len(hops) < limit:
+            hops.append((url, hop[1]))
+            self.hits += 1
+            url = hop[0]
+            hop = self.get(url)
+        return url
+
+
+class PageFingerprintStore(SQLiteStore):
+    """SQLite record of each crawled page's content hash, extracted links and anchors.
+    
+    Incremental runs use it to send conditional requests for pages and to
+    replay the stored links of pages that haven't changed instead of parsing
+    them again. Keyed on normalized page URL.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS page_fingerprints (
+            url TEXT PRIMARY KEY,
+            content_hash TEXT,
+            links TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            crawled_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS page_anchors (
+            url TEXT PRIMARY KEY,
+            anchors TEXT
+        );
+    """
+    
+    def get(self, url: str) -> Optional[Dict]:
+        rows = self.query(
+            "SELECT content_hash, links, etag, last_modified, crawled_at, a.anchors "
+            "FROM page_fingerprints LEFT JOIN page_anchors a USING (url) WHERE url = ?", (url,)
+        )
+        if not rows:
+            return None
+        content_hash, links, etag, last_modified, crawled_at, anchors = rows[0]
+        return {
+            'content_hash': content_hash,
+            'links': json.loads(links),
+            'etag': etag,
+            'last_modified': last_modified,
+            'crawled_at': crawled_at,
+            # None for pages stored before anchors were recorded
+            'anchors': set(json.loads(anchors)) if anchors is not None else None
+        }
+
+    def put(self, url: str, content_hash: str, links: List[Dict[str, str]], validators: Dict[str, Optional[str]],
+            anchors: Optional[Set[str]] = None):
+        self.write(
+            "INSERT OR REPLACE INTO page_fingerprints VALUES (?, ?, ?, ?, ?, ?)",
+            (url, content_hash, json.dumps(links), validators.get('etag'),
+             validators.get('last_modified'), time.time())
+        )
+        if anchors is not None:
+            self.write("INSERT OR REPLACE INTO page_anchors VALUES (?, ?)", (url, json.dumps(sorted(anchors))))
+
+    def touch(self, url: str):
+        self.write("UPDATE page_fingerprints SET crawled_at = ? WHERE url = ?", (time.time(), url))
+
+    def crawled_times(self) -> Dict[str, float]:
+        return dict(self.query("SELECT url, crawled_at FROM page_fingerprints"))
+
+
+class PatternMatcher:
+    """Case-insensitive matcher for a list of exclusion regexes, compiled once.
+    
+    Patterns that are just a literal with optional ".*"/"^"/"$" anchors
+    (".*admin.*", ".*\\.pdf$") become plain substring/prefix/suffix tests;
+    the rest are combined into one alternation regex. Patterns that can't be
+    combined (backreferences, global inline flags) are searched one by one.
+    """
+    
+    LITERAL_PATTERN = re.compile(r'^(\^)?(\.\*)?((?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])+)(\.\*)?(\$)?$')
+    
+    def __init__(self, patterns: List[str]):
+        self.contains: List[str] = []
+        self.prefixes: List[str] = []
+        self.suffixes: List[str] = []
+        self.exact: Set[str] = set()
+        regexes = []
+        
+        for pattern in patterns:
+            literal = self.LITERAL_PATTERN.match(pattern)
+            if literal:
+                anchor_start, lead_any, text, trail_any, anchor_end = literal.groups()
+                text = re.sub(r'\\(.)', r'\1', text).lower()
+                starts = anchor_start and not lead_any
+                ends = anchor_end and not trail_any
+                if starts and ends:
+                    self.exact.add(text)
+                elif starts:
+                    self.prefixes.append(text)
+                elif ends:
+                    self.suffixes.append(text)
+                else:
+                    self.contains.append(text)
+            else:
+                regexes.append(pattern)
+        
+        self.prefixes_tuple = tuple(self.prefixes)
+        self.suffixes_tuple = tuple(self.suffixes)
+        self.combined = None
+        self.separate: List[re.Pattern] = []
+        if regexes:
+            try:
+                if any(re.search(r'\\[1-9]|\(\?P=', pattern) for pattern in regexes):
+                    raise re.error("backreferences can't be combined")
+                self.combined = re.compile('|'.join(f'(?:{pattern})' for pattern in regexes), re.IGNORECASE)
+            except re.error:
+                self.separate = [re.compile(pattern, re.IGNORECASE) for pattern in regexes]
+
+    def matches(self, url: str) -> bool:
+        lowered = url.lower()
+        if lowered in self.exact:
+            return True
+        if self.prefixes_tuple and lowered.startswith(self.prefixes_tuple):
+            return True
+        if self.suffixes_tuple and lowered.endswith(self.suffixes_tuple):
+            return True
+        if any(text in lowered for text in self.contains):
+            return True
+        if self.combined is not None and self.combined.search(url):
+            return True
+        return any(pattern.search(url) for pattern in self.separate)
+
+
+class UrlFilter:
+    """Crawl/check decisions for URLs, memoized per normalized URL.
+    
+    The exclusion patterns are compiled once and the start domain is parsed
+    once, instead of on every should_check_url / should_crawl_url call.
+    """
+    
+    MAX_DECISIONS = 200000
+    
+    def __init__(self, start_url: str, exclude_patterns: List[str], exclude_link_check_patterns: List[str],
+                 normalize):
+        self.start_domain = urlparse(start_url).netloc.lower()
+        self.normalize = normalize
+        self.crawl_excluded = PatternMatcher(exclude_patterns)
+        self.check_excluded = PatternMatcher(exclude_link_check_patterns + exclude_patterns)
+        # normalized URL -> (should check, should crawl, internal)
+        self.decisions: Dict[str, Tuple[bool, bool, bool]] = {}
+
+    def decide(self, url: str) -> Tuple[bool, bool, bool]:
+        normalized_url = self.normalize(url)
+        decision = self.decisions.get(normalized_url)
+        if decision is None:
+            internal = urlparse(normalized_url).netloc == self.start_domain
+            should_check = not self.check_excluded.matches(normalized_url)
+            should_crawl = internal and not self.crawl_excluded.matches(normalized_url)
+            decision = (should_check, should_crawl, internal)
+            if len(self.decisions) >= self.MAX_DECISIONS:
+                self.decisions.clear()
+            self.decisions[normalized_url] = decision
+        return decision
+
+    def should_check(self, url: str) -> bool:
+        return self.decide(url)[0]
+
+    def should_crawl(self, url: str) -> bool:
+        return self.decide(url)[1]
+
+    def is_internal(self, url: str) -> bool:
+        return self.decide(url)[2]
+
+
+class VisitedSet:
+    """Set of normalized URLs with a configurable memory footprint.
+    
+    Modes:
+      exact  - plain set of URL strings
+      hashed - set of 64-bit URL fingerprints (collisions are negligible)
+      bloom  - Bloom filter sized for expected_urls at false_positive_rate;
+               a false positive means a page is treated as already seen
+    """
+    
+    def __init__(self, mode: str = 'exact', expected_urls: int = 1000000, false_positive_rate: float = 0.001):
+        self.mode = mode
+        self.count = 0
+        self.items = set()
+        if mode == 'bloom':
+            self.num_bits = max(8, int(-expected_urls * math.log(false_positive_rate) / math.log(2) ** 2))
+            self.num_hashes = max(1, round(self.num_bits / expected_urls * math.log(2)))
+            self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def fingerprint(self, url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def bit_positions(self, url: str) -> List[int]:
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, url: str) -> bool:
+        """Add a URL, returning False if it was already present."""
+        if self.mode == 'bloom':
+            positions = self.bit_positions(url)
+            if all(self.bits[bit >> 3] & (1 << (bit & 7)) for bit in positions):
+                return False
+            for bit in positions:
+                self.bits[bit >> 3] |= 1 << (bit & 7)
+        else:
+            key = self.fingerprint(url) if self.mode == 'hashed' else url
+            if key in self.items:
+                return False
+            self.items.add(key)
+        self.count += 1
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        if self.mode == 'bloom':
+            return all(self.bits[bit >> 3] & (1 << (bit & 7)) for bit in self.bit_positions(url))
+        return (self.fingerprint(url) if self.mode == 'hashed' else url) in self.items
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class Frontier:
+    """Crawl frontier that drops duplicates when they are enqueued.
+    
+    URLs are deduplicated on normalize_url() against a VisitedSet, so each
+    page is queued at most once, and are queued with the number of links
+    followed from the start URL to find them (their depth). Pages come out
+    in FIFO (breadth-first) order, or with prioritized set, lowest priority
+    value first; reprioritize() moves a queued page up when more is learned
+    about it. When more than max_in_memory URLs are waiting, new ones are
+    appended to a temporary spill file and read back in order once the
+    in-memory queue drains (priorities then only order the in-memory part).
+    """
+    
+    def __init__(self, seen: VisitedSet, normalize, max_in_memory: int = 0, spill_dir: Optional[str] = None,
+                 prioritized: bool = False):
+        self.seen = seen
+        self.normalize = normalize
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.prioritized = prioritized
+        # FIFO: (url, depth); prioritized: heap of (priority, sequence, url)
+        self.queue = deque() if not prioritized else []
+        # Prioritized: normalized URL -> (priority, depth, url) of each page in the heap.
+        # Heap entries whose priority doesn't match are stale and skipped.
+        self.queued: Dict[str, Tuple[float, int, str]] = {}
+        self.sequence = count()
+        self.spill_file = None
+        self.spill_read_offset = 0
+        self.spilled = 0
+
+    def push(self, url: str, depth: int = 0, priority: float = 0.0) -> bool:
+        """Queue a URL unless it was queued before; returns True if it was added."""
+        if not self.seen.add(self.normalize(url)):
+            return False
+        if self.max_in_memory and (self.spilled or self.in_memory() >= self.max_in_memory):
+            if self.spill_file is None:
+                self.spill_file = tempfile.TemporaryFile('w+', encoding='utf-8', dir=self.spill_dir)
+            self.spill_file.seek(0, os.SEEK_END)
+            self.spill_file.write(f"{priority!r}\t{depth}\t{url}\n")
+            self.spilled += 1
+        else:
+            self.enqueue(url, depth, priority)
+        return True
+
+    def enqueue(self, url: str, depth: int, priority: float):
+        if self.prioritized:
+            self.queued[self.normalize(url)] = (priority, depth, url)
+            heapq.heappush(self.queue, (priority, next(self.sequence), url))
+        else:
+            self.queue.append((url, depth))
+
+    def reprioritize(self, url: str, priority: float):
+        """Move a page that is waiting in memory up to a lower priority value.
+        
+        url may be any link to the page (with a fragment, say); the page is
+        still crawled at the URL it was queued with.
+        """
+        key = self.normalize(url)
+        if key in self.queued and priority < self.queued[key][0]:
+            _, depth, queued_url = self.queued[key]
+            self.queued[key] = (priority, depth, queued_url)
+            heapq.heappush(self.queue, (priority, next(self.sequence), queued_url))
+
+    def pop(self) -> Tuple[str, int]:
+        """The next page to crawl, as (url, depth)."""
+        while True:
+            if not self.in_memory() and self.spilled:
+                self.refill()
+            if not self.prioritized:
+                return self.queue.popleft()
+            priority, _, url = heapq.heappop(self.queue)
+            key = self.normalize(url)
+            if key in self.queued and self.queued[key][0] == priority:
+                return url, self.queued.pop(key)[1]
+
+    def in_memory(self) -> int:
+        return len(self.queued) if self.prioritized else len(self.queue)
+
+    def refill(self):
+        """Move the oldest spilled URLs back into memory."""
+        self.spill_file.flush()
+        self.spill_file.seek(self.spill_read_offset)
+        while self.spilled and self.in_memory() < self.max_in_memory:
+            priority, depth, url = self.spill_file.readline().rstrip('\n').split('\t', 2)
+            self.enqueue(url, int(depth), float(priority))
+            self.spilled -= 1
+        self.spill_read_offset = self.spill_file.tell()
+        if not self.spilled:
+            # Everything was read back; start the spill file over
+            self.spill_file.seek(0)
+            self.spill_file.truncate()
+            self.spill_read_offset = 0
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __len__(self) -> int:
+        return self.in_memory() + self.spilled
+
+
+class PageStore:
+    """Responses of internal pages fetched as links, kept until they are crawled.
+
+    Entries are (status_code, content_type, html, validators), keyed on the
+    normalized URL. The store holds at most max_bytes of HTML (plus a small
+    allowance per entry); beyond that the oldest entries are dropped and the
+    page is simply fetched again when its turn to be crawled comes, so the
+    store can't grow with the size of the crawl queue.
+    """
+
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def entry_size(self, entry: Tuple) -> int:
+        return len(entry[2]) + self.ENTRY_OVERHEAD
+
+    def __setitem__(self, key: str, entry: Tuple[int, str, str, Dict[str, Optional[str]]]):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= self.entry_size(old)
+            self.entries[key] = entry
+            self.size += self.entry_size(entry)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, dropped = self.entries.popitem(last=False)
+                self.size -= self.entry_size(dropped)
+                self.evicted += 1
+
+    def pop(self, key: str, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return default
+            self.size -= self.entry_size(entry)
+            return entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class CrawlBudget:
+    """Limits that end a crawl early, and a record of what they left out.
+    
+    max_pages caps the pages crawled, max_depth how many links away from
+    the start URL a page may be, max_requests_per_host the requests sent to
+    any one host and max_seconds the wall-clock time since the budget was
+    created, at the start of the crawl (0 or None: no limit). Once a limit
+    is reached no new page fetch or link check starts under it, but work in
+    progress is finished, so the crawl ends with partial results and a
+    coverage summary instead of being cut off.
+    """
+    
+    def __init__(self, max_pages: int = 0, max_depth: Optional[int] = None, max_requests_per_host: int = 0,
+                 max_seconds: float = 0):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_requests_per_host = max_requests_per_host
+        self.max_seconds = max_seconds
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.host_requests: Dict[str, int] = {}
+        # Why the crawl stopped early: limit -> description, in the order they were hit
+        self.stop_reasons: Dict[str, str] = {}
+        # Normalized URLs of pages found beyond max_depth, and links left unchecked
+        self.pages_too_deep: Set[str] = set()
+        self.unchecked_links: Set[str] = set()
+        # Queued pages that were never crawled, set by the crawl engine when it stops
+        self.pages_left = 0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'CrawlBudget':
+        budget = config.get('budget', {})
+        return cls(
+            budget.get('max_pages', 0),
+            budget.get('max_depth'),
+            budget.get('max_requests_per_host', 0),
+            budget.get('max_seconds', 0)
+        )
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.max_pages or self.max_depth is not None or self.max_requests_per_host or self.max_seconds)
+
+    def stop(self, limit: str, reason: str):
+        with self.lock:
+            self.stop_reasons.setdefault(limit, reason)
+
+    def out_of_time(self) -> bool:
+        if self.max_seconds and time.monotonic() - self.started >= self.max_seconds:
+            self.stop('max_seconds', f"time limit of {self.max_seconds:g}s reached")
+            return True
+        return False
+
+    def host_exhausted(self, url: str) -> bool:
+        if not self.max_requests_per_host:
+            return False
+        host = urlparse(url).netloc.lower()
+        if self.host_requests.get(host, 0) >= self.max_requests_per_host:
+            self.stop(f"host {host}", f"{host} used its {self.max_requests_per_host} requests")
+            return True
+        return False
+
+    def allows_request(self, url: str) -> bool:
+        """Whether a new page fetch or link check may start on url's host."""
+        return not self.out_of_time() and not self.host_exhausted(url)
+
+    def allows_page(self, url: str, pages_crawled: int) -> bool:
+        """Whether a queued page may still be crawled."""
+        if self.max_pages and pages_crawled >= self.max_pages:
+            self.stop('max_pages', f"page limit of {self.max_pages} reached")
+            return False
+        return self.allows_request(url)
+
+    def allows_depth(self, key: str, depth: int) -> bool:
+        """Whether a page found depth links away may be queued; key is its normalized URL."""
+        if self.max_depth is None:
+            return True
+        with self.lock:
+            if depth > self.max_depth:
+                self.pages_too_deep.add(key)
+                self.stop_reasons.setdefault('max_depth', f"depth limit of {self.max_depth} reached")
+                return False
+            # Found again through a shorter path
+            self.pages_too_deep.discard(key)
+            return True
+
+    def count_request(self, url: str):
+        if self.max_requests_per_host:
+            host = urlparse(url).netloc.lower()
+            with self.lock:
+                self.host_requests[host] = self.host_requests.get(host, 0) + 1
+
+    def skip_link(self, key: str):
+        with self.lock:
+            self.unchecked_links.add(key)
+
+
+class CrawlCheckpoint:
+    """Append-only JSON-lines log of crawl progress, used by --resume.
+    
+    Events are buffered and flushed (and fsynced) at most every
+    flush_interval seconds, so checkpointing costs one small write per event
+    rather than a full state dump. A torn last line from a crash is ignored
+    on load; anything after the last flush is simply redone.
+    """
+    
+    def __init__(self, path: str, flush_interval: float = 5.0, append: bool = False):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.last_flush = time.monotonic()
+
+    def log(self, event: str, **fields):
+        fields['e'] = event
+        with self.lock:
+            self.file.write(json.dumps(fields) + '\n')
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.file.close()
+
+    @staticmethod
+    def load(path: str, normalize) -> Dict:
+        """Replay a checkpoint log into crawl state.
+        
+        Broken link records are only kept for pages that finished, since
+        unfinished pages are crawled again and record them again; the same
+        goes for links with an #anchor and internal links to redirects.
+        Queued pages map their normalized URL to (url, depth).
+        """
+        state = {'start_url': None, 'queued': {}, 'done': set(), 'link_results': {}, 'broken_links': [],
+                 'redirect_chains': {}, 'redirected_links': [], 'fragment_links': [], 'page_anchors': {}}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Torn write at the end of the log
+                    continue
+                kind = event['e']
+                if kind == 'start':
+                    state['start_url'] = event['start_url']
+                elif kind == 'queued':
+                    # Logs written before depths were recorded resume at depth 0
+                    state['queued'].setdefault(normalize(event['url']), (event['url'], event.get('depth', 0)))
+                elif kind == 'done':
+                    state['done'].add(normalize(event['url']))
+                elif kind == 'result':
+                    state['link_results'][event['key']] = tuple(event['result'])
+                elif kind == 'broken':
+                    state['broken_links'].append(event['record'])
+                elif kind == 'redirect':
+                    state['redirect_chains'][event['key']] = {
+                        'hops': [tuple(hop) for hop in event['hops']], 'final_url': event['final_url']
+                    }
+                elif kind == 'redirected':
+                    redirect = event['redirect']
+                    redirect['hops'] = [tuple(hop) for hop in redirect['hops']]
+                    state['redirected_links'].append((event['page'], event['link'], redirect))
+                elif kind == 'fragment':
+                    state['fragment_links'].append((event['page'], event['link'], event['status_code']))
+                elif kind == 'anchors':
+                    state['page_anchors'][event['url']] = event['anchors']
+        state['broken_links'] = [record for record in state['broken_links']
+                                 if normalize(record['source_page']) in state['done']]
+        state['redirected_links'] = [occurrence for occurrence in state['redirected_links']
+                                     if normalize(occurrence[0]) in state['done']]
+        state['fragment_links'] = [occurrence for occurrence in state['fragment_links']
+                                   if normalize(occurrence[0]) in state['done']]
+        return state
+
+
+BROKEN_LINK_FIELDS = ('source_page', 'broken_link', 'link_text', 'link_title', 'link_type_html',
+                      'status_code', 'error', 'link_type', 'timestamp')
+
+
+class BrokenLinkTable(SQLiteStore):
+    """SQLite table of broken link records, indexed for grouping by broken URL."""
+    
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS broken_links ({', '.join(BROKEN_LINK_FIELDS)});
+        CREATE INDEX IF NOT EXISTS broken_links_by_url ON broken_links (broken_link);
+    """
+    
+    def insert(self, record: Dict):
+        self.write(f"INSERT INTO broken_links VALUES ({', '.join('?' * len(BROKEN_LINK_FIELDS))})",
+                   tuple(record.get(field) for field in BROKEN_LINK_FIELDS))
+
+    def cursor(self, sql: str):
+        """Iterate over a query's rows as records without loading them all."""
+        with self.lock:
+            self.conn.commit()
+        for row in self.conn.execute(sql):
+            yield dict(zip(BROKEN_LINK_FIELDS, row))
+
+    def records(self):
+        return self.cursor(f"SELECT {', '.join(BROKEN_LINK_FIELDS)} FROM broken_links ORDER BY rowid")
+
+    def grouped(self):
+        """Yield (broken_link, occurrences) with occurrences as an iterator of records."""
+        rows = self.cursor(f"SELECT {', '.join(BROKEN_LINK_FIELDS)} FROM broken_links "
+                           f"ORDER BY broken_link, rowid")
+        return groupby(rows, key=lambda record: record['broken_link'])
+
+
+class ResultSink:
+    """Where broken link records go as they are found.
+    
+    Records are written out immediately rather than kept in memory; only the
+    counts are. Reports stream back over records() or grouped(). Subclasses
+    implement write() and records(); grouping defaults to loading the
+    records into a temporary indexed SQLite table.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.count = 0
+        self.type_counts = {'internal': 0, 'external': 0}
+        self.group_table: Optional[BrokenLinkTable] = None
+        self.group_path = None
+
+    def add(self, record: Dict):
+        with self.lock:
+            self.write(record)
+            self.count += 1
+            self.type_counts[record['link_type']] = self.type_counts.get(record['link_type'], 0) + 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def write(self, record: Dict):
+        raise NotImplementedError
+
+    def records(self):
+        raise NotImplementedError
+
+    def grouped(self):
+        if self.group_table is None:
+            fd, self.group_path = tempfile.mkstemp(prefix='broken_links_', suffix='.sqlite')
+            os.close(fd)
+            self.group_table = BrokenLinkTable(self.group_path)
+            for record in self.records():
+                self.group_table.insert(record)
+        return self.group_table.grouped()
+
+    def close(self):
+        if self.group_table is not None:
+            self.group_table.close()
+            os.remove(self.group_path)
+
+
+class JSONLResultSink(ResultSink):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, record: Dict):
+        self.file.write(json.dumps(record) + '\n')
+
+    def records(self):
+        self.file.flush()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class CSVResultSink(ResultSink):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=BROKEN_LINK_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, record: Dict):
+        self.writer.writerow(record)
+
+    def records(self):
+        self.file.flush()
+        with open(self.path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class SQLiteResultSink(ResultSink):
+    """Results in an SQLite table; with no path, a temporary file removed on close."""
+    
+    def __init__(self, path: Optional[str]):
+        self.temporary = path is None
+        if self.temporary:
+            fd, path = tempfile.mkstemp(prefix='broken_links_', suffix='.sqlite')
+            os.close(fd)
+        super().__init__(path)
+        self.table = BrokenLinkTable(path)
+
+    def write(self, record: Dict):
+        self.table.insert(record)
+
+    def records(self):
+        return self.table.records()
+
+    def grouped(self):
+        return self.table.grouped()
+
+    def close(self):
+        self.table.close()
+        if self.temporary:
+            os.remove(self.path)
+
+
+RESULT_SINKS = {
+    'jsonl': JSONLResultSink,
+    'csv': CSVResultSink,
+    'sqlite': SQLiteResultSink,
+}
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, in the Prometheus style."""
+    
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    
+    def __init__(self):
+        # One count per bucket plus +Inf; made cumulative when exported
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        buckets = []
+        total = 0
+        for upper, count in zip(self.BUCKETS + ('+Inf',), self.counts):
+            total += count
+            buckets.append((str(upper), total))
+        return buckets
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'sum': round(self.sum, 6), 'buckets': dict(self.cumulative())}
+
+
+class RunMetrics:
+    """Request timings per host plus run-wide throughput counters.
+    
+    Both engines report every request here (time to first byte, total time,
+    bytes, urllib3 retries, rate limiter waits, and connect time when the
+    request opened a new connection), along with link parse times. New connections per host and
+    DNS lookups come from TransportStats. Written out as JSON and as a
+    Prometheus textfile at the end of the run.
+    """
+    
+    HOST_HISTOGRAMS = ('ttfb_seconds', 'total_seconds', 'connect_seconds')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.hosts: Dict[str, Dict] = {}
+        self.requests: Dict[str, int] = {}
+        self.parse = Histogram()
+        # Connection and DNS counts from the transport layer, read when metrics are written
+        self.transport: Optional[TransportStats] = None
+
+    def host(self, url: str) -> Dict:
+        host = urlparse(url).netloc.lower()
+        if host not in self.hosts:
+            self.hosts[host] = {'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0,
+                                'status_classes': {}, 'rate_limit_wait_seconds': 0.0,
+                                **{name: Histogram() for name in self.HOST_HISTOGRAMS}}
+        return self.hosts[host]
+
+    def record_request(self, kind: str, url: str, status_code: int, ttfb: Optional[float], total: float,
+                       nbytes: int = 0, retries: int = 0, connect: Optional[float] = None):
+        """Record one request; status_code 0 means it failed without a response."""
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            stats = self.host(url)
+            stats['requests'] += 1
+            stats['retries'] += retries
+            stats['bytes'] += nbytes
+            status_class = f"{status_code // 100}xx" if status_code else 'error'
+            stats['status_classes'][status_class] = stats['status_classes'].get(status_class, 0) + 1
+            if not status_code or status_code >= 400:
+                stats['errors'] += 1
+            if ttfb is not None:
+                stats['ttfb_seconds'].observe(ttfb)
+            stats['total_seconds'].observe(total)
+            if connect is not None:
+                stats['connect_seconds'].observe(connect)
+
+    def record_body(self, url: str, seconds: float, nbytes: int):
+        """Add a body read after the request was recorded (streamed responses)."""
+        with self.lock:
+            stats = self.host(url)
+            stats['bytes'] += nbytes
+            stats['total_seconds'].sum += seconds
+
+    def record_wait(self, url: str, seconds: float):
+        if seconds > 0:
+            with self.lock:
+                self.host(url)['rate_limit_wait_seconds'] += seconds
+
+    def record_parse(self, seconds: float):
+        with self.lock:
+            self.parse.observe(seconds)
+
+    def connection_stats(self, host: str, requests: int) -> Dict:
+        """New connections, HTTP/2 requests and the share of requests that reused a connection."""
+        transport = self.transport
+        connections = transport.connections.get(host, 0) if transport else 0
+        return {
+            'connections': connections,
+            'http2_requests': transport.http2_requests.get(host, 0) if transport else 0,
+            'connection_reuse': round(max(0.0, 1 - connections / requests), 3) if requests else 0,
+        }
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            total_requests = sum(self.requests.values())
+            total_bytes = sum(stats['bytes'] for stats in self.hosts.values())
+            snapshot = {
+                'elapsed_seconds': round(elapsed, 3),
+                'requests': dict(self.requests),
+                'requests_per_second': round(total_requests / elapsed, 3) if elapsed else 0,
+                'bytes': total_bytes,
+                'bytes_per_second': round(total_bytes / elapsed, 1) if elapsed else 0,
+                'parse_seconds': self.parse.to_dict(),
+                'hosts': {
+                    host: {**{name: value.to_dict() if isinstance(value, Histogram) else value
+                              for name, value in stats.items()},
+                           **self.connection_stats(host, stats['requests'])}
+                    for host, stats in self.hosts.items()
+                },
+            }
+            if self.transport:
+                snapshot['dns'] = {'lookups': self.transport.dns_lookups, 'cache_hits': self.transport.dns_cache_hits}
+            return snapshot
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def write_prometheus(self, path: str):
+        """Write a node_exporter textfile; replaced atomically so scrapes never see half a file."""
+        snapshot = self.snapshot()
+        lines = [
+            '# TYPE link_checker_elapsed_seconds gauge',
+            f"link_checker_elapsed_seconds {snapshot['elapsed_seconds']}",
+            '# TYPE link_checker_requests_total counter',
+        ]
+        lines += [f'link_checker_requests_total{{kind="{kind}"}} {count}' for kind, count in snapshot['requests'].items()]
+        lines.append('# TYPE link_checker_parse_seconds histogram')
+        lines += self.prometheus_histogram('link_checker_parse_seconds', '', self.parse)
+        with self.lock:
+            hosts = list(self.hosts.items())
+        if 'dns' in snapshot:
+            lines.append('# TYPE link_checker_dns_lookups_total counter')
+            lines.append(f"link_checker_dns_lookups_total {snapshot['dns']['lookups']}")
+            lines.append('# TYPE link_checker_dns_cache_hits_total counter')
+            lines.append(f"link_checker_dns_cache_hits_total {snapshot['dns']['cache_hits']}")
+        for name, metric_type in (('requests', 'counter'), ('errors', 'counter'), ('retries', 'counter'),
+                                  ('bytes', 'counter'), ('rate_limit_wait_seconds', 'counter'),
+                                  ('connections', 'counter'), ('http2_requests', 'counter')):
+            metric = f'link_checker_host_{name}_total'
+            lines.append(f'# TYPE {metric} {metric_type}')
+            lines += [f'{metric}{{host="{host}"}} {host_stats[name]}' for host, host_stats in snapshot['hosts'].items()]
+        for name in self.HOST_HISTOGRAMS:
+            metric = f'link_checker_host_{name}'
+            lines.append(f'# TYPE {metric} histogram')
+            for host, stats in hosts:
+                lines += self.prometheus_histogram(metric, f'host="{host}"', stats[name])
+        
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def prometheus_histogram(metric: str, labels: str, histogram: Histogram) -> List[str]:
+        separator = ',' if labels else ''
+        lines = [f'{metric}_bucket{{{labels}{separator}le="{upper}"}} {count}'
+                 for upper, count in histogram.cumulative()]
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{metric}_sum{suffix} {histogram.sum:.6f}')
+        lines.append(f'{metric}_count{suffix} {histogram.count}')
+        return lines
+
+
+# Console level between INFO and WARNING for the run header and summary,
+# so --quiet keeps those while dropping per-page output
+NOTICE = 25
+logging.addLevelName(NOTICE, 'NOTICE')
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Writes console messages to stdout, keeping the progress line below them.
+    
+    Records logged with extra={'progress': True} overwrite each other on a
+    terminal; anywhere else they are written as ordinary lines.
+    """
+    
+    def __init__(self):
+        super().__init__(sys.stdout)
+        self.progress_shown = False
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = self.format(record)
+            if getattr(record, 'progress', False) and self.stream.isatty():
+                self.stream.write(f"\r{message}\033[K")
+                self.progress_shown = True
+            else:
+                if self.progress_shown:
+                    self.stream.write("\r\033[K")
+                    self.progress_shown = False
+                self.stream.write(message + "\n")
+            self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class ProgressReporter:
+    """Background thread that logs one aggregated progress line per interval."""
+    
+    def __init__(self, checker: 'BrokenLinkChecker', interval: float):
+        self.checker = checker
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='progress', daemon=True)
+        self.last = (time.monotonic(), 0, 0)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self):
+        checker = self.checker
+        now, pages, checks = time.monotonic(), checker.pages_crawled, len(checker.link_results)
+        last_time, last_pages, last_checks = self.last
+        elapsed = (now - last_time) or 1
+        self.last = (now, pages, checks)
+        checker.console.log(
+            NOTICE, "📈 %d pages (%.1f/s) | %d links checked (%.1f/s) | queue %d | broken %d",
+            pages, (pages - last_pages) / elapsed, checks, (checks - last_checks) / elapsed,
+            checker.queue_depth(), len(checker.broken_links), extra={'progress': True}
+        )
+
+
+def host_partition(url: str, partitions: int) -> int:
+    """Partition of a URL's host; stable across processes, unlike hash()."""
+    host = urlparse(url).netloc.lower().encode()
+    return int.from_bytes(hashlib.blake2b(host, digest_size=8).digest(), 'big') % partitions
+
+
+class SQLiteCrawlStore(SQLiteStore):
+    """Shared frontier and link results for a distributed crawl on one machine.
+    
+    Work items (pages to crawl and links to check) are deduplicated on their
+    normalized URL when they are enqueued and carry the partition of their
+    host, so only one worker ever requests a given host. A URL queued as a
+    check and then found as a crawlable page is upgraded to a page. Workers
+    claim items with a lease; items claimed by a worker that died are handed
+    out again once the lease runs out, to any worker that is idle, or
+    straight away when the worker is restarted. Every write is committed
+    straight away so other processes see it.
+    """
+    
+    SCHEMA = """
+        PRAGMA journal_mode=WAL;
+        CREATE TABLE IF NOT EXISTS work (
+            url_key TEXT PRIMARY KEY,
+            url TEXT,
+            kind TEXT,
+            link_type TEXT,
+            partition INTEGER,
+            state INTEGER DEFAULT 0,
+            claimed_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS work_by_partition ON work (partition, state);
+        CREATE TABLE IF NOT EXISTS results (
+            url_key TEXT PRIMARY KEY,
+            working INTEGER,
+            reason TEXT,
+            status_code INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS occurrences (
+            source_page TEXT,
+            url_key TEXT,
+            url TEXT,
+            link_text TEXT,
+            link_title TEXT,
+            link_type_html TEXT
+        );
+        CREATE TABLE IF NOT EXISTS redirects (
+            url_key TEXT PRIMARY KEY,
+            hops TEXT,
+            final_url TEXT
+        );
+        CREATE TABLE IF NOT EXISTS anchors (
+            url_key TEXT PRIMARY KEY,
+            anchors TEXT
+        );
+    """
+    COMMIT_EVERY = 1
+    TIMEOUT = 60.0
+    
+    PENDING, CLAIMED, DONE = 0, 1, 2
+
+    def reset(self):
+        with self.lock:
+            self.conn.executescript("DELETE FROM work; DELETE FROM results; DELETE FROM occurrences; "
+                                    "DELETE FROM redirects; DELETE FROM anchors;")
+
+    def enqueue(self, items: List[Tuple[str, str, str, str, int]]):
+        """Add (url_key, url, kind, link_type, partition) items not seen before.
+        
+        A page item for a URL already queued as a check turns it into a page
+        (pending again if the check is done), so it still gets crawled.
+        """
+        self.write_many(
+            "INSERT INTO work (url_key, url, kind, link_type, partition) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (url_key) DO UPDATE SET kind = 'page', url = excluded.url, state = 0 "
+            "WHERE work.kind = 'check' AND excluded.kind = 'page'",
+            items)
+
+    def claim(self, partition: int, limit: int, lease: float) -> List[Tuple[str, str, str, str]]:
+        """Claim up to limit pending items of a partition as (url_key, url, kind, link_type)."""
+        return self.claim_where("partition = ? AND (state = ? OR (state = ? AND claimed_at < ?))",
+                                (partition, self.PENDING, self.CLAIMED, time.time() - lease), limit)
+
+    def claim_expired(self, limit: int, lease: float) -> List[Tuple[str, str, str, str]]:
+        """Claim up to limit items of any partition whose lease ran out (their worker died)."""
+        return self.claim_where("state = ? AND claimed_at < ?", (self.CLAIMED, time.time() - lease), limit)
+
+    def claim_where(self, condition: str, params: Tuple, limit: int) -> List[Tuple[str, str, str, str]]:
+        now = time.time()
+        with self.lock:
+            # Take the write lock before reading, so no other worker claims the same rows
+            self.conn.commit()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    f"SELECT url_key, url, kind, link_type FROM work WHERE {condition} LIMIT ?", params + (limit,)
+                ).fetchall()
+                self.conn.executemany("UPDATE work SET state = ?, claimed_at = ? WHERE url_key = ?",
+                                      [(self.CLAIMED, now, row[0]) for row in rows])
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return rows
+
+    def release(self, partition: int):
+        """Hand a dead worker's claimed items back out, before it is restarted."""
+        self.write("UPDATE work SET state = ? WHERE partition = ? AND state = ?",
+                   (self.PENDING, partition, self.CLAIMED))
+
+    def complete(self, url_key: str, kind: str):
+        # An item upgraded to a page while it was being checked stays pending
+        self.write("UPDATE work SET state = ? WHERE url_key = ? AND kind = ?", (self.DONE, url_key, kind))
+
+    def put_result(self, url_key: str, result: Tuple[bool, str, int]):
+        self.write("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (url_key, int(result[0]), result[1], result[2]))
+
+    def put_redirect(self, url_key: str, redirect: Dict):
+        self.write("INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)",
+                   (url_key, json.dumps(redirect['hops']), redirect['final_url']))
+
+    def put_anchors(self, url_key: str, anchors: Set[str]):
+        self.write("INSERT OR REPLACE INTO anchors VALUES (?, ?)", (url_key, json.dumps(sorted(anchors))))
+
+    def add_occurrences(self, rows: List[Tuple[str, str, str, str, str, str]]):
+        """Record (source_page, url_key, url, text, title, type) for each link found on a page."""
+        self.write_many("INSERT INTO occurrences VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def unfinished(self) -> int:
+        return self.query("SELECT COUNT(*) FROM work WHERE state != ?", (self.DONE,))[0][0]
+
+    def items(self):
+        """Iterate over every (url_key, url, kind) that was enqueued."""
+        yield from self.conn.execute("SELECT url_key, url, kind FROM work")
+
+    def broken_occurrences(self):
+        """Iterate over (source_page, url, text, title, type, reason, status_code) for broken links."""
+        yield from self.conn.execute(
+            "SELECT o.source_page, o.url, o.link_text, o.link_title, o.link_type_html, r.reason, r.status_code "
+            "FROM occurrences o JOIN results r ON o.url_key = r.url_key WHERE r.working = 0 ORDER BY o.rowid"
+        )
+
+    def redirect_occurrences(self):
+        """Iterate over (source_page, url, text, title, type, redirect) for links that redirect."""
+        for row in self.conn.execute(
+            "SELECT o.source_page, o.url, o.link_text, o.link_title, o.link_type_html, d.hops, d.final_url "
+            "FROM occurrences o JOIN redirects d ON o.url_key = d.url_key ORDER BY o.rowid"
+        ):
+            yield row[:5] + ({'hops': [tuple(hop) for hop in json.loads(row[5])], 'final_url': row[6]},)
+
+    def fragment_occurrences(self):
+        """Iterate over (source_page, url, text, title, type, status_code) for working links with a #fragment."""
+        yield from self.conn.execute(
+            "SELECT o.source_page, o.url, o.link_text, o.link_title, o.link_type_html, r.status_code "
+            "FROM occurrences o JOIN results r ON o.url_key = r.url_key "
+            "WHERE r.working = 1 AND instr(o.url, '#') > 0 ORDER BY o.rowid"
+        )
+
+    def page_anchors(self):
+        """Iterate over (url_key, anchor names) for every crawled page."""
+        for url_key, anchors in self.conn.execute("SELECT url_key, anchors FROM anchors"):
+            yield url_key, json.loads(anchors)
+
+
+class RedisCrawlStore:
+    """SQLiteCrawlStore's interface on a Redis-compatible server, for crawls across machines.
+    
+    Takes any client with the redis-py API, so a stand-in (such as
+    fakeredis) can be used in place of a real server. Claimed items are kept
+    in a hash with their claim time until they are completed, so the items
+    of a dead worker can be released or reclaimed like with SQLite; removing
+    an item from that hash is what decides which worker gets it.
+    """
+    
+    CHUNK = 1000
+
+    def __init__(self, client, prefix: str = 'link_checker'):
+        self.client = client
+        self.prefix = prefix
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def reset(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+    def enqueue(self, items: List[Tuple[str, str, str, str, int]]):
+        if not items:
+            return
+        pipe = self.client.pipeline()
+        for url_key, url, kind, link_type, partition in items:
+            pipe.hsetnx(self.key('items'), url_key, json.dumps([url, kind]))
+        added = pipe.execute()
+        new_items = [item for item, is_new in zip(items, added) if is_new]
+        # Pages already queued as checks are queued again as pages
+        pages = [item for item, is_new in zip(items, added) if not is_new and item[2] == 'page']
+        if pages:
+            known = self.client.hmget(self.key('items'), [item[0] for item in pages])
+            for item, value in zip(pages, known):
+                if value is not None and json.loads(value)[1] == 'check':
+                    self.client.hset(self.key('items'), item[0], json.dumps([item[1], 'page']))
+                    new_items.append(item)
+        pipe = self.client.pipeline()
+        for url_key, url, kind, link_type, partition in new_items:
+            pipe.rpush(self.key(f"queue:{partition}"), json.dumps([url_key, url, kind, link_type, partition]))
+        pipe.incrby(self.key('unfinished'), len(new_items))
+        pipe.execute()
+
+    def claim(self, partition: int, limit: int, lease: float) -> List[Tuple[str, str, str, str]]:
+        pipe = self.client.pipeline()
+        for _ in range(limit):
+            pipe.lpop(self.key(f"queue:{partition}"))
+        items = [json.loads(item) for item in pipe.execute() if item is not None]
+        if items:
+            now = time.time()
+            self.client.hset(self.key('claimed'), mapping={
+                f"{item[2]}:{item[0]}": json.dumps([item, now]) for item in items
+            })
+        return [tuple(item[:4]) for item in items]
+
+    def claimed(self):
+        """Iterate over (claim field, item, claim time) for every claimed item."""
+        for field, value in self.client.hscan_iter(self.key('claimed')):
+            item, claimed_at = json.loads(value)
+            yield field, item, claimed_at
+
+    def claim_expired(self, limit: int, lease: float) -> List[Tuple[str, str, str, str]]:
+        expired = []
+        now = time.time()
+        for field, item, claimed_at in self.claimed():
+            if len(expired) >= limit:
+                break
+            # Only the worker whose HDEL removes the field takes the item over
+            if claimed_at < now - lease and self.client.hdel(self.key('claimed'), field):
+                self.client.hset(self.key('claimed'), field, json.dumps([item, now]))
+                expired.append(tuple(item[:4]))
+        return expired
+
+    def release(self, partition: int):
+        for field, item, claimed_at in self.claimed():
+            if item[4] == partition and self.client.hdel(self.key('claimed'), field):
+                self.client.lpush(self.key(f"queue:{partition}"), json.dumps(item))
+
+    def complete(self, url_key: str, kind: str):
+        # A reclaimed item can be completed by both workers; only the one whose HDEL removes it counts it
+        if self.client.hdel(self.key('claimed'), f"{kind}:{url_key}"):
+            self.client.decr(self.key('unfinished'))
+
+    def put_result(self, url_key: str, result: Tuple[bool, str, int]):
+        self.client.hset(self.key('results'), url_key, json.dumps(list(result)))
+
+    def put_redirect(self, url_key: str, redirect: Dict):
+        self.client.hset(self.key('redirects'), url_key, json.dumps(redirect))
+
+    def put_anchors(self, url_key: str, anchors: Set[str]):
+        self.client.hset(self.key('anchors'), url_key, json.dumps(sorted(anchors)))
+
+    def add_occurrences(self, rows: List[Tuple[str, str, str, str, str, str]]):
+        if rows:
+            self.client.rpush(self.key('occurrences'), *(json.dumps(row) for row in rows))
+
+    def unfinished(self) -> int:
+        return int(self.client.get(self.key('unfinished')) or 0)
+
+    def items(self):
+        for url_key, value in self.client.hscan_iter(self.key('items')):
+            url, kind = json.loads(value)
+            yield (url_key.decode() if isinstance(url_key, bytes) else url_key), url, kind
+
+    def joined_occurrences(self, name: str):
+        """Iterate over (occurrence row, JSON value from hash name) for occurrences with a value."""
+        start = 0
+        while True:
+            rows = [json.loads(row) for row in
+                    self.client.lrange(self.key('occurrences'), start, start + self.CHUNK - 1)]
+            if not rows:
+                return
+            start += len(rows)
+            values = self.client.hmget(self.key(name), [row[1] for row in rows])
+            for row, value in zip(rows, values):
+                if value is not None:
+                    yield row, json.loads(value)
+
+    def broken_occurrences(self):
+        for (source_page, url_key, url, text, title, link_type), result in self.joined_occurrences('results'):
+            working, reason, status_code = result
+            if not working:
+                yield source_page, url, text, title, link_type, reason, status_code
+
+    def redirect_occurrences(self):
+        for (source_page, url_key, url, text, title, link_type), redirect in self.joined_occurrences('redirects'):
+            redirect['hops'] = [tuple(hop) for hop in redirect['hops']]
+            yield source_page, url, text, title, link_type, redirect
+
+    def fragment_occurrences(self):
+        for (source_page, url_key, url, text, title, link_type), result in self.joined_occurrences('results'):
+            working, reason, status_code = result
+            if working and '#' in url:
+                yield source_page, url, text, title, link_type, status_code
+
+    def page_anchors(self):
+        for url_key, anchors in self.client.hscan_iter(self.key('anchors')):
+            yield (url_key.decode() if isinstance(url_key, bytes) else url_key), json.loads(anchors)
+
+    def close(self):
+        self.client.close()
+
+
+def open_crawl_store(location: str):
+    """Shared crawl store for a redis:// URL or an SQLite file path."""
+    if location.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is None:
+            raise ImportError("The redis package is needed for a Redis crawl store (pip install redis)")
+        return RedisCrawlStore(redis.Redis.from_url(location))
+    return SQLiteCrawlStore(location)
+
+
+def setup_console(level: str) -> Tuple[logging.Logger, logging.handlers.QueueListener]:
+    """Console logger writing to stdout through a queue, and the listener that drains it.
+    
+    Worker threads only enqueue records, so they never wait on the terminal:
+    per-link detail is logged at DEBUG, per-page at INFO, and the run header
+    and summary at NOTICE.
+    """
+    console = logging.getLogger(f"{__name__}.console")
+    console.setLevel(level.upper())
+    console.propagate = False
+    console_queue = queue.SimpleQueue()
+    console.handlers = [logging.handlers.QueueHandler(console_queue)]
+    listener = logging.handlers.QueueListener(console_queue, ConsoleHandler())
+    listener.start()
+    return console, listener
+
+
+class TransportStats:
+    """Connections opened per host and DNS cache use, counted by the transport layer.
+    
+    Kept apart from RunMetrics because in batch runs one transport serves
+    every site; RunMetrics reads it when metrics are written. Connect times
+    are kept per thread, since requests sent with requests open their
+    connections on the thread that sends them.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections: Dict[str, int] = {}
+        self.http2_requests: Dict[str, int] = {}
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+        self.local = threading.local()
+
+    def connection_opened(self, host: str):
+        with self.lock:
+            self.connections[host] = self.connections.get(host, 0) + 1
+
+    def connection_ready(self, seconds: float):
+        """Add the time a new connection took to set up to the calling thread's current request."""
+        self.local.connect_seconds = (getattr(self.local, 'connect_seconds', None) or 0.0) + seconds
+
+    def reset_connect_time(self):
+        self.local.connect_seconds = None
+
+    def connect_time(self) -> Optional[float]:
+        """Seconds the calling thread spent setting up connections since reset_connect_time(), or None."""
+        return getattr(self.local, 'connect_seconds', None)
+
+    def http2_request(self, host: str):
+        with self.lock:
+            self.http2_requests[host] = self.http2_requests.get(host, 0) + 1
+
+    def dns_lookup(self, cache_hit: bool):
+        with self.lock:
+            if cache_hit:
+                self.dns_cache_hits += 1
+            else:
+                self.dns_lookups += 1
+
+
+class DNSCache:
+    """In-process cache of getaddrinfo() results with a TTL.
+    
+    The system resolver is often uncached, so every new connection costs a
+    lookup. install() puts the cache in front of socket.getaddrinfo, which
+    requests, httpx and aiohttp's threaded resolver all go through, until
+    uninstall() puts the previous resolver back; the checker does that when
+    it is closed. Failed lookups are cached for NEGATIVE_TTL seconds, and
+    the oldest entries are dropped beyond MAX_ENTRIES.
+    """
+    
+    NEGATIVE_TTL = 30
+    MAX_ENTRIES = 10000
+    
+    def __init__(self, ttl: float, stats: TransportStats):
+        self.ttl = ttl
+        self.stats = stats
+        self.lock = threading.Lock()
+        # Lookup arguments -> (expiry time, addresses or gaierror), oldest first
+        self.entries: Dict[Tuple, Tuple[float, object]] = {}
+        # The resolver in place when the cache was installed
+        self.resolve = socket.getaddrinfo
+
+    @classmethod
+    def from_config(cls, config: Dict, stats: TransportStats) -> Optional['DNSCache']:
+        """Installed cache for a config's dns_cache_ttl, or None if it is 0."""
+        ttl = config.get('dns_cache_ttl', 300)
+        if not ttl:
+            return None
+        cache = cls(ttl, stats)
+        cache.install()
+        return cache
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.stats.dns_lookup(True)
+            if isinstance(entry[1], socket.gaierror):
+                raise socket.gaierror(*entry[1].args)
+            return entry[1]
+        self.stats.dns_lookup(False)
+        try:
+            result = self.resolve(host, port, family, type, proto, flags)
+        except socket.gaierror as e:
+            self.store(key, self.NEGATIVE_TTL, e)
+            raise
+        self.store(key, self.ttl, result)
+        return result
+
+    def store(self, key: Tuple, ttl: float, result: object):
+        with self.lock:
+            # Re-inserted, so entries stay in the order they expire
+            self.entries.pop(key, None)
+            while len(self.entries) >= self.MAX_ENTRIES:
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = (time.monotonic() + ttl, result)
+
+    def install(self):
+        self.resolve = socket.getaddrinfo
+        socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        if socket.getaddrinfo == self.getaddrinfo:
+            socket.getaddrinfo = self.resolve
+
+
+def stats_host(host: str, port: Optional[int], default_port: int) -> str:
+    """Host key as RunMetrics uses it: the URL's netloc, without a default port."""
+    if port is None or port == default_port:
+        return host.lower()
+    return f"{host.lower()}:{port}"
+
+
+class CountingPoolManager(PoolManager):
+    """PoolManager whose pools report every socket they open, and how long connecting took, to TransportStats.
+    
+    Counted where sockets are opened, since urllib3 reconnects a pooled
+    connection object in place when the server has closed it; connect() is
+    timed too, to include TLS setup. The hooks are set on the pool and
+    connection objects rather than subclassing them, so error messages keep
+    urllib3's class names.
+    """
+    
+    def __init__(self, stats: TransportStats, *args, **kwargs):
+        self.stats = stats
+        super().__init__(*args, **kwargs)
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        stats = self.stats
+        new_conn = pool._new_conn
+        
+        def new_counting_conn():
+            conn = new_conn()
+            open_socket = conn._new_conn
+            connect = conn.connect
+            
+            def counting_open_socket():
+                stats.connection_opened(stats_host(conn.host, conn.port, conn.default_port))
+                return open_socket()
+            
+            def timed_connect():
+                started = time.perf_counter()
+                connect()
+                stats.connection_ready(time.perf_counter() - started)
+            conn._new_conn = counting_open_socket
+            conn.connect = timed_connect
+            return conn
+        pool._new_conn = new_counting_conn
+        return pool
+
+
+class TransportAdapter(HTTPAdapter):
+    """HTTPAdapter that reports every new connection it opens to TransportStats."""
+    
+    def __init__(self, stats: TransportStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=DEFAULT_POOLBLOCK, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = CountingPoolManager(self.stats, num_pools=connections, maxsize=maxsize, block=block,
+                                               **pool_kwargs)
+
+
+class HTTP2Body:
+    """The raw body of an HTTP2Adapter response, in the shape requests reads it."""
+    
+    def __init__(self, response):
+        self.response = response
+        self.chunks = response.iter_bytes()
+        # Bytes received but not read yet
+        self.buffer = bytearray()
+
+    def stream(self, chunk_size: int, decode_content: bool = True):
+        while True:
+            data = self.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+    def read(self, amt: Optional[int] = None, decode_content: bool = True) -> bytes:
+        """Up to amt bytes, fewer only at the end of the body; all the rest of it if amt is None."""
+        if amt is None:
+            self.buffer.extend(b''.join(self.chunks))
+            amt = len(self.buffer)
+        while len(self.buffer) < amt:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer.extend(chunk)
+        data = bytes(self.buffer[:amt])
+        del self.buffer[:amt]
+        return data
+
+    def close(self):
+        self.response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Transport adapter that sends requests with httpx, so hosts that offer HTTP/2 get it.
+    
+    HTTP/2 is negotiated per host over TLS; other hosts get HTTP/1.1 from
+    the same client. Concurrent requests to an HTTP/2 host share one
+    multiplexed connection. httpx retries connection failures, and error
+    statuses are retried as max_retries says, the way HTTPAdapter does.
+    Each combination of verify, cert and proxy gets its own client.
+    """
+    
+    def __init__(self, stats: TransportStats, max_keepalive: int, max_retries: Retry):
+        super().__init__()
+        self.stats = stats
+        self.max_keepalive = max_keepalive
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        # (verify, cert, proxy URL) -> client
+        self.clients: Dict[Tuple, httpx.Client] = {}
+
+    def client(self, verify, cert, proxy: Optional[str]) -> httpx.Client:
+        key = (verify, cert, proxy)
+        with self.lock:
+            if key not in self.clients:
+                # requests has already merged the environment's CA bundle and proxies in
+                self.clients[key] = httpx.Client(
+                    transport=httpx.HTTPTransport(
+                        verify=self.ssl_context(verify, cert),
+                        proxy=proxy,
+                        http2=True,
+                        retries=3,
+                        limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.max_keepalive)
+                    ),
+                    follow_redirects=False,
+                    trust_env=False
+                )
+            return self.clients[key]
+
+    @staticmethod
+    def ssl_context(verify, cert) -> ssl.SSLContext:
+        """SSL context for requests' verify (bool or CA bundle path) and cert (path or (cert, key)) arguments."""
+        if verify is False:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        else:
+            ca_path = requests.certs.where() if verify is True else verify
+            if os.path.isdir(ca_path):
+                context = ssl.create_default_context(capath=ca_path)
+            else:
+                context = ssl.create_default_context(cafile=ca_path)
+        if cert:
+            context.load_cert_chain(*((cert,) if isinstance(cert, str) else cert))
+        return context
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        parsed = urlparse(request.url)
+        host = stats_host(parsed.hostname or '', parsed.port, 443 if parsed.scheme == 'https' else 80)
+        
+        # A new connection is ready once TCP, and TLS for HTTPS, is set up
+        ready_event = 'connection.start_tls.complete' if parsed.scheme == 'https' else 'connection.connect_tcp.complete'
+        connect_started = []
+        
+        def trace(event_name: str, info: Dict):
+            if event_name == 'connection.connect_tcp.started':
+                connect_started.append(time.perf_counter())
+            if event_name == 'connection.connect_tcp.complete':
+                self.stats.connection_opened(host)
+            if event_name == ready_event and connect_started:
+                self.stats.connection_ready(time.perf_counter() - connect_started.pop())
+        
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            client = self.client(verify, cert, select_proxy(request.url, proxies))
+        except OSError as e:
+            raise requests.exceptions.SSLError(e, request=request)
+        retries = self.max_retries
+        while True:
+            try:
+                upstream = client.send(
+                    client.build_request(request.method, request.url, headers=dict(request.headers),
+                                         content=request.body, timeout=timeout, extensions={'trace': trace}),
+                    stream=True
+                )
+            except httpx.ProxyError as e:
+                raise requests.exceptions.ProxyError(e, request=request)
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(e, request=request)
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ConnectionError(e, request=request)
+            if not retries.is_retry(request.method, upstream.status_code):
+                break
+            # The bookkeeping urllib3's Retry.increment does for a status retry
+            retries = retries.new(
+                total=None if retries.total is None else retries.total - 1,
+                status=None if retries.status is None else retries.status - 1,
+                history=retries.history + (RequestHistory(request.method, request.url, None,
+                                                          upstream.status_code, None),)
+            )
+            if retries.is_exhausted():
+                if not retries.raise_on_status:
+                    break
+                upstream.close()
+                raise requests.exceptions.RetryError(
+                    f"{host}: Max retries exceeded with url: {parsed.path or '/'} "
+                    f"(too many {upstream.status_code} error responses)", request=request)
+            upstream.close()
+            time.sleep(retries.get_backoff_time())
+        if upstream.http_version == 'HTTP/2':
+            self.stats.http2_request(host)
+        
+        response = requests.Response()
+        response.status_code = upstream.status_code
+        response.reason = upstream.reason_phrase
+        response.headers = CaseInsensitiveDict(upstream.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = HTTP2Body(upstream)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients.clear()
+
+
+def create_session(pool_connections: int, pool_maxsize: int, stats: TransportStats,
+                   http2: bool = False) -> requests.Session:
+    """Session with retries and connection pooling.
+    
+    Server errors are retried by urllib3; 429/503 responses are left to
+    HostRateLimiter, which backs off the host and retries them itself.
+    pool_connections is how many hosts keep a pool; pool_maxsize should cover
+    the number of threads that can request one host at once, or connections
+    get thrown away ("connection pool is full"). With http2, HTTPS requests
+    go through HTTP2Adapter when httpx and h2 are installed.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 504],
+        respect_retry_after_header=False
+    )
+    adapter = TransportAdapter(
+        stats,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if http2:
+        try:
+            if httpx is None:
+                raise ImportError("httpx is not installed")
+            session.mount("https://", HTTP2Adapter(stats, pool_connections * pool_maxsize, retries))
+        except ImportError as e:
+            logging.getLogger(__name__).warning(f"HTTP/2 is not available ({e}) - using HTTP/1.1")
+    
+    # Set user agent to look like a real browser
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    })
+    return session
+
+
+class BatchResources:
+    """Connections, rate limits and link verdicts shared by every site in a batch run.
+    
+    Link verdicts are keyed on the normalized URL, so a CDN, social or
+    partner link is checked once for all the sites that link to it, and the
+    shared rate limiter keeps the combined load on such hosts polite.
+    """
+    
+    def __init__(self, config: Dict, use_cache: bool, pool_maxsize: int):
+        self.transport_stats = TransportStats()
+        self.dns_cache = DNSCache.from_config(config, self.transport_stats)
+        self.session = create_session(config.get('connection_pools', 100), pool_maxsize, self.transport_stats,
+                                      config.get('http2', False))
+        self.rate_limiter = HostRateLimiter.from_config(config)
+        self.head_unsupported_hosts: Set[str] = set()
+        self.link_results: Dict[str, Tuple[bool, str, int]] = {}
+        self.redirect_chains: Dict[str, Dict] = {}
+        self.verdict_cache = LinkVerdictCache.from_config(config.get('cache', {})) if use_cache else None
+        self.redirects = RedirectCache(self.verdict_cache)
+        self.console, self.console_listener = setup_console(config.get('console_level', 'NOTICE'))
+
+    def close(self):
+        if self.verdict_cache:
+            self.verdict_cache.close()
+        if self.dns_cache:
+            self.dns_cache.uninstall()
+        self.session.close()
+        self.console_listener.stop()
+
 
 class BrokenLinkChecker:
-    def __init__(self, config_file: str = "link_checker_config.json"):
-        """Initialize the broken link checker with configuration."""
-        self.config = self.load_config(config_file)
-        self.visited_urls: Set[str] = set()
-        self.broken_links: List[Dict] = []
+    def __init__(self, config_file: str = "link_checker_config.json", use_cache: bool = True,
+                 shared: Optional['BatchResources'] = None, config: Optional[Dict] = None,
+                 site: Optional[str] = None):
+        """Initialize the broken link checker with configuration.
+        
+        In batch runs, shared holds the connections, rate limiter and link
+        verdicts used by all sites, and site is a slug that is added to the
+        names of the site's output files. A config that was already loaded
+        (and adjusted from the command line) can be passed instead of reading
+        config_file again.
+        """
+        self.config_file = config_file
+        self.use_cache = use_cache
+        self.shared = shared
+        self.site = site
+        self.config = config if config is not None else self.load_config(config_file)
+        # A config passed in (to a distributed worker) already has the site's paths
+        if site and config is None:
+            self.use_site_paths()
+        visited_config = self.config.get('visited_set', {})
+        self.visited_urls = VisitedSet(
+            visited_config.get('mode', 'exact'),
+            visited_config.get('expected_urls', 1000000),
+            visited_config.get('false_positive_rate', 0.001)
+        )
+        # Broken link records go straight to the results sink; reports stream them back
+        results_config = self.config.get('results', {})
+        sink_name = results_config.get('sink', 'sqlite')
+        if sink_name not in RESULT_SINKS:
+            raise ValueError(f"Unknown results sink {sink_name!r}; choose from {', '.join(RESULT_SINKS)}")
+        sink_path = results_config.get('path') or (
+            None if sink_name == 'sqlite' else self.output_path(f"broken_links.{sink_name}"))
+        self.broken_links: ResultSink = RESULT_SINKS[sink_name](sink_path)
         self.checked_external_links: Set[str] = set()
         
-        # Setup logging
+        # Run-wide link verdict cache keyed on normalize_url(), shared by all pages
+        # (and by all sites in a batch run)
+        self.link_results: Dict[str, Tuple[bool, str, int]] = shared.link_results if shared else {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Redirects followed for each checked URL, same keys as link_results:
+        # {'hops': [(url, status_code), ...], 'final_url': url}
+        self.redirect_chains: Dict[str, Dict] = shared.redirect_chains if shared else {}
+        # Internal links that point at redirects, keyed on normalized URL:
+        # {'url', 'text', 'hops', 'final_url', 'pages': {source page: link text}}
+        self.redirected_links: Dict[str, Dict] = {}
+        self.redirect_lock = threading.Lock()
+        
+        # Anchor names of parsed pages, and the fragment links waiting to be
+        # resolved against them when the crawl is done:
+        # normalized target URL -> fragment -> [(source page, link_data, status_code)]
+        self.check_anchors = self.config.get('anchors', {}).get('enabled', True)
+        self.page_anchors: Dict[str, frozenset] = {}
+        self.fragment_links: Dict[str, Dict[str, List[Tuple[str, Dict[str, str], int]]]] = {}
+        self.fragment_lock = threading.Lock()
+        self.checked_anchors = 0
+        self.missing_anchors = 0
+        
+        # url() and @import references of fetched stylesheets, waiting to be checked:
+        # normalized stylesheet URL -> links
+        self.scan_stylesheets = self.config.get('scan_stylesheets', False)
+        self.stylesheet_links: Dict[str, List[Dict[str, str]]] = {}
+        
+        # Responses of internal pages fetched by check_link and not crawled yet,
+        # so crawl_page can parse them without a second GET:
+        # normalized URL -> (status_code, content_type, html, validators)
+        self.page_store = PageStore(int(self.config.get('frontier', {}).get('page_store_mb', 32) * 1024 * 1024))
+        
+        # Page hashes and links from earlier runs, opened by crawl_website in incremental mode
+        self.page_fingerprints: Optional[PageFingerprintStore] = None
+        self.changed_pages = 0
+        self.unchanged_pages = 0
+        
+        # Crawl progress log for --resume, opened by crawl_website when enabled
+        self.checkpoint: Optional[CrawlCheckpoint] = None
+        
+        # Request timings and throughput, written out at the end of the run
+        self.metrics = RunMetrics()
+        self.pages_crawled = 0
+        # Crawl queue length for the progress line, set by the crawl engine
+        self.queue_depth = lambda: 0
+        
+        # Crawl limits and page priorities, set up by crawl_website from the
+        # "budget" and "frontier.priority" settings
+        self.budget = CrawlBudget()
+        self.prioritized = False
+        self.priority_config: Dict = {}
+        # Normalized URL -> sitemap <priority>, and -> number of links to it found so far
+        self.sitemap_priorities: Dict[str, float] = {}
+        self.inlinks: Dict[str, int] = {}
+        # Normalized URLs of links that were broken, and pages that had broken links, in recent runs
+        self.broken_history: Set[str] = set()
+        self.recorded_broken_pages: Set[str] = set()
+        
+        # Setup logging; sites in a batch run each log to their own file
+        log_format = '%(asctime)s - %(levelname)s - %(message)s'
         logging.basicConfig(
             level=getattr(logging, self.config.get('log_level', 'INFO')),
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('link_checker.log'),
-                logging.StreamHandler()
-            ]
+            format=log_format,
+            handlers=[logging.StreamHandler()] + ([] if site else [logging.FileHandler('link_checker.log')])
         )
-        self.logger = logging.getLogger(__name__)
-        
-        # Setup session with retries and connection pooling
-        self.session = requests.Session()
-        
-        # Configure connection pooling to prevent "connection pool is full" warnings
-        adapter = HTTPAdapter(
-            pool_connections=10,  # Number of connection pools
-            pool_maxsize=20,      # Max connections per pool
-            max_retries=Retry(
-                total=3,
-                backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504]
-            )
+        self.logger = logging.getLogger(f"{__name__}.{site}" if site else __name__)
+        self.log_handler = None
+        if site and not self.logger.handlers:
+            self.log_handler = logging.FileHandler(self.output_path('link_checker.log'))
+            self.log_handler.setFormatter(logging.Formatter(log_format))
+            self.logger.addHandler(self.log_handler)
+        
+        if shared:
+            self.console, self.console_listener = shared.console, shared.console_listener
+            self.transport_stats = shared.transport_stats
+            self.dns_cache = shared.dns_cache
+            self.session = shared.session
+        else:
+            self.console, self.console_listener = setup_console(self.config.get('console_level', 'INFO'))
+            self.transport_stats = TransportStats()
+            self.dns_cache = DNSCache.from_config(self.config, self.transport_stats)
+            # One pooled connection per worker thread, plus the crawl loop's own
+            self.session = create_session(self.config.get('connection_pools', 100), self.config['max_workers'] + 1,
+                                          self.transport_stats, self.config.get('http2', False))
+        self.metrics.transport = self.transport_stats
+        
+        # Exclusion patterns compiled once, decisions memoized per normalized URL
+        self.url_filter = UrlFilter(
+            self.config['start_url'],
+            self.config['exclude_patterns'],
+            self.config.get('exclude_link_check_patterns', []),
+            self.normalize_url
         )
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
         
-        # Set user agent to look like a real browser
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Link extraction backend; falls back to BeautifulSoup if its parser isn't installed
+        extractor_name = self.config.get('extractor', 'bs4')
+        if extractor_name not in LINK_EXTRACTORS:
+            self.logger.warning(f"Unknown extractor '{extractor_name}' - using bs4")
+            extractor_name = 'bs4'
+        try:
+            importlib.import_module(LINK_EXTRACTORS[extractor_name][1])
+        except ImportError:
+            self.logger.warning(f"{LINK_EXTRACTORS[extractor_name][1]} is not installed - using the bs4 extractor")
+            extractor_name = 'bs4'
+        self.extractor_name = extractor_name
+        self.extractor = LINK_EXTRACTORS[extractor_name][0]
+        
+        # The rest is shared between sites in a batch run
+        if shared:
+            self.rate_limiter = shared.rate_limiter
+            self.head_unsupported_hosts = shared.head_unsupported_hosts
+            self.verdict_cache = shared.verdict_cache
+            self.redirects = shared.redirects
+        else:
+            # Per-host politeness; defaults to one request per delay_between_requests
+            self.rate_limiter = HostRateLimiter.from_config(self.config)
+            
+            # Hosts that answered HEAD with 405/501; they get a streamed GET straight away
+            self.head_unsupported_hosts: Set[str] = set()
+            
+            # Link verdicts persisted between runs
+            self.verdict_cache = LinkVerdictCache.from_config(self.config.get('cache', {})) if use_cache else None
+            
+            # Permanent redirect hops, so known chains are followed without requests
+            self.redirects = RedirectCache(self.verdict_cache)
+
+    def output_path(self, path: str) -> str:
+        """Add the batch site slug to an output file name, so sites don't share files."""
+        if not self.site or '://' in path:
+            return path
+        root, extension = os.path.splitext(path)
+        return f"{root}_{self.site}{extension}"
+
+    def use_site_paths(self):
+        """Give every output file of a batch site its own name, in the config that workers get too."""
+        for section, setting, default in (('results', 'path', None),
+                                          ('checkpoint', 'path', 'link_checker_checkpoint.jsonl'),
+                                          ('incremental', 'path', 'link_checker_pages.sqlite'),
+                                          ('distributed', 'store', 'link_checker_crawl.sqlite'),
+                                          ('metrics', 'json_path', None),
+                                          ('metrics', 'prometheus_textfile', None)):
+            section_config = self.config.setdefault(section, {})
+            path = section_config.get(setting, default)
+            if path:
+                section_config[setting] = self.output_path(path)
 
     def load_config(self, config_file: str) -> Dict:
         """Load configuration from JSON file or create default."""
@@ -85,9 +2646,86 @@ class BrokenLinkChecker:
             ],
             "include_external_links": True,
             "max_workers": 3,
+            "connection_pools": 100,
+            "dns_cache_ttl": 300,
+            "http2": False,
             "delay_between_requests": 1,
             "timeout": 30,
+            "cache": {
+                "enabled": True,
+                "path": "link_checker_cache.sqlite",
+                "ttl_hours": LinkVerdictCache.DEFAULT_TTL_HOURS,
+                "broken_ttl_hours": 6,
+                "redirect_ttl_hours": 168
+            },
+            "incremental": {
+                "enabled": False,
+                "path": "link_checker_pages.sqlite",
+                "sitemap_urls": []
+            },
+            "anchors": {
+                "enabled": True,
+                "external": False
+            },
+            "scan_stylesheets": False,
+            "head_requests": True,
+            "head_unreliable_hosts": [],
+            "confirm_head_failures": True,
+            "frontier": {
+                "max_in_memory": 0,
+                "spill_dir": None,
+                "page_store_mb": 32,
+                "priority": {
+                    "enabled": False,
+                    "depth": 1.0,
+                    "sitemap": 1.0,
+                    "inlinks": 1.0,
+                    "broken_history": 2.0,
+                    "history_days": 7
+                }
+            },
+            "budget": {
+                "max_pages": 0,
+                "max_depth": None,
+                "max_requests_per_host": 0,
+                "max_seconds": 0
+            },
+            "visited_set": {
+                "mode": "exact",
+                "expected_urls": 1000000,
+                "false_positive_rate": 0.001
+            },
+            "checkpoint": {
+                "enabled": False,
+                "path": "link_checker_checkpoint.jsonl",
+                "flush_interval": 5,
+                "resume": False
+            },
+            "results": {
+                "sink": "sqlite",
+                "path": None
+            },
+            "metrics": {
+                "json_path": None,
+                "prometheus_textfile": None
+            },
+            "extractor": "bs4",
+            "parse_workers": 0,
+            "max_pending_parses": 0,
+            "engine": "threads",
+            "distributed": {
+                "store": "link_checker_crawl.sqlite",
+                "workers": 4,
+                "spawn_workers": True,
+                "batch_size": 20,
+                "lease_seconds": 600
+            },
+            "async_concurrency": 20,
+            "async_per_host_concurrency": 4,
+            "async_queue_size": 100,
             "log_level": "INFO",
+            "console_level": "INFO",
+            "progress_interval": None,
             "email": {
                 "enabled": True,
                 "smtp_server": "smtp.gmail.com",
@@ -95,7 +2733,9 @@ class BrokenLinkChecker:
                 "from_email": "your_email@gmail.com",
                 "from_password": "your_app_password",
                 "to_emails": ["your_email@gmail.com"],
-                "subject": "Broken Links Report for {domain}"
+                "subject": "Broken Links Report for {domain}",
+                "max_listed_links": 100,
+                "max_attachment_mb": 10
             }
         }
         
@@ -116,37 +2756,13 @@ class BrokenLinkChecker:
 
     def should_check_url(self, url: str) -> bool:
         """Check if URL should be checked for broken links (more aggressive filtering)."""
-        import re
-        
-        # Check link-specific exclusion patterns (more aggressive)
-        for pattern in self.config.get('exclude_link_check_patterns', []):
-            if re.search(pattern, url, re.IGNORECASE):
-                return False
-        
-        # Check general exclusion patterns
-        for pattern in self.config['exclude_patterns']:
-            if re.search(pattern, url, re.IGNORECASE):
-                return False
-        
-        return True
+        # Link-specific and general exclusion patterns
+        return self.url_filter.should_check(url)
 
     def should_crawl_url(self, url: str) -> bool:
         """Check if URL should be crawled for more pages (less aggressive - only basic exclusions)."""
-        import re
-        
-        # Must be from the same domain
-        start_domain = urlparse(self.config['start_url']).netloc
-        url_domain = urlparse(url).netloc
-        
-        if url_domain != start_domain:
-            return False
-        
-        # Only check basic exclusion patterns for crawling (not the aggressive problematic patterns)
-        for pattern in self.config['exclude_patterns']:
-            if re.search(pattern, url, re.IGNORECASE):
-                return False
-        
-        return True
+        # Same domain, and only the basic exclusion patterns (not the aggressive problematic patterns)
+        return self.url_filter.should_crawl(url)
 
     def normalize_url(self, url: str) -> str:
         """Normalize URL by removing fragments and converting to lowercase."""
@@ -161,105 +2777,670 @@ class BrokenLinkChecker:
         ))
         return normalized
 
-    def check_link(self, url: str, source_page: str) -> Tuple[bool, str, int]:
-        """Check if a single link is working."""
-        try:
-            print(f"    Checking: {url}")
-            response = self.session.get(url, timeout=self.config['timeout'], allow_redirects=True)
-            status = "✅ OK" if response.status_code < 400 else "❌ BROKEN"
-            print(f"    {status} [{response.status_code}] {url}")
-            return response.status_code < 400, response.reason, response.status_code
-        except requests.exceptions.RequestException as e:
-            print(f"    ❌ ERROR [0] {url} - {str(e)}")
-            return False, str(e), 0
+    def send_request(self, method: str, url: str, kind: str = 'check', **kwargs) -> requests.Response:
+        """Send a request through the per-host rate limiter, recording its timings as kind.
+        
+        For streamed responses only the headers are timed here; the body is
+        added by whoever reads it. 429/503 responses slow the host down in the
+        rate limiter and are retried once it allows another request.
+        """
+        for attempt in range(HostRateLimiter.THROTTLE_RETRIES + 1):
+            self.metrics.record_wait(url, self.rate_limiter.acquire(url))
+            self.budget.count_request(url)
+            # The transport adds the connect time of any connection the request opens
+            self.transport_stats.reset_connect_time()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.config['timeout'], **kwargs)
+            except requests.exceptions.RequestException:
+                self.metrics.record_request(kind, url, 0, None, time.perf_counter() - started,
+                                            connect=self.transport_stats.connect_time())
+                raise
+            retries = getattr(response.raw, 'retries', None)
+            self.metrics.record_request(
+                kind, url, response.status_code, response.elapsed.total_seconds(), time.perf_counter() - started,
+                nbytes=0 if kwargs.get('stream') else len(response.content),
+                retries=(len(retries.history) if retries else 0) + (attempt > 0),
+                connect=self.transport_stats.connect_time()
+            )
+            self.rate_limiter.update(url, response.status_code, response.headers.get('Retry-After'))
+            if (response.status_code not in HostRateLimiter.THROTTLE_STATUSES
+                    or attempt == HostRateLimiter.THROTTLE_RETRIES or not self.budget.allows_request(url)):
+                return response
+            self.console.debug(f"    ⏳ THROTTLED [{response.status_code}] {url} - retrying")
+            response.close()
+
+    def follow_redirects(self, method: str, url: str, kind: str = 'check', **kwargs) -> requests.Response:
+        """send_request() that follows redirects itself, skipping hops already in the redirect cache.
+        
+        New permanent hops are added to the cache, and the whole chain is
+        kept in redirect_chains for the report.
+        """
+        max_redirects = self.session.max_redirects
+        hops: List[Tuple[str, int]] = []
+        current = url
+        while True:
+            current = self.redirects.follow(current, hops, max_redirects)
+            if len(hops) >= max_redirects:
+                raise requests.exceptions.TooManyRedirects(f"Exceeded {max_redirects} redirects")
+            response = self.send_request(method, current, kind, allow_redirects=False, **kwargs)
+            target = self.session.get_redirect_target(response)
+            if target is None:
+                break
+            response.close()
+            target = urljoin(current, target)
+            self.redirects.add(current, target, response.status_code)
+            hops.append((current, response.status_code))
+            current = target
+        self.store_redirect_chain(url, hops, current)
+        return response
+
+    def replay_redirect_chain(self, url: str):
+        """Rebuild the redirects of a link answered from the verdict cache from the known hops."""
+        hops: List[Tuple[str, int]] = []
+        final_url = self.redirects.follow(url, hops, self.session.max_redirects)
+        self.store_redirect_chain(url, hops, final_url)
+
+    def store_redirect_chain(self, url: str, hops: List[Tuple[str, int]], final_url: str):
+        """Remember the redirects between url and final_url (and log them to the checkpoint)."""
+        if not hops:
+            return
+        cache_key = self.normalize_url(url)
+        self.redirect_chains[cache_key] = {'hops': hops, 'final_url': final_url}
+        if self.checkpoint:
+            self.checkpoint.log('redirect', key=cache_key, hops=hops, final_url=final_url)
+
+    def use_head(self, url: str) -> bool:
+        """Check whether a link should be checked with HEAD before any GET."""
+        if not self.config.get('head_requests', True):
+            return False
+        parsed = urlparse(url)
+        if parsed.netloc.lower() in self.head_unsupported_hosts:
+            return False
+        hostname = parsed.hostname or ''
+        return not any(fnmatch(hostname, pattern.lower())
+                       for pattern in self.config.get('head_unreliable_hosts', []))
+
+    def probe_link(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Check a link with HEAD, falling back to a GET that never reads the body."""
+        if self.use_head(url):
+            response = self.follow_redirects('HEAD', url, headers=headers)
+            if response.status_code in (405, 501):
+                self.logger.debug(f"HEAD not supported by {urlparse(url).netloc}, using GET")
+                self.head_unsupported_hosts.add(urlparse(url).netloc.lower())
+            elif response.status_code < 400 or not self.config.get('confirm_head_failures', True):
+                return response
+        
+        # Only the status line and headers are read; closing drops the body
+        response = self.follow_redirects('GET', url, stream=True, headers=headers)
+        response.close()
+        return response
+
+    def cached_link_entry(self, url: str, link_type: str = 'link') -> Optional[Dict]:
+        """Persistent cache entry for a link, or None if it has to be fetched normally."""
+        if self.verdict_cache is None or self.scans_stylesheet(link_type):
+            # Stylesheets are fetched in full when their url() references are checked
+            return None
+        entry = self.verdict_cache.get(url)
+        # HTML pages we will crawl need their body anyway
+        if entry and 'text/html' in entry['content_type'] and self.should_crawl_url(url):
+            return None
+        return entry
+
+    def scans_stylesheet(self, link_type: str) -> bool:
+        """Whether links of this type are downloaded to check their url() references."""
+        return self.scan_stylesheets and link_type == 'stylesheet'
+
+    def scan_stylesheet(self, url: str, response: requests.Response):
+        """Keep the url() and @import references of a fetched stylesheet for checking."""
+        if response.status_code != 200 or 'text/css' not in response.headers.get('content-type', '').lower():
+            return
+        started = time.perf_counter()
+        css = response.text
+        self.metrics.record_body(url, time.perf_counter() - started, len(response.content))
+        self.stylesheet_links[self.normalize_url(url)] = extract_css_links(css, response.url)
+
+    def expects_page(self, url: str, link_type: str) -> bool:
+        """Whether a crawlable link is likely an HTML page, judged by its type and extension.
+        
+        Likely pages are checked with a GET whose body crawl_page reuses;
+        anything else gets a HEAD.
+        """
+        if link_type in NON_PAGE_LINK_TYPES:
+            return False
+        return os.path.splitext(urlparse(url).path)[1].lower() not in NON_PAGE_EXTENSIONS
+
+    def store_resource_response(self, url: str, status_code: int, content_type: str):
+        """Keep the status of a crawlable non-page resource checked with HEAD, so crawl_page skips it.
+        
+        If it turned out to be an HTML page, nothing is kept and crawl_page fetches it.
+        """
+        if status_code != 200 or 'text/html' not in content_type:
+            self.page_store[self.normalize_url(url)] = (status_code, content_type, '', {})
+
+    def use_cached_entry(self, url: str, entry: Dict) -> Tuple[bool, str, int]:
+        """Turn a persistent cache entry into a verdict for this run."""
+        if self.should_crawl_url(url):
+            # Lets crawl_page skip non-HTML resources without fetching them
+            self.page_store[self.normalize_url(url)] = (entry['status_code'], entry['content_type'], '', {})
+        return 0 < entry['status_code'] < 400, entry['reason'], entry['status_code']
+
+    def response_validators(self, headers) -> Dict[str, Optional[str]]:
+        """ETag/Last-Modified of a response, for later conditional requests."""
+        return {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+    def store_page_response(self, url: str, response: requests.Response, streamed: bool = False):
+        """Keep the status and HTML body of a crawlable page for crawl_page."""
+        content_type = response.headers.get('content-type', '').lower()
+        html = ''
+        if response.status_code == 200 and 'text/html' in content_type:
+            started = time.perf_counter()
+            html = response.text
+            if streamed:
+                self.metrics.record_body(url, time.perf_counter() - started, len(response.content))
+        self.page_store[self.normalize_url(url)] = (
+            response.status_code, content_type, html, self.response_validators(response.headers)
+        )
+
+    def check_link(self, url: str, source_page: str, link_type: str = 'link') -> Optional[Tuple[bool, str, int]]:
+        """Check if a single link is working.
+        
+        Returns None, leaving the link unchecked, if the budget doesn't allow
+        another request; fresh cached verdicts are still used.
+        """
+        entry = self.cached_link_entry(url, link_type)
+        if entry:
+            if self.verdict_cache.is_fresh(entry, link_type, self.url_filter.is_internal(url)):
+                self.verdict_cache.fresh_hits += 1
+                self.console.debug(f"    💾 CACHED [{entry['status_code']}] {url}")
+                self.replay_redirect_chain(url)
+                return self.use_cached_entry(url, entry)
+        if not self.budget.allows_request(url):
+            self.budget.skip_link(self.normalize_url(url))
+            self.console.debug(f"    ⏱️  NOT CHECKED (budget) {url}")
+            return None
+        headers = self.verdict_cache.conditional_headers(entry) if entry else {}
+        
+        try:
+            self.console.debug(f"    Checking: {url}")
+            crawlable = self.should_crawl_url(url)
+            if crawlable and self.expects_page(url, link_type):
+                # Pages we will crawl later reuse this response instead of fetching
+                # again; the body is only downloaded for HTML pages
+                headers = headers or self.page_request_headers(url)
+                response = self.follow_redirects('GET', url, stream=True, headers=headers)
+                if response.status_code != 304:
+                    self.store_page_response(url, response, streamed=True)
+                response.close()
+                if response.status_code == 304 and not entry:
+                    # Unchanged since the last incremental run; crawl_page replays its links
+                    self.page_store[self.normalize_url(url)] = (304, 'text/html', '', {})
+                    self.console.debug(f"    💾 NOT MODIFIED [304] {url}")
+                    return True, response.reason, 304
+            elif self.scans_stylesheet(link_type):
+                response = self.follow_redirects('GET', url, stream=True, headers=headers)
+                self.scan_stylesheet(url, response)
+                response.close()
+                if crawlable and response.status_code != 304:
+                    self.store_resource_response(url, response.status_code,
+                                                 response.headers.get('content-type', '').lower())
+            else:
+                response = self.probe_link(url, headers)
+                if crawlable and response.status_code != 304:
+                    self.store_resource_response(url, response.status_code,
+                                                 response.headers.get('content-type', '').lower())
+            
+            if response.status_code == 304 and entry:
+                self.verdict_cache.revalidated += 1
+                self.verdict_cache.touch(url)
+                self.console.debug(f"    💾 NOT MODIFIED [{entry['status_code']}] {url}")
+                return self.use_cached_entry(url, entry)
+            
+            if self.verdict_cache:
+                self.verdict_cache.fetched += 1
+                self.verdict_cache.put(url, response.status_code, response.reason, response.headers)
+            status = "✅ OK" if response.status_code < 400 else "❌ BROKEN"
+            self.console.debug(f"    {status} [{response.status_code}] {url}")
+            return response.status_code < 400, response.reason, response.status_code
+        except requests.exceptions.RequestException as e:
+            self.console.debug(f"    ❌ ERROR [0] {url} - {str(e)}")
+            if self.verdict_cache:
+                self.verdict_cache.put(url, 0, str(e))
+            return False, str(e), 0
+
+    def extract_links(self, html: str, base_url: str) -> List[Dict[str, str]]:
+        """Extract all links from HTML content with their text/descriptions."""
+        started = time.perf_counter()
+        links, anchors = self.extractor(html, base_url)
+        self.metrics.record_parse(time.perf_counter() - started)
+        self.store_page_anchors(base_url, anchors)
+        self.console.info(f"  Found {len(links)} links on this page")
+        return links
+
+    def crawl_page(self, url: str) -> List[Dict[str, str]]:
+        """Crawl a single page and return list of links found."""
+        links, html, validators = self.fetch_page(url)
+        if links is None:
+            links = self.extract_links(html, url)
+            self.save_page_links(url, html, validators, links)
+        return links
+
+    def fetch_page(self, url: str) -> Tuple[Optional[List[Dict[str, str]]], str, Dict[str, Optional[str]]]:
+        """Fetch (or reuse) a page for crawling.
+        
+        Returns (links, html, validators). links is None when html still has
+        to be parsed; otherwise it holds the links known without parsing
+        (replayed from an earlier run, or empty for failed/non-HTML pages).
+        """
+        cache_key = self.normalize_url(url)
+        stored = self.page_store.pop(cache_key, None)
+        
+        if stored is None and cache_key in self.link_results:
+            # Already fetched as a link and failed - don't go back to the network
+            is_working, reason, status_code = self.link_results[cache_key]
+            if not is_working:
+                self.console.info(f"  ❌ Page failed to load [{status_code}] {reason}")
+                return [], '', {}
+        
+        if stored is not None:
+            self.console.info(f"  ♻️  Reusing response from link check")
+        else:
+            try:
+                self.console.info(f"  📄 Fetching page content...")
+                response = self.follow_redirects('GET', url, kind='page', headers=self.page_request_headers(url))
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"Error crawling {url}: {e}")
+                self.console.info(f"  ❌ Error fetching page: {e}")
+                self.store_link_result(cache_key, (False, str(e), 0))
+                return [], '', {}
+            # Later links to this page reuse the crawl fetch as their check
+            self.store_link_result(cache_key, (response.status_code < 400, response.reason, response.status_code))
+            self.store_page_response(url, response)
+            stored = self.page_store.pop(cache_key)
+        
+        status_code, content_type, html, validators = stored
+        if status_code == 304:
+            return self.replay_page_links(url), '', validators
+        if status_code == 200:
+            if 'text/html' in content_type:
+                self.console.info(f"  ✅ Page loaded successfully [{status_code}]")
+                return self.unchanged_page_links(url, html), html, validators
+            else:
+                self.console.info(f"  ⚠️  Not an HTML page (content-type: {content_type})")
+        else:
+            self.console.info(f"  ❌ Page failed to load [{status_code}]")
+        return [], '', {}
+
+    def page_request_headers(self, url: str) -> Dict[str, str]:
+        """Conditional headers for a page parsed in an earlier incremental run."""
+        if self.page_fingerprints is None:
+            return {}
+        fingerprint = self.page_fingerprints.get(self.normalize_url(url))
+        return self.page_fingerprints.validator_headers(fingerprint) if fingerprint else {}
+
+    def page_hash(self, html: str) -> str:
+        return hashlib.sha256(html.encode('utf-8', 'replace')).hexdigest()
+
+    def unchanged_page_links(self, url: str, html: str) -> Optional[List[Dict[str, str]]]:
+        """Stored links of a page whose content is unchanged since the last incremental run."""
+        if self.page_fingerprints is None:
+            return None
+        fingerprint = self.page_fingerprints.get(self.normalize_url(url))
+        if fingerprint is None or fingerprint['content_hash'] != self.page_hash(html):
+            return None
+        self.unchanged_pages += 1
+        self.page_fingerprints.touch(self.normalize_url(url))
+        self.store_page_anchors(url, fingerprint['anchors'])
+        self.console.info(f"  💾 Page unchanged since last run - replaying {len(fingerprint['links'])} stored links")
+        return fingerprint['links']
+
+    def save_page_links(self, url: str, html: str, validators: Dict[str, Optional[str]],
+                        links: List[Dict[str, str]]):
+        """Remember a parsed page's hash and links for the next incremental run."""
+        if self.page_fingerprints is None:
+            return
+        self.changed_pages += 1
+        cache_key = self.normalize_url(url)
+        self.page_fingerprints.put(cache_key, self.page_hash(html), links, validators, self.page_anchors.get(cache_key))
+
+    def replay_page_links(self, url: str) -> List[Dict[str, str]]:
+        """Links stored for a page that answered 304 Not Modified."""
+        cache_key = self.normalize_url(url)
+        fingerprint = self.page_fingerprints.get(cache_key) if self.page_fingerprints else None
+        if fingerprint is None:
+            self.console.info(f"  ⚠️  Page not modified but no stored links")
+            return []
+        self.unchanged_pages += 1
+        self.page_fingerprints.touch(cache_key)
+        self.store_page_anchors(url, fingerprint['anchors'])
+        self.console.info(f"  💾 Page not modified [304] - replaying {len(fingerprint['links'])} stored links")
+        return fingerprint['links']
+
+    def parse_lastmod(self, value: Optional[str]) -> Optional[float]:
+        """Parse a sitemap <lastmod> (W3C datetime) into a UTC timestamp."""
+        try:
+            lastmod = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return None
+        if lastmod.tzinfo is None:
+            lastmod = lastmod.replace(tzinfo=timezone.utc)
+        return lastmod.timestamp()
+
+    def read_sitemaps(self) -> Dict[str, Dict[str, str]]:
+        """Crawlable pages listed in sitemap.xml (and the sitemaps it lists), with their <url> fields."""
+        parsed = urlparse(self.config['start_url'])
+        incremental = self.config.get('incremental', {})
+        pending = list(incremental.get('sitemap_urls') or [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"])
+        seen_sitemaps = set()
+        pages: Dict[str, Dict[str, str]] = {}
+        
+        while pending:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            try:
+                response = self.send_request('GET', sitemap_url, kind='sitemap')
+            except requests.exceptions.RequestException as e:
+                self.logger.warning(f"Error fetching sitemap {sitemap_url}: {e}")
+                continue
+            if response.status_code != 200:
+                self.logger.warning(f"Sitemap {sitemap_url} returned {response.status_code}")
+                continue
+            
+            content = response.content
+            if content[:2] == b'\x1f\x8b':
+                content = gzip.decompress(content)
+            try:
+                root = ElementTree.fromstring(content)
+            except ElementTree.ParseError as e:
+                self.logger.warning(f"Invalid sitemap {sitemap_url}: {e}")
+                continue
+            
+            # <sitemapindex> lists more sitemaps, <urlset> lists pages; ignore namespaces
+            for element in root:
+                fields = {child.tag.rsplit('}', 1)[-1]: (child.text or '').strip() for child in element}
+                loc = fields.get('loc')
+                if not loc:
+                    continue
+                if element.tag.endswith('sitemap'):
+                    pending.append(urljoin(sitemap_url, loc))
+                elif self.should_crawl_url(loc):
+                    pages[loc] = fields
+        return pages
+
+    def sitemap_seeds(self, sitemap_pages: Dict[str, Dict[str, str]]) -> List[str]:
+        """Crawlable URLs from the sitemap, pages changed since the last run first."""
+        lastmods = {url: self.parse_lastmod(fields.get('lastmod')) for url, fields in sitemap_pages.items()}
+        crawled_times = self.page_fingerprints.crawled_times() if self.page_fingerprints else {}
+        
+        def is_changed(url: str) -> bool:
+            crawled_at = crawled_times.get(self.normalize_url(url))
+            return crawled_at is None or lastmods[url] is None or lastmods[url] > crawled_at
+        
+        seeds = sorted(lastmods, key=lambda url: (not is_changed(url), -(lastmods[url] or 0)))
+        changed_count = sum(1 for url in seeds if is_changed(url))
+        self.console.log(NOTICE, f"🗺️  Sitemap: {len(seeds)} pages ({changed_count} changed since last run)")
+        return seeds
+
+    def store_link_result(self, cache_key: str, result: Tuple[bool, str, int]):
+        """Record a link verdict in the run-wide cache (and the checkpoint log)."""
+        self.link_results[cache_key] = result
+        if self.checkpoint:
+            self.checkpoint.log('result', key=cache_key, result=list(result))
+
+    def setup_priorities(self, sitemap_pages: Dict[str, Dict[str, str]]):
+        """Load what page priorities are based on: sitemap <priority> values and breakage history."""
+        for url, fields in sitemap_pages.items():
+            try:
+                self.sitemap_priorities[self.normalize_url(url)] = float(fields['priority'])
+            except (KeyError, ValueError):
+                pass
+        if self.verdict_cache:
+            links, pages = self.verdict_cache.broken_history(self.priority_config.get('history_days', 7))
+            self.broken_history.update(self.normalize_url(url) for url in links)
+            self.broken_history.update(pages)
+        self.console.info(f"🎯 Prioritizing pages ({len(self.sitemap_priorities)} sitemap priorities, "
+                          f"{len(self.broken_history)} URLs with recent broken links)")
+
+    def page_priority(self, key: str, depth: int) -> float:
+        """Crawl priority of a page by normalized URL; lower values are crawled first.
+        
+        Pages close to the start URL, with a high sitemap <priority>, linked
+        from many places or with broken links in a recent run come first.
+        """
+        weights = self.priority_config
+        score = (weights.get('sitemap', 1.0) * self.sitemap_priorities.get(key, 0.5)
+                 + weights.get('inlinks', 1.0) * math.log1p(self.inlinks.get(key, 0))
+                 + weights.get('broken_history', 2.0) * (key in self.broken_history)
+                 - weights.get('depth', 1.0) * depth)
+        return -score
+
+    def queue_page(self, frontier: Frontier, url: str, depth: int, log: bool = True) -> bool:
+        """Queue a crawlable page found depth links from the start URL; returns True if it is new.
+        
+        A page that is already queued moves up if the new link raises its priority.
+        With log unset, the caller logs new pages to the checkpoint itself.
+        """
+        if not self.prioritized and self.budget.max_depth is None:
+            added = frontier.push(url, depth)
+        else:
+            key = self.normalize_url(url)
+            if self.prioritized:
+                self.inlinks[key] = self.inlinks.get(key, 0) + 1
+            if key not in self.visited_urls and not self.budget.allows_depth(key, depth):
+                return False
+            priority = self.page_priority(key, depth) if self.prioritized else 0.0
+            added = frontier.push(url, depth, priority)
+            if not added and self.prioritized:
+                frontier.reprioritize(url, priority)
+        if added and log:
+            self.page_queued(url, depth)
+        return added
+
+    def links_by_priority(self, links: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Links to check, with the ones that were broken in a recent run first."""
+        if not self.broken_history:
+            return links
+        return sorted(links, key=lambda link_data: self.normalize_url(link_data['url']) not in self.broken_history)
+
+    def crawled_page_count(self) -> int:
+        """Pages crawled; queued pages a budget left out don't count."""
+        return len(self.visited_urls) - self.budget.pages_left
+
+    def coverage_lines(self) -> List[str]:
+        """What a crawl that hit a budget limit covered, for the summaries (empty otherwise)."""
+        budget = self.budget
+        if not budget.stop_reasons:
+            return []
+        crawled = self.crawled_page_count()
+        found = crawled + budget.pages_left + len(budget.pages_too_deep)
+        checked = len(self.link_results)
+        unchecked = len(budget.unchecked_links)
+        return [
+            f"Stopped early: {'; '.join(budget.stop_reasons.values())}",
+            f"Coverage: {crawled} of {found} pages found were crawled ({crawled / max(found, 1):.0%}); "
+            f"not crawled: {budget.pages_left} queued, {len(budget.pages_too_deep)} beyond max_depth",
+            f"Links checked: {checked} of {checked + unchecked} ({checked / max(checked + unchecked, 1):.0%})"
+        ]
+
+    def page_queued(self, url: str, depth: int):
+        if self.checkpoint:
+            self.checkpoint.log('queued', url=url, depth=depth)
 
-    def extract_links(self, html: str, base_url: str) -> List[Dict[str, str]]:
-        """Extract all links from HTML content with their text/descriptions."""
-        soup = BeautifulSoup(html, 'html.parser')
-        links = []
-        
-        # Find all anchor tags with href
-        for tag in soup.find_all('a', href=True):
-            href = tag.get('href')
-            if href:
-                absolute_url = urljoin(base_url, href)
-                # Get the link text, handling nested tags
-                link_text = tag.get_text(strip=True) or "[No text]"
-                # Get title attribute if available
-                title = tag.get('title', '')
-                
-                links.append({
-                    'url': absolute_url,
-                    'text': link_text[:100],  # Limit to 100 chars
-                    'title': title[:100] if title else '',
-                    'type': 'link'
-                })
-        
-        # Find all link tags with href (stylesheets, etc.)
-        for tag in soup.find_all('link', href=True):
-            href = tag.get('href')
-            if href:
-                absolute_url = urljoin(base_url, href)
-                rel = tag.get('rel', [''])[0] if tag.get('rel') else ''
-                
-                links.append({
-                    'url': absolute_url,
-                    'text': f"[{rel} stylesheet]" if rel else "[stylesheet]",
-                    'title': '',
-                    'type': 'stylesheet'
-                })
-        
-        # Find all image tags with src
-        for tag in soup.find_all('img', src=True):
-            src = tag.get('src')
-            if src:
-                absolute_url = urljoin(base_url, src)
-                alt_text = tag.get('alt', '')
-                title = tag.get('title', '')
-                
-                links.append({
-                    'url': absolute_url,
-                    'text': f"[IMG: {alt_text}]" if alt_text else "[Image]",
-                    'title': title[:100] if title else '',
-                    'type': 'image'
-                })
-        
-        print(f"  Found {len(links)} links on this page")
-        return links
+    def page_done(self, url: str):
+        """Mark a page as fully handled: its links are checked and its new pages queued."""
+        if self.checkpoint:
+            self.checkpoint.log('done', url=url)
 
-    def crawl_page(self, url: str) -> List[Dict[str, str]]:
-        """Crawl a single page and return list of links found."""
+    def restore_checkpoint(self, state: Dict) -> List[Tuple[str, int]]:
+        """Load crawl state from a checkpoint and return the pages still to crawl, as (url, depth)."""
+        if state['start_url'] and state['start_url'] != self.config['start_url']:
+            self.logger.warning(f"Checkpoint was written for {state['start_url']}, not {self.config['start_url']}")
+        self.link_results.update(state['link_results'])
+        self.redirect_chains.update(state['redirect_chains'])
+        for record in state['broken_links']:
+            self.broken_links.add(record)
+        for page_url, link_data, redirect in state['redirected_links']:
+            self.record_redirected_link(page_url, link_data, redirect)
+        # Resolved again by check_fragment_links at the end of the resumed crawl
+        for page_url, link_data, status_code in state['fragment_links']:
+            self.record_fragment_link(page_url, link_data, status_code)
+        for url, anchors in state['page_anchors'].items():
+            self.store_page_anchors(url, set(anchors))
+        for cache_key in state['link_results']:
+            if not self.url_filter.is_internal(cache_key):
+                self.checked_external_links.add(cache_key)
+        for normalized_url in state['done']:
+            self.visited_urls.add(normalized_url)
+        pending = [page for normalized_url, page in state['queued'].items() if normalized_url not in state['done']]
+        self.console.log(NOTICE, f"♻️  Resuming from checkpoint: {len(state['done'])} pages done, {len(pending)} queued, "
+                                 f"{len(state['link_results'])} link results")
+        return pending
+
+    def broken_link_record(self, page_url: str, link_data: Dict[str, str], reason: str, status_code: int) -> Dict:
+        """Build the results record for a broken link found on page_url."""
+        link_url = link_data['url']
+        return {
+            'source_page': page_url,
+            'broken_link': link_url,
+            'link_text': link_data['text'],
+            'link_title': link_data['title'],
+            'link_type_html': link_data['type'],
+            'status_code': status_code,
+            'error': reason,
+            'link_type': 'internal' if self.url_filter.is_internal(link_url) else 'external',
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def record_broken_link(self, page_url: str, link_data: Dict[str, str], reason: str, status_code: int,
+                           log: bool = True):
+        """Add a broken link entry for a link found on page_url (and to the checkpoint, if log is set)."""
+        link_url = link_data['url']
+        record = self.broken_link_record(page_url, link_data, reason, status_code)
+        self.broken_links.add(record)
+        page_key = self.normalize_url(page_url)
+        if self.verdict_cache and page_key not in self.recorded_broken_pages:
+            # Breakage history for page priorities in later runs
+            self.recorded_broken_pages.add(page_key)
+            self.verdict_cache.put_broken_page(page_key)
+        if self.checkpoint and log:
+            self.checkpoint.log('broken', record=record)
+        self.console.info(f"  💥 BROKEN LINK: \"{link_data['text']}\" → {link_url} (Status: {status_code})")
+
+    def record_redirected_link(self, page_url: str, link_data: Dict[str, str], redirect: Dict):
+        """Note an internal link on page_url that points at a redirect."""
+        link_url = link_data['url']
+        with self.redirect_lock:
+            entry = self.redirected_links.setdefault(self.normalize_url(link_url), {
+                'url': link_url,
+                'text': link_data['text'],
+                'hops': redirect['hops'],
+                'final_url': redirect['final_url'],
+                'pages': {}
+            })
+            entry['pages'].setdefault(page_url, link_data['text'])
+        if self.checkpoint:
+            self.checkpoint.log('redirected', page=page_url, link=link_data, redirect=redirect)
+
+    def record_link_result(self, page_url: str, link_data: Dict[str, str], result: Tuple[bool, str, int]):
+        """Report a checked link on page_url if it is broken or an internal link to a redirect."""
+        is_working, reason, status_code = result
+        if not is_working:
+            self.record_broken_link(page_url, link_data, reason, status_code)
+        redirect = self.redirect_chains.get(self.normalize_url(link_data['url']))
+        if redirect and self.url_filter.is_internal(link_data['url']):
+            self.record_redirected_link(page_url, link_data, redirect)
+        if is_working:
+            self.record_fragment_link(page_url, link_data, status_code)
+
+    def record_fragment_link(self, page_url: str, link_data: Dict[str, str], status_code: int):
+        """Queue a working link with an #anchor to be resolved by check_fragment_links."""
+        if self.check_anchors and '#' in link_data['url']:
+            fragment = anchor_fragment(link_data['url'])
+            if fragment:
+                with self.fragment_lock:
+                    self.fragment_links.setdefault(self.normalize_url(link_data['url']), {}).setdefault(
+                        fragment, []).append((page_url, link_data, status_code))
+                if self.checkpoint:
+                    self.checkpoint.log('fragment', page=page_url, link=link_data, status_code=status_code)
+
+    def store_page_anchors(self, url: str, anchors: Optional[Set[str]]):
+        """Keep a parsed page's anchor names for resolving fragment links."""
+        if self.check_anchors and anchors is not None:
+            self.page_anchors[self.normalize_url(url)] = frozenset(anchors)
+            if self.checkpoint:
+                self.checkpoint.log('anchors', url=url, anchors=sorted(anchors))
+
+    def fetch_page_anchors(self, url: str):
+        """Fetch a page that wasn't crawled (an external one) just for its anchor names."""
+        if not self.budget.allows_request(url):
+            return
         try:
-            print(f"  📄 Fetching page content...")
-            response = self.session.get(url, timeout=self.config['timeout'])
-            if response.status_code == 200:
-                content_type = response.headers.get('content-type', '').lower()
-                if 'text/html' in content_type:
-                    print(f"  ✅ Page loaded successfully [{response.status_code}]")
-                    return self.extract_links(response.text, url)
-                else:
-                    print(f"  ⚠️  Not an HTML page (content-type: {content_type})")
-            else:
-                print(f"  ❌ Page failed to load [{response.status_code}]")
-            return []
+            response = self.follow_redirects('GET', url, kind='anchors', stream=True)
+            try:
+                if response.status_code != 200 or 'text/html' not in response.headers.get('content-type', '').lower():
+                    return
+                started = time.perf_counter()
+                html = response.text
+                self.metrics.record_body(url, time.perf_counter() - started, len(response.content))
+                _, anchors = self.extractor(html, url)
+            finally:
+                response.close()
+            self.store_page_anchors(url, anchors)
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error crawling {url}: {e}")
-            print(f"  ❌ Error fetching page: {e}")
-            return []
+            self.logger.debug(f"Could not fetch {url} for anchors: {e}")
 
-    def check_links_on_page(self, page_url: str, links: List[Dict[str, str]]):
-        """Check all links found on a specific page."""
-        start_domain = urlparse(self.config['start_url']).netloc
+    def check_fragment_links(self):
+        """Report fragment links whose anchor is not on the target page.
+        
+        Internal targets are resolved against the anchors collected while
+        crawling. External targets are fetched once each, and only when
+        anchors.external is set. Targets whose anchors are unknown (not
+        crawled, not HTML, or failed) are skipped.
+        """
+        if not self.fragment_links:
+            return
+        if self.config.get('anchors', {}).get('external'):
+            external = [target for target in self.fragment_links
+                        if target not in self.page_anchors and not self.url_filter.is_internal(target)]
+            if external:
+                self.console.info(f"\n🔖 Fetching {len(external)} external pages for their anchors...")
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
+                    list(executor.map(self.fetch_page_anchors, external))
+        
+        for target, fragments in self.fragment_links.items():
+            anchors = self.page_anchors.get(target)
+            if anchors is None:
+                continue
+            self.checked_anchors += len(fragments)
+            for fragment, occurrences in fragments.items():
+                if fragment in anchors or unquote(fragment) in anchors:
+                    continue
+                for page_url, link_data, status_code in occurrences:
+                    self.missing_anchors += 1
+                    # Not checkpointed: a resumed crawl resolves its fragment links again
+                    self.record_broken_link(page_url, link_data, f"Anchor #{fragment} not found", status_code,
+                                            log=False)
+
+    def check_links_on_page(self, page_url: str, links: List[Dict[str, str]]) -> bool:
+        """Check all links found on a specific page.
         
-        print(f"\n  🔍 Checking {len(links)} links found on this page...")
+        Returns False if the budget left some of them unchecked.
+        """
+        self.console.info(f"\n  🔍 Checking {len(links)} links found on this page...")
+        complete = True
         
         # Filter links to check
         links_to_check = []
+        cached_links = []
+        # Links on this page waiting for the same check, keyed on normalized URL
+        pending_links: Dict[str, List[Dict[str, str]]] = {}
         skipped_count = 0
         
         for link_data in links:
             link_url = link_data['url']
-            link_domain = urlparse(link_url).netloc
+            internal = self.url_filter.is_internal(link_url)
             
             # Skip if we shouldn't check this URL (problematic patterns)
             if not self.should_check_url(link_url):
@@ -267,136 +3448,321 @@ class BrokenLinkChecker:
                 continue
             
             # Skip if external link and we don't want to check them
-            if link_domain != start_domain and not self.config['include_external_links']:
+            if not internal and not self.config['include_external_links']:
                 skipped_count += 1
                 continue
             
-            # Skip if we've already checked this external link
-            if link_domain != start_domain and link_url in self.checked_external_links:
-                skipped_count += 1
+            # Reuse the verdict if this URL was already checked during this run
+            cache_key = self.normalize_url(link_url)
+            if cache_key in self.link_results:
+                self.cache_hits += 1
+                cached_links.append(link_data)
+                continue
+            
+            # Same URL appears more than once on this page - check it once
+            if cache_key in pending_links:
+                self.cache_hits += 1
+                pending_links[cache_key].append(link_data)
                 continue
             
-            if link_domain != start_domain:
+            self.cache_misses += 1
+            pending_links[cache_key] = [link_data]
+            if not internal:
                 self.checked_external_links.add(link_url)
             
             links_to_check.append(link_data)
         
         if skipped_count > 0:
-            print(f"  ⏭️  Skipping {skipped_count} links (duplicates or excluded)")
+            self.console.info(f"  ⏭️  Skipping {skipped_count} links (excluded)")
         
-        print(f"  🔍 Checking {len(links_to_check)} unique links...")
+        if cached_links:
+            self.console.info(f"  ♻️  Reusing cached results for {len(cached_links)} links")
+            for link_data in cached_links:
+                self.record_link_result(page_url, link_data, self.link_results[self.normalize_url(link_data['url'])])
+        
+        self.console.info(f"  🔍 Checking {len(links_to_check)} unique links...")
         
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
             future_to_link = {}
             
-            for link_data in links_to_check:
-                future = executor.submit(self.check_link, link_data['url'], page_url)
+            for link_data in self.links_by_priority(links_to_check):
+                future = executor.submit(self.check_link, link_data['url'], page_url, link_data['type'])
                 future_to_link[future] = link_data
             
             for future in concurrent.futures.as_completed(future_to_link):
                 link_data = future_to_link[future]
                 link_url = link_data['url']
+                cache_key = self.normalize_url(link_url)
                 try:
-                    is_working, reason, status_code = future.result()
-                    if not is_working:
-                        self.broken_links.append({
-                            'source_page': page_url,
-                            'broken_link': link_url,
-                            'link_text': link_data['text'],
-                            'link_title': link_data['title'],
-                            'link_type_html': link_data['type'],
-                            'status_code': status_code,
-                            'error': reason,
-                            'link_type': 'internal' if urlparse(link_url).netloc == start_domain else 'external',
-                            'timestamp': datetime.now().isoformat()
-                        })
-                        print(f"  💥 BROKEN LINK: \"{link_data['text']}\" → {link_url} (Status: {status_code})")
+                    result = future.result()
+                    if result is None:
+                        complete = False
+                        continue
+                    self.store_link_result(cache_key, result)
+                    for pending_link in pending_links[cache_key]:
+                        self.record_link_result(page_url, pending_link, result)
                 except Exception as e:
                     self.logger.error(f"Error checking link {link_url}: {e}")
-                    print(f"  ⚠️  Error checking {link_url}: {e}")
-                
-                # Add delay between requests
-                time.sleep(self.config['delay_between_requests'])
+                    self.console.warning(f"  ⚠️  Error checking {link_url}: {e}")
         
-        print(f"  ✅ Finished checking links on this page")
+        self.console.info(f"  ✅ Finished checking links on this page")
+        
+        # References in the stylesheets fetched above are checked like links on a page
+        for link_data in links_to_check:
+            css_links = self.stylesheet_links.pop(self.normalize_url(link_data['url']), None)
+            if css_links:
+                self.console.info(f"  🎨 Stylesheet {link_data['url']} references {len(css_links)} URLs")
+                self.check_links_on_page(link_data['url'], css_links)
+        return complete
 
     def crawl_website(self):
         """Main crawling method."""
         start_url = self.config['start_url']
-        urls_to_crawl = [start_url]
+        engine = self.config.get('engine', 'threads')
+        if engine == 'async' and aiohttp is None:
+            self.logger.warning("aiohttp is not installed - falling back to the threads engine")
+            engine = 'threads'
         
-        print(f"\n🚀 Starting crawl of {start_url}")
-        print(f"📊 Configuration:")
-        print(f"   • Include external links: {self.config['include_external_links']}")
-        print(f"   • Max workers: {self.config['max_workers']}")
-        print(f"   • Delay between requests: {self.config['delay_between_requests']}s")
-        print(f"   • Exclude patterns: {', '.join(self.config['exclude_patterns'])}")
-        print(f"\n" + "="*80)
+        self.console.log(NOTICE, f"\n🚀 Starting crawl of {start_url}")
+        self.console.log(NOTICE, f"📊 Configuration:")
+        self.console.log(NOTICE, f"   • Engine: {engine}")
+        self.console.log(NOTICE, f"   • Include external links: {self.config['include_external_links']}")
+        self.console.log(NOTICE, f"   • Link extractor: {self.extractor_name}")
+        if self.config.get('parse_workers', 0) > 0:
+            self.console.log(NOTICE, f"   • Parse workers: {self.config['parse_workers']} processes")
+        if engine == 'async':
+            self.console.log(NOTICE, f"   • Concurrency: {self.config['async_concurrency']} "
+                                     f"({self.config['async_per_host_concurrency']} per host)")
+        elif engine == 'distributed':
+            distributed = self.config.get('distributed', {})
+            self.console.log(NOTICE, f"   • Workers: {distributed.get('workers', 4)} × {self.config['max_workers']} threads, "
+                                     f"store {distributed.get('store', 'link_checker_crawl.sqlite')}")
+        else:
+            self.console.log(NOTICE, f"   • Max workers: {self.config['max_workers']}")
+        default_rule = self.rate_limiter.default_rule
+        self.console.log(NOTICE, f"   • Rate limit per host: {default_rule.get('requests_per_second', 0) or 'unlimited'} req/s "
+                                 f"(burst {default_rule.get('burst', 1)}, {len(self.rate_limiter.host_rules)} host rules)")
+        self.console.log(NOTICE, f"   • Exclude patterns: {', '.join(self.config['exclude_patterns'])}")
         
-        page_count = 0
+        priority_config = self.config.get('frontier', {}).get('priority', {})
+        if engine == 'distributed':
+            if priority_config.get('enabled') or CrawlBudget.from_config(self.config).limited:
+                self.logger.warning("Budgets and page priorities are not supported by the distributed engine - ignoring them")
+        else:
+            self.budget = CrawlBudget.from_config(self.config)
+            self.prioritized = priority_config.get('enabled', False)
+            self.priority_config = priority_config
+        if self.budget.limited:
+            budget = self.budget
+            self.console.log(NOTICE, f"   • Budget: {budget.max_pages or 'unlimited'} pages, "
+                                     f"depth {'unlimited' if budget.max_depth is None else budget.max_depth}, "
+                                     f"{budget.max_requests_per_host or 'unlimited'} requests per host, "
+                                     f"{f'{budget.max_seconds:g}s' if budget.max_seconds else 'no time limit'}")
+        self.console.log(NOTICE, f"\n" + "="*80)
         
-        while urls_to_crawl:
-            current_url = urls_to_crawl.pop(0)
-            normalized_url = self.normalize_url(current_url)
-            
-            if normalized_url in self.visited_urls:
-                continue
-            
-            if not self.should_crawl_url(current_url):
-                print(f"⏭️  Skipping excluded URL: {current_url}")
-                continue
-            
-            self.visited_urls.add(normalized_url)
-            page_count += 1
-            
-            print(f"\n📄 [{page_count}] Crawling: {current_url}")
-            
-            # Get all links on this page
-            links = self.crawl_page(current_url)
-            
-            if links:
-                # Check all links found on this page
-                self.check_links_on_page(current_url, links)
-                
-                # Add internal links to crawl queue
-                new_pages_found = 0
-                for link_data in links:
-                    link_url = link_data['url']
-                    if self.should_crawl_url(link_url):
-                        normalized_link = self.normalize_url(link_url)
-                        if normalized_link not in self.visited_urls:
-                            urls_to_crawl.append(link_url)
-                            new_pages_found += 1
-                
-                if new_pages_found > 0:
-                    print(f"  📋 Added {new_pages_found} new pages to crawl queue")
-                    print(f"  📊 Queue status: {len(urls_to_crawl)} pages remaining")
-            
-            print(f"  💤 Waiting {self.config['delay_between_requests']}s before next page...")
-            time.sleep(self.config['delay_between_requests'])
+        # (url, depth) of the pages the crawl starts from
+        start_pages = [(start_url, 0)]
+        incremental = self.config.get('incremental', {})
+        if incremental.get('enabled'):
+            self.page_fingerprints = PageFingerprintStore(incremental.get('path', 'link_checker_pages.sqlite'))
+        
+        checkpoint_config = self.config.get('checkpoint', {})
+        checkpoint_path = checkpoint_config.get('path', 'link_checker_checkpoint.jsonl')
+        resume = checkpoint_config.get('resume', False)
+        sitemap_pages = {}
+        if (self.page_fingerprints and not resume) or (self.prioritized and self.priority_config.get('sitemap', 1.0)):
+            sitemap_pages = self.read_sitemaps()
+        if self.prioritized:
+            self.setup_priorities(sitemap_pages)
+        if resume:
+            start_pages = self.restore_checkpoint(CrawlCheckpoint.load(checkpoint_path, self.normalize_url))
+        elif self.page_fingerprints:
+            start_pages += [(url, 0) for url in self.sitemap_seeds(sitemap_pages)]
+        if resume or checkpoint_config.get('enabled'):
+            self.checkpoint = CrawlCheckpoint(checkpoint_path, checkpoint_config.get('flush_interval', 5), append=resume)
+            if not resume:
+                self.checkpoint.log('start', start_url=start_url)
+        
+        # Live progress when per-page output is off, or on a terminal
+        # (distributed crawls report progress from the coordinator instead)
+        progress = None
+        if engine != 'distributed' and not self.shared and (
+                self.console.getEffectiveLevel() > logging.INFO or sys.stdout.isatty()):
+            interval = self.config.get('progress_interval') or (1 if sys.stdout.isatty() else 30)
+            progress = ProgressReporter(self, interval)
+            progress.start()
+        try:
+            if engine == 'async':
+                AsyncCrawlEngine(self).run(start_pages)
+            elif engine == 'distributed':
+                DistributedCoordinator(self).run(start_pages)
+            else:
+                self.crawl_with_threads(start_pages)
+        finally:
+            if progress:
+                progress.stop()
+        self.check_fragment_links()
         
-        print(f"\n🏁 Crawling complete!")
-        print(f"📊 Final statistics:")
-        print(f"   • Pages crawled: {len(self.visited_urls)}")
-        print(f"   • Broken links found: {len(self.broken_links)}")
-        print(f"   • External links checked: {len(self.checked_external_links)}")
+        self.console.log(NOTICE, f"\n🏁 Crawling complete!")
+        self.console.log(NOTICE, f"📊 Final statistics:")
+        self.console.log(NOTICE, f"   • Pages crawled: {self.crawled_page_count()}")
+        for line in self.coverage_lines():
+            self.console.log(NOTICE, f"   ⏱️  {line}")
+        self.console.log(NOTICE, f"   • Broken links found: {len(self.broken_links)}")
+        self.console.log(NOTICE, f"   • External links checked: {len(self.checked_external_links)}")
+        self.console.log(NOTICE, f"   • Link cache: {self.cache_hits} hits, {self.cache_misses} misses")
+        if self.page_store.evicted:
+            self.console.log(NOTICE, f"   • Stored pages dropped to stay within page_store_mb: {self.page_store.evicted} "
+                                     f"(fetched again when crawled)")
+        if engine != 'distributed':
+            # Distributed workers count their own connections
+            self.console.log(NOTICE, f"   • Connections opened: {sum(self.transport_stats.connections.values())}, "
+                                     f"DNS lookups: {self.transport_stats.dns_lookups} "
+                                     f"({self.transport_stats.dns_cache_hits} answered from cache)")
+        if self.verdict_cache:
+            self.console.log(NOTICE, f"   • Persistent cache: {self.verdict_cache.fresh_hits} fresh, "
+                                     f"{self.verdict_cache.revalidated} revalidated (304), {self.verdict_cache.fetched} fetched")
+        if self.page_fingerprints:
+            self.console.log(NOTICE, f"   • Incremental: {self.changed_pages} pages parsed, {self.unchanged_pages} unchanged")
+        if self.fragment_links:
+            self.console.log(NOTICE, f"   • Anchors: {self.checked_anchors} checked, "
+                                     f"{self.missing_anchors} links to missing anchors")
+        self.console.log(NOTICE, f"   • Internal links to redirects: {len(self.redirected_links)} "
+                                 f"({self.redirects.hits} hops taken from the redirect cache)")
         
         if self.broken_links:
-            print(f"\n💥 Broken links summary:")
-            for i, link in enumerate(self.broken_links, 1):
-                print(f"   {i}. \"{link['link_text']}\" → {link['broken_link']} [{link['status_code']}]")
-                print(f"      Found on: {link['source_page']}")
+            self.console.log(NOTICE, f"\n💥 Broken links summary:")
+            for i, (broken_link, occurrences) in enumerate(self.broken_links.grouped(), 1):
+                first = next(occurrences)
+                self.console.log(NOTICE, f"   {i}. \"{first['link_text']}\" → {broken_link} [{first['status_code']}]")
+                self.console.log(NOTICE, f"      Found on: {first['source_page']}")
+                for link in occurrences:
+                    self.console.log(NOTICE, f"      Found on: {link['source_page']}")
         else:
-            print(f"\n✅ No broken links found! Your website looks great!")
+            self.console.log(NOTICE, f"\n✅ No broken links found! Your website looks great!")
+            
+        self.console.log(NOTICE, "="*80)
+
+    def crawl_with_threads(self, start_pages: List[Tuple[str, int]]):
+        """Crawl page by page, checking each page's links on a thread pool.
+        
+        With parse_workers set, HTML parsing runs in a process pool: the main
+        thread keeps fetching pages and checking links while up to
+        max_pending_parses fetched pages wait for or go through the parse stage.
+        """
+        urls_to_crawl = self.create_frontier()
+        self.queue_depth = lambda: len(urls_to_crawl)
+        for url, depth in start_pages:
+            if self.should_crawl_url(url):
+                self.queue_page(urls_to_crawl, url, depth)
+            else:
+                self.console.info(f"⏭️  Skipping excluded URL: {url}")
+        parse_workers = self.config.get('parse_workers', 0)
+        max_pending_parses = self.config.get('max_pending_parses') or parse_workers * 2
+        parse_pool = concurrent.futures.ProcessPoolExecutor(parse_workers) if parse_workers > 0 else None
+        # Parse futures -> (page_url, depth, html, validators)
+        pending_parses = {}
+        # Cleared when the budget runs out; parses in flight are still finished
+        crawling = True
+        
+        try:
+            while (crawling and urls_to_crawl) or pending_parses:
+                # Handle finished parses first; block only when we can't fetch more pages
+                ready = [future for future in pending_parses if future.done()]
+                if not ready and pending_parses and (not (crawling and urls_to_crawl)
+                                                     or len(pending_parses) >= max_pending_parses):
+                    ready, _ = concurrent.futures.wait(pending_parses, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in ready:
+                    page_url, depth, html, validators = pending_parses.pop(future)
+                    try:
+                        compact_links, anchors, parse_seconds = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error parsing {page_url}: {e}")
+                        self.console.warning(f"\n  ⚠️  Error parsing {page_url}: {e}")
+                        continue
+                    self.metrics.record_parse(parse_seconds)
+                    self.store_page_anchors(page_url, anchors)
+                    links = [dict(zip(LINK_FIELDS, link)) for link in compact_links]
+                    self.console.info(f"\n🧩 Parsed {page_url}: found {len(links)} links")
+                    self.save_page_links(page_url, html, validators, links)
+                    self.process_page_links(page_url, links, urls_to_crawl, depth)
+                
+                if not (crawling and urls_to_crawl) or len(pending_parses) >= max_pending_parses > 0:
+                    continue
+                
+                # Queued URLs are already deduplicated and filtered
+                current_url, depth = urls_to_crawl.pop()
+                if not self.budget.allows_page(current_url, self.pages_crawled):
+                    self.console.info(f"\n⏱️  Budget reached - no more pages will be crawled")
+                    self.budget.pages_left += 1
+                    crawling = False
+                    continue
+                self.pages_crawled += 1
+                
+                self.console.info(f"\n📄 [{self.pages_crawled}] Crawling: {current_url}")
+                
+                if parse_pool is None:
+                    # Get all links on this page
+                    links = self.crawl_page(current_url)
+                else:
+                    links, html, validators = self.fetch_page(current_url)
+                    if links is None:
+                        future = parse_pool.submit(parse_page_links, self.extractor_name, html, current_url)
+                        pending_parses[future] = (current_url, depth, html, validators)
+                        continue
+                
+                self.process_page_links(current_url, links, urls_to_crawl, depth)
+            self.budget.pages_left += len(urls_to_crawl)
+        finally:
+            urls_to_crawl.close()
+            if parse_pool is not None:
+                parse_pool.shutdown(cancel_futures=True)
+
+    def create_frontier(self) -> Frontier:
+        """Crawl frontier for the "frontier" settings, prioritized if page priorities are on."""
+        frontier_config = self.config.get('frontier', {})
+        return Frontier(
+            self.visited_urls,
+            self.normalize_url,
+            frontier_config.get('max_in_memory', 0),
+            frontier_config.get('spill_dir'),
+            self.prioritized
+        )
+
+    def process_page_links(self, page_url: str, links: List[Dict[str, str]], urls_to_crawl: Frontier, depth: int):
+        """Check a crawled page's links and queue the internal pages it links to."""
+        complete = True
+        if links:
+            # Check all links found on this page
+            complete = self.check_links_on_page(page_url, links)
+            
+            # Add internal links to crawl queue
+            new_pages_found = 0
+            for link_data in links:
+                link_url = link_data['url']
+                if self.should_crawl_url(link_url) and self.queue_page(urls_to_crawl, link_url, depth + 1):
+                    new_pages_found += 1
             
-        print("="*80)
+            if new_pages_found > 0:
+                self.console.info(f"  📋 Added {new_pages_found} new pages to crawl queue")
+                self.console.info(f"  📊 Queue status: {len(urls_to_crawl)} pages remaining")
+        
+        # Pages with links the budget skipped are crawled again on --resume
+        if complete:
+            self.page_done(page_url)
 
     def generate_report(self) -> str:
-        """Generate HTML report."""
+        """Generate HTML report, one section per broken URL.
+        
+        The report is written out while it is rendered, streaming over the
+        results sink, so memory use doesn't grow with the number of records.
+        """
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        html_filename = f"broken_links_report_{self.site}_{timestamp}.html" if self.site \
+            else f"broken_links_report_{timestamp}.html"
         
-        # Generate HTML report
-        html_content = f"""
+        with open(html_filename, 'w', encoding='utf-8') as f:
+            f.write(f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -404,7 +3770,7 @@ class BrokenLinkChecker:
             <style>
                 body {{ font-family: Arial, sans-serif; margin: 20px; }}
                 .summary {{ background-color: #f0f0f0; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
-                table {{ border-collapse: collapse; width: 100%; }}
+                table {{ border-collapse: collapse; width: 100%; margin-bottom: 20px; }}
                 th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
                 th {{ background-color: #f2f2f2; }}
                 .external {{ background-color: #fff3cd; }}
@@ -412,6 +3778,7 @@ class BrokenLinkChecker:
                 .error {{ color: #721c24; }}
                 .link-text {{ font-weight: bold; color: #0066cc; }}
                 .success {{ color: #28a745; font-size: 1.2em; }}
+                .coverage {{ background-color: #fff3cd; padding: 10px; border-radius: 5px; }}
             </style>
         </head>
         <body>
@@ -420,57 +3787,105 @@ class BrokenLinkChecker:
                 <h2>Summary</h2>
                 <p><strong>Website:</strong> {self.config['start_url']}</p>
                 <p><strong>Scan Date:</strong> {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-                <p><strong>Pages Crawled:</strong> {len(self.visited_urls)}</p>
+                <p><strong>Pages Crawled:</strong> {self.crawled_page_count()}</p>
                 <p><strong>Broken Links Found:</strong> {len(self.broken_links)}</p>
-                <p><strong>Internal Broken Links:</strong> {len([l for l in self.broken_links if l['link_type'] == 'internal'])}</p>
-                <p><strong>External Broken Links:</strong> {len([l for l in self.broken_links if l['link_type'] == 'external'])}</p>
+                <p><strong>Internal Broken Links:</strong> {self.broken_links.type_counts.get('internal', 0)}</p>
+                <p><strong>External Broken Links:</strong> {self.broken_links.type_counts.get('external', 0)}</p>
+                <p><strong>Internal Links to Redirects:</strong> {len(self.redirected_links)}</p>
             </div>
-        """
-        
-        if self.broken_links:
-            html_content += """
-            <h2>Broken Links Details</h2>
+        """)
+            coverage = self.coverage_lines()
+            if coverage:
+                f.write('<div class="coverage"><h2>Partial Crawl</h2>')
+                f.write(''.join(f"<p>{escape(line)}</p>" for line in coverage))
+                f.write("<p>Broken links on pages that weren't crawled are not in this report.</p></div>")
+            
+            if self.broken_links:
+                f.write("<h2>Broken Links Details</h2>")
+                for broken_link, occurrences in self.broken_links.grouped():
+                    first = next(occurrences)
+                    f.write(f"""
+            <h3 class="error">{escape(broken_link)}</h3>
+            <p><strong>Status:</strong> {first['status_code']} - {escape(str(first['error']))}
+               <strong>Type:</strong> {first['link_type'].title()}</p>
+            <table>
+                <tr class="{first['link_type']}">
+                    <th>Source Page</th>
+                    <th>Link Text</th>
+                </tr>
+            """)
+                    for link in chain([first], occurrences):
+                        f.write(f"""
+                <tr>
+                    <td><a href="{escape(link['source_page'])}" target="_blank">{escape(link['source_page'])}</a></td>
+                    <td><span class="link-text">"{escape(link['link_text'] or '')}"</span><br><small>{escape(link['link_title'] or '')}</small></td>
+                </tr>
+                """)
+                    f.write("</table>")
+            else:
+                f.write('<h2 class="success">✅ No broken links found!</h2>')
+            
+            if self.redirected_links:
+                f.write(f"<h2>Internal Links to Redirects ({len(self.redirected_links)})</h2>")
+                f.write("<p>Each redirect costs visitors an extra round trip; link to the final URL instead.</p>")
+                for redirect in self.sorted_redirected_links():
+                    f.write(f"""
+            <h3>{escape(redirect['url'])}</h3>
+            <p><strong>Redirects:</strong> {len(redirect['hops'])}
+               <strong>Chain:</strong> {escape(self.redirect_chain_text(redirect))}</p>
             <table>
                 <tr>
                     <th>Source Page</th>
                     <th>Link Text</th>
-                    <th>Broken Link</th>
-                    <th>Status Code</th>
-                    <th>Error</th>
-                    <th>Type</th>
                 </tr>
-            """
-            
-            for link in self.broken_links:
-                css_class = link['link_type']
-                # Escape HTML in link text
-                link_text = link['link_text'].replace('<', '&lt;').replace('>', '&gt;')
-                html_content += f"""
-                <tr class="{css_class}">
-                    <td><a href="{link['source_page']}" target="_blank">{link['source_page']}</a></td>
-                    <td><span class="link-text">"{link_text}"</span><br><small>{link.get('link_title', '')}</small></td>
-                    <td class="error">{link['broken_link']}</td>
-                    <td>{link['status_code']}</td>
-                    <td>{link['error']}</td>
-                    <td>{link['link_type'].title()}</td>
+            """)
+                    for source_page, link_text in redirect['pages'].items():
+                        f.write(f"""
+                <tr>
+                    <td><a href="{escape(source_page)}" target="_blank">{escape(source_page)}</a></td>
+                    <td><span class="link-text">"{escape(link_text or '')}"</span></td>
                 </tr>
-                """
+                """)
+                    f.write("</table>")
             
-            html_content += "</table>"
-        else:
-            html_content += '<h2 class="success">✅ No broken links found!</h2>'
-        
-        html_content += """
+            f.write("""
         </body>
         </html>
-        """
-        
-        html_filename = f"broken_links_report_{timestamp}.html"
-        with open(html_filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        """)
         
         return html_filename
 
+    def sorted_redirected_links(self) -> List[Dict]:
+        """Redirected internal links, longest chains first."""
+        return sorted(self.redirected_links.values(), key=lambda redirect: (-len(redirect['hops']), redirect['url']))
+
+    def redirect_chain_text(self, redirect: Dict) -> str:
+        """A redirect chain as "url [301] → url [302] → final url"."""
+        return ' → '.join([f"{url} [{status_code}]" for url, status_code in redirect['hops']] + [redirect['final_url']])
+
+    def email_summary(self) -> str:
+        """Plain-text list of broken URLs for the email body, capped at max_listed_links."""
+        max_listed = self.config['email'].get('max_listed_links', 100)
+        lines = []
+        listed = 0
+        for broken_link, occurrences in self.broken_links.grouped():
+            if listed == max_listed:
+                lines.append(f"\n... more broken links are listed in the HTML report.\n")
+                break
+            listed += 1
+            first = next(occurrences)
+            pages = 1 + sum(1 for _ in occurrences)
+            lines.append(f"""
+{listed}. BROKEN LINK:
+   Text: "{first['link_text']}"
+   URL: {broken_link}
+   Status: {first['status_code']} - {first['error']}
+   Found on: {first['source_page']}{f' (and {pages - 1} more pages)' if pages > 1 else ''}
+   Type: {first['link_type'].title()}
+   {'='*60}
+""")
+        return ''.join(lines)
+
     def send_email_report(self, html_file: str):
         """Send email report with HTML attachment."""
         if not self.config['email']['enabled']:
@@ -484,33 +3899,30 @@ class BrokenLinkChecker:
                 domain=urlparse(self.config['start_url']).netloc
             )
             
+            # Large reports are left on disk rather than read back in to attach
+            max_attachment_bytes = self.config['email'].get('max_attachment_mb', 10) * 1024 * 1024
+            attach_report = os.path.getsize(html_file) <= max_attachment_bytes
+            if attach_report:
+                report_note = "Please see the attached HTML report for a detailed, formatted view."
+            else:
+                report_note = f"The HTML report is too large to attach; it is saved as {os.path.abspath(html_file)}."
+            coverage = ''.join(f"{line}\n" for line in self.coverage_lines())
+            
             # Email body
             if self.broken_links:
                 body = f"""
 Broken Links Report for {self.config['start_url']}
 
 Scan completed at: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Pages crawled: {len(self.visited_urls)}
+Pages crawled: {self.crawled_page_count()}
 Broken links found: {len(self.broken_links)}
-
+Internal links to redirects: {len(self.redirected_links)}
+{coverage}
 BROKEN LINKS SUMMARY:
 {'='*60}
+{self.email_summary()}
 
-"""
-                for i, link in enumerate(self.broken_links, 1):
-                    body += f"""
-{i}. BROKEN LINK:
-   Text: "{link['link_text']}"
-   URL: {link['broken_link']}
-   Status: {link['status_code']} - {link['error']}
-   Found on: {link['source_page']}
-   Type: {link['link_type'].title()}
-   {'='*60}
-"""
-                
-                body += f"""
-
-Please see the attached HTML report for a detailed, formatted view.
+{report_note}
 
 This is an automated report from your website link checker.
                 """
@@ -519,9 +3931,10 @@ This is an automated report from your website link checker.
 ✅ GREAT NEWS! No broken links found on {self.config['start_url']}
 
 Scan completed at: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Pages crawled: {len(self.visited_urls)}
+Pages crawled: {self.crawled_page_count()}
 External links checked: {len(self.checked_external_links)}
-
+Internal links to redirects: {len(self.redirected_links)}
+{coverage}
 Your website's links are all working properly!
 
 This is an automated report from your website link checker.
@@ -530,15 +3943,16 @@ This is an automated report from your website link checker.
             msg.attach(MIMEText(body, 'plain'))
             
             # Attach HTML report
-            with open(html_file, 'rb') as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {html_file}'
-                )
-                msg.attach(part)
+            if attach_report:
+                with open(html_file, 'rb') as attachment:
+                    part = MIMEBase('application', 'octet-stream')
+                    part.set_payload(attachment.read())
+                    encoders.encode_base64(part)
+                    part.add_header(
+                        'Content-Disposition',
+                        f'attachment; filename= {html_file}'
+                    )
+                    msg.attach(part)
             
             # Send email
             server = smtplib.SMTP(self.config['email']['smtp_server'], self.config['email']['smtp_port'])
@@ -580,15 +3994,911 @@ This is an automated report from your website link checker.
         except Exception as e:
             self.logger.error(f"Error during link check: {e}")
             raise
+        finally:
+            self.write_metrics()
+            self.close()
+
+    def close(self):
+        """Close the checker's files and connections, and take its DNS cache out of socket.getaddrinfo.
+        
+        What a batch run shares between sites is closed by BatchResources.
+        """
+        if self.verdict_cache and not self.shared:
+            self.verdict_cache.close()
+        if self.page_fingerprints:
+            self.page_fingerprints.close()
+        if self.checkpoint:
+            self.checkpoint.close()
+        self.broken_links.close()
+        if self.log_handler:
+            self.logger.removeHandler(self.log_handler)
+            self.log_handler.close()
+        if not self.shared:
+            if self.dns_cache:
+                self.dns_cache.uninstall()
+            self.session.close()
+            self.console_listener.stop()
+
+    def write_metrics(self):
+        """Write run metrics to the configured JSON file and Prometheus textfile."""
+        metrics_config = self.config.get('metrics', {})
+        try:
+            if metrics_config.get('json_path'):
+                self.metrics.write_json(metrics_config['json_path'])
+                self.logger.info(f"Metrics saved: {metrics_config['json_path']}")
+            if metrics_config.get('prometheus_textfile'):
+                self.metrics.write_prometheus(metrics_config['prometheus_textfile'])
+        except OSError as e:
+            self.logger.error(f"Failed to write metrics: {e}")
+
+class AsyncCrawlEngine:
+    """Pipelined asyncio crawler that fills in a BrokenLinkChecker's results.
+    
+    Page fetches and link checks are work items on one bounded queue served by
+    a fixed number of workers, so fetching pages overlaps with checking links.
+    Shares the checker's config, URL filters, link result cache, page store and
+    broken_links records, so reports look the same as with the threads engine.
+    HTML parsing and the SQLite/checkpoint writes run on helper threads (or
+    the parse process pool), so a large page or a slow commit doesn't stall
+    every request in flight.
+    """
+    
+    def __init__(self, checker: BrokenLinkChecker):
+        self.checker = checker
+        self.config = checker.config
+        self.concurrency = self.config.get('async_concurrency', 20)
+        self.per_host_concurrency = self.config.get('async_per_host_concurrency', 4)
+        self.queue_size = self.config.get('async_queue_size', 100)
+        # Link checks discovered but not yet admitted to the bounded queue;
+        # pages wait in the frontier, in priority order if priorities are on
+        self.backlog = deque()
+        self.frontier = checker.create_frontier()
+        # Cleared when the budget runs out, so no more pages are admitted
+        self.crawling = True
+        self.pages_admitted = 0
+        self.outstanding = 0
+        self.host_limits: Dict[str, asyncio.Semaphore] = {}
+        # Links waiting on a check in progress: normalized URL -> [(page_url, link_data)]
+        self.inflight: Dict[str, List[Tuple[str, Dict[str, str]]]] = {}
+        self.check_done: Dict[str, asyncio.Event] = {}
+        # Pages still waiting on link checks: page URL -> number of checks
+        self.page_checks: Dict[str, int] = {}
+        # Pages with links the budget left unchecked; they aren't marked done for --resume
+        self.incomplete_pages: Set[str] = set()
+
+    def run(self, start_pages: List[Tuple[str, int]]):
+        """Run the crawl to completion from (url, depth) start pages."""
+        parse_workers = self.config.get('parse_workers', 0)
+        if parse_workers > 0:
+            self.parse_pool = concurrent.futures.ProcessPoolExecutor(parse_workers)
+        else:
+            self.parse_pool = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='parse')
+        # One thread, so store and checkpoint writes keep their order
+        self.store_pool = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='store')
+        try:
+            asyncio.run(self.crawl(start_pages))
+            self.checker.budget.pages_left += len(self.frontier)
+        finally:
+            self.frontier.close()
+            self.parse_pool.shutdown(cancel_futures=True)
+            self.store_pool.shutdown()
+
+    async def crawl(self, start_pages: List[Tuple[str, int]]):
+        """Feed the work queue until no work is left, then stop the workers."""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.checker.queue_depth = lambda: len(self.frontier) + len(self.backlog) + self.queue.qsize()
+        self.work_added = asyncio.Event()
+        self.parse_slots = asyncio.Semaphore(
+            self.config.get('max_pending_parses') or self.config.get('parse_workers', 0) * 2 or 1)
+        # Lookups go through socket.getaddrinfo, and so through the checker's DNS cache
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_concurrency,
+                                         resolver=aiohttp.ThreadedResolver(), use_dns_cache=False)
+        timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_start.append(self.connection_started)
+        trace_config.on_connection_create_end.append(self.connection_created)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[trace_config],
+                                         headers=dict(self.checker.session.headers)) as session:
+            self.session = session
+            await self.blocking(self.record_queued, [(url, depth) for url, depth in start_pages
+                                                     if self.add_page(url, depth)])
+            workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+            
+            while True:
+                while self.backlog or (self.crawling and self.frontier):
+                    item = self.backlog.popleft() if self.backlog else self.next_page()
+                    if item:
+                        await self.queue.put(item)
+                if self.outstanding == 0:
+                    break
+                self.work_added.clear()
+                await self.work_added.wait()
+            
+            for _ in workers:
+                await self.queue.put(None)
+            await asyncio.gather(*workers)
+
+    async def blocking(self, function: Callable, *args):
+        """Run a call that reads or writes a store (SQLite, checkpoint, results) off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.store_pool, function, *args)
+
+    def add_work(self, item: Tuple, first: bool = False):
+        self.outstanding += 1
+        if first:
+            self.backlog.appendleft(item)
+        else:
+            self.backlog.append(item)
+        self.work_added.set()
+
+    def add_page(self, url: str, depth: int) -> bool:
+        """Queue a page for crawling unless it was already queued or is excluded; returns True if it is new.
+        
+        The caller logs new pages to the checkpoint (see record_queued).
+        """
+        if self.checker.should_crawl_url(url) and self.checker.queue_page(self.frontier, url, depth, log=False):
+            self.work_added.set()
+            return True
+        return False
+
+    def record_queued(self, pages: List[Tuple[str, int]]):
+        for url, depth in pages:
+            self.checker.page_queued(url, depth)
+
+    def next_page(self) -> Optional[Tuple]:
+        """Take the next page from the frontier as a work item, or stop admitting pages if the budget is used up."""
+        url, depth = self.frontier.pop()
+        if not self.checker.budget.allows_page(url, self.pages_admitted):
+            self.checker.console.info(f"\n⏱️  Budget reached - no more pages will be crawled")
+            self.checker.budget.pages_left += 1
+            self.crawling = False
+            return None
+        self.pages_admitted += 1
+        self.outstanding += 1
+        return ('page', url, depth)
+
+    async def worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            kind, url, depth = item
+            try:
+                if kind == 'page':
+                    await self.crawl_page(url, depth)
+                else:
+                    await self.check_link(url)
+            except Exception as e:
+                self.checker.logger.error(f"Error processing {url}: {e}")
+                self.checker.console.warning(f"  ⚠️  Error processing {url}: {e}")
+            finally:
+                self.outstanding -= 1
+                self.work_added.set()
+
+    async def fetch(self, url: str, read_body: bool, method: str = 'GET', headers: Optional[Dict[str, str]] = None,
+                    kind: str = 'check', body_types: Tuple[str, ...] = ('text/html',)) -> Tuple[int, str, str, str, Dict]:
+        """Request a URL, following redirects through the checker's redirect cache.
+        
+        Asyncio version of BrokenLinkChecker.follow_redirects; returns what
+        fetch_once returns for the final URL.
+        """
+        checker = self.checker
+        max_redirects = checker.session.max_redirects
+        hops: List[Tuple[str, int]] = []
+        current = url
+        while True:
+            current = await self.blocking(checker.redirects.follow, current, hops, max_redirects)
+            if len(hops) >= max_redirects:
+                raise aiohttp.ClientError(f"Exceeded {max_redirects} redirects")
+            for attempt in range(HostRateLimiter.THROTTLE_RETRIES + 1):
+                # fetch_once waits for the rate limiter, which backs off after a 429/503
+                result = await self.fetch_once(current, read_body, method, headers, kind, body_types)
+                if (result[0] not in HostRateLimiter.THROTTLE_STATUSES
+                        or attempt == HostRateLimiter.THROTTLE_RETRIES or not checker.budget.allows_request(current)):
+                    break
+                checker.console.debug(f"    ⏳ THROTTLED [{result[0]}] {current} - retrying")
+            status_code, response_headers = result[0], result[4]
+            if status_code not in RedirectCache.STATUSES or 'Location' not in response_headers:
+                break
+            target = urljoin(current, response_headers['Location'])
+            await self.blocking(checker.redirects.add, current, target, status_code)
+            hops.append((current, status_code))
+            current = target
+        if hops:
+            await self.blocking(checker.store_redirect_chain, url, hops, current)
+        return result
+
+    async def fetch_once(self, url: str, read_body: bool, method: str = 'GET',
+                         headers: Optional[Dict[str, str]] = None, kind: str = 'check',
+                         body_types: Tuple[str, ...] = ('text/html',)) -> Tuple[int, str, str, str, Dict]:
+        """Request a URL within the per-host limit, recording its timings as kind.
+        
+        Returns (status, reason, content_type, html, headers). The body is only
+        read when read_body is set and the content type is one of body_types
+        (HTML pages, unless stylesheets are scanned); otherwise the response is
+        released after the headers arrive. Redirects are not followed.
+        """
+        host = urlparse(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        metrics = self.checker.metrics
+        
+        metrics.record_wait(url, await self.checker.rate_limiter.acquire_async(url))
+        self.checker.budget.count_request(url)
+        async with self.host_limits[host]:
+            # Filled in by the connection trace hooks when a new connection is opened
+            timing = {'connect': None, 'host': host.lower()}
+            started = time.perf_counter()
+            try:
+                async with self.session.request(method, url, allow_redirects=False, headers=headers,
+                                                trace_request_ctx=timing) as response:
+                    ttfb = time.perf_counter() - started
+                    self.checker.rate_limiter.update(url, response.status, response.headers.get('Retry-After'))
+                    content_type = response.headers.get('content-type', '').lower()
+                    html = ''
+                    nbytes = 0
+                    if read_body and response.status == 200 and any(body_type in content_type
+                                                                    for body_type in body_types):
+                        body = await response.read()
+                        nbytes = len(body)
+                        html = body.decode(response.get_encoding(), errors='replace')
+                    metrics.record_request(kind, url, response.status, ttfb, time.perf_counter() - started,
+                                           nbytes=nbytes, connect=timing['connect'])
+                    return response.status, response.reason or '', content_type, html, response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                metrics.record_request(kind, url, 0, None, time.perf_counter() - started, connect=timing['connect'])
+                raise
+
+    async def connection_started(self, session, trace_ctx, params):
+        trace_ctx.connect_started = time.perf_counter()
+
+    async def connection_created(self, session, trace_ctx, params):
+        if trace_ctx.trace_request_ctx is not None:
+            trace_ctx.trace_request_ctx['connect'] = time.perf_counter() - trace_ctx.connect_started
+            self.checker.transport_stats.connection_opened(trace_ctx.trace_request_ctx['host'])
+
+    async def probe_link(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, str, Dict]:
+        """Asyncio version of BrokenLinkChecker.probe_link, returning (status, reason, headers)."""
+        checker = self.checker
+        if checker.use_head(url):
+            status_code, reason, _, _, response_headers = await self.fetch(
+                url, read_body=False, method='HEAD', headers=headers)
+            if status_code in (405, 501):
+                checker.head_unsupported_hosts.add(urlparse(url).netloc.lower())
+            elif status_code < 400 or not self.config.get('confirm_head_failures', True):
+                return status_code, reason, response_headers
+        status_code, reason, _, _, response_headers = await self.fetch(url, read_body=False, headers=headers)
+        return status_code, reason, response_headers
+
+    async def check_link(self, url: str):
+        """Check a link and resolve every page that was waiting on it.
+        
+        Unexpected errors (from the verdict cache or a store, say) are logged
+        and recorded as the link's verdict, like the threads engine does, and
+        the waiting pages are resolved regardless, so the crawl can't stall.
+        """
+        checker = self.checker
+        cache_key = checker.normalize_url(url)
+        result = None
+        skipped = False
+        try:
+            try:
+                result, skipped = await self.link_result(url, cache_key)
+            except Exception as e:
+                checker.logger.error(f"Error checking link {url}: {e}")
+                checker.console.warning(f"  ⚠️  Error checking {url}: {e}")
+                result = (False, str(e) or type(e).__name__, 0)
+            if not skipped:
+                await self.blocking(checker.store_link_result, cache_key, result)
+            # References in a scanned stylesheet are checked like links on a page
+            css_links = checker.stylesheet_links.pop(cache_key, None)
+            if css_links:
+                self.page_checks.setdefault(url, 0)
+                await self.queue_links(url, css_links)
+                if not self.page_checks[url]:
+                    del self.page_checks[url]
+        finally:
+            waiting = self.inflight.pop(cache_key, [])
+            done_pages = []
+            for page_url, link_data in waiting:
+                if skipped:
+                    self.incomplete_pages.add(page_url)
+                self.page_checks[page_url] -= 1
+                if not self.page_checks[page_url]:
+                    del self.page_checks[page_url]
+                    if page_url not in self.incomplete_pages:
+                        done_pages.append(page_url)
+            try:
+                results = [] if skipped or result is None else [
+                    (page_url, link_data, result) for page_url, link_data in waiting]
+                await self.blocking(self.record_results, results, done_pages)
+            finally:
+                self.check_done.pop(cache_key).set()
+
+    async def link_result(self, url: str, cache_key: str) -> Tuple[Optional[Tuple[bool, str, int]], bool]:
+        """The verdict for a link, from the verdict cache or a request; returns (result, skipped by the budget)."""
+        checker = self.checker
+        link_type = self.inflight[cache_key][0][1]['type']
+        cache = checker.verdict_cache
+        crawlable = checker.should_crawl_url(url)
+        result = None
+        
+        entry = await self.blocking(checker.cached_link_entry, url, link_type) if cache else None
+        if entry:
+            if cache.is_fresh(entry, link_type, checker.url_filter.is_internal(url)):
+                cache.fresh_hits += 1
+                self.checker.console.debug(f"    💾 CACHED [{entry['status_code']}] {url}")
+                await self.blocking(checker.replay_redirect_chain, url)
+                result = checker.use_cached_entry(url, entry)
+        headers = cache.conditional_headers(entry) if entry else {}
+        scan = checker.scans_stylesheet(link_type)
+        # Out of time or out of requests for this host: the link is left unchecked
+        skipped = result is None and not checker.budget.allows_request(url)
+        if skipped:
+            checker.budget.skip_link(cache_key)
+            self.checker.console.debug(f"    ⏱️  NOT CHECKED (budget) {url}")
+        
+        if result is None and not skipped:
+            try:
+                self.checker.console.debug(f"    Checking: {url}")
+                if crawlable and checker.expects_page(url, link_type):
+                    status_code, reason, content_type, body, response_headers = await self.fetch(
+                        url, read_body=True, headers=headers or checker.page_request_headers(url))
+                    if status_code != 304 or not entry:
+                        checker.page_store[cache_key] = (
+                            status_code, content_type, body if 'text/html' in content_type else '',
+                            checker.response_validators(response_headers)
+                        )
+                elif scan:
+                    status_code, reason, content_type, body, response_headers = await self.fetch(
+                        url, read_body=True, headers=headers, body_types=('text/css',))
+                    if crawlable and status_code != 304:
+                        checker.store_resource_response(url, status_code, content_type)
+                else:
+                    status_code, reason, response_headers = await self.probe_link(url, headers)
+                    if crawlable and status_code != 304:
+                        checker.store_resource_response(url, status_code,
+                                                        response_headers.get('content-type', '').lower())
+                
+                if scan and body and 'text/css' in content_type:
+                    final_url = checker.redirect_chains.get(cache_key, {}).get('final_url', url)
+                    checker.stylesheet_links[cache_key] = extract_css_links(body, final_url)
+                
+                if status_code == 304 and not entry:
+                    # Unchanged since the last incremental run; crawl_page replays its links
+                    self.checker.console.debug(f"    💾 NOT MODIFIED [304] {url}")
+                    result = (True, reason, 304)
+                elif status_code == 304:
+                    cache.revalidated += 1
+                    await self.blocking(cache.touch, url)
+                    self.checker.console.debug(f"    💾 NOT MODIFIED [{entry['status_code']}] {url}")
+                    result = checker.use_cached_entry(url, entry)
+                else:
+                    if cache:
+                        cache.fetched += 1
+                        await self.blocking(cache.put, url, status_code, reason, response_headers)
+                    status = "✅ OK" if status_code < 400 else "❌ BROKEN"
+                    self.checker.console.debug(f"    {status} [{status_code}] {url}")
+                    result = (status_code < 400, reason, status_code)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self.checker.console.debug(f"    ❌ ERROR [0] {url} - {str(e) or type(e).__name__}")
+                result = (False, str(e) or type(e).__name__, 0)
+                if cache:
+                    await self.blocking(cache.put, url, 0, result[1])
+        
+        return result, skipped
+
+    def record_results(self, results: List[Tuple[str, Dict[str, str], Tuple[bool, str, int]]],
+                       done_pages: List[str] = ()):
+        """Record link results, then mark the pages they completed as done (runs on the store thread)."""
+        for page_url, link_data, result in results:
+            self.checker.record_link_result(page_url, link_data, result)
+        for page_url in done_pages:
+            self.checker.page_done(page_url)
+
+    async def crawl_page(self, url: str, depth: int):
+        """Crawl a page, then queue checks for its links and the new pages it links to.
+        
+        The page counts as done for checkpoints once every link check it is
+        waiting on has finished.
+        """
+        if not self.checker.budget.allows_request(url):
+            # The deadline passed while the page was waiting in the queue
+            self.checker.budget.pages_left += 1
+            return
+        links = await self.page_links(url)
+        # Checks of a stylesheet's references may already be counted under its URL
+        self.page_checks.setdefault(url, 0)
+        await self.queue_links(url, links)
+        new_pages = [(link_data['url'], depth + 1) for link_data in links if self.add_page(link_data['url'], depth + 1)]
+        if new_pages:
+            await self.blocking(self.record_queued, new_pages)
+        if not self.page_checks[url]:
+            del self.page_checks[url]
+            await self.blocking(self.checker.page_done, url)
+
+    async def page_links(self, url: str) -> List[Dict[str, str]]:
+        """Fetch (or reuse) a page and return its links."""
+        checker = self.checker
+        cache_key = checker.normalize_url(url)
+        self.checker.pages_crawled += 1
+        self.checker.console.info(f"\n📄 [{self.checker.pages_crawled}] Crawling: {url}")
+        
+        # A check of this page is running - wait for it and reuse its response
+        if cache_key in self.check_done:
+            await self.check_done[cache_key].wait()
+        
+        stored = checker.page_store.pop(cache_key, None)
+        if stored is None and cache_key in checker.link_results:
+            is_working, reason, status_code = checker.link_results[cache_key]
+            if not is_working:
+                self.checker.console.info(f"  ❌ Page failed to load [{status_code}] {reason}")
+                return []
+        
+        if stored is None:
+            try:
+                status_code, reason, content_type, html, headers = await self.fetch(
+                    url, read_body=True, headers=checker.page_request_headers(url), kind='page')
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                checker.logger.error(f"Error crawling {url}: {e}")
+                self.checker.console.info(f"  ❌ Error fetching page: {e}")
+                await self.blocking(checker.store_link_result, cache_key, (False, str(e) or type(e).__name__, 0))
+                return []
+            await self.blocking(checker.store_link_result, cache_key, (status_code < 400, reason, status_code))
+            stored = (status_code, content_type, html, checker.response_validators(headers))
+        
+        status_code, content_type, html, validators = stored
+        if status_code == 304:
+            links = await self.blocking(checker.replay_page_links, url)
+        elif status_code != 200:
+            self.checker.console.info(f"  ❌ Page failed to load [{status_code}]")
+            return []
+        elif 'text/html' not in content_type:
+            self.checker.console.info(f"  ⚠️  Not an HTML page (content-type: {content_type})")
+            return []
+        else:
+            links = await self.blocking(checker.unchanged_page_links, url, html)
+            if links is None:
+                links = await self.extract_links(url, html)
+                await self.blocking(checker.save_page_links, url, html, validators, links)
+        return links
+
+    async def extract_links(self, url: str, html: str) -> List[Dict[str, str]]:
+        """Parse a page on the parse thread, or in the process pool when parse_workers is set."""
+        # Bounded so fetched-but-unparsed pages can't pile up in memory
+        async with self.parse_slots:
+            compact_links, anchors, parse_seconds = await asyncio.get_running_loop().run_in_executor(
+                self.parse_pool, parse_page_links, self.checker.extractor_name, html, url)
+        self.checker.metrics.record_parse(parse_seconds)
+        self.checker.store_page_anchors(url, anchors)
+        links = [dict(zip(LINK_FIELDS, link)) for link in compact_links]
+        self.checker.console.info(f"  Found {len(links)} links on this page")
+        return links
+
+    async def queue_links(self, page_url: str, links: List[Dict[str, str]]):
+        """Resolve links from the cache, or queue one check per new URL."""
+        checker = self.checker
+        cached = []
+        
+        for link_data in links:
+            link_url = link_data['url']
+            internal = checker.url_filter.is_internal(link_url)
+            
+            if not checker.should_check_url(link_url):
+                continue
+            if not internal and not self.config['include_external_links']:
+                continue
+            
+            cache_key = checker.normalize_url(link_url)
+            if cache_key in checker.link_results:
+                checker.cache_hits += 1
+                cached.append((page_url, link_data, checker.link_results[cache_key]))
+                continue
+            
+            self.page_checks[page_url] += 1
+            if cache_key in self.inflight:
+                checker.cache_hits += 1
+                self.inflight[cache_key].append((page_url, link_data))
+                continue
+            
+            checker.cache_misses += 1
+            if not internal:
+                checker.checked_external_links.add(link_url)
+            self.inflight[cache_key] = [(page_url, link_data)]
+            self.check_done[cache_key] = asyncio.Event()
+            # Links that were broken in a recent run are checked first
+            self.add_work(('check', link_url, None), first=cache_key in checker.broken_history)
+        if cached:
+            await self.blocking(self.record_results, cached)
+
+class DistributedCoordinator:
+    """Runs a crawl on worker processes that share a crawl store, then merges their results.
+    
+    Pages and link checks are partitioned by host hash, so each host is only
+    ever requested by one worker and its rate limits still hold. Workers are
+    spawned on this machine unless spawn_workers is off; then they are
+    started separately (on any machine that can reach the store) with
+    --worker INDEX. Spawned workers get the coordinator's config, command
+    line overrides included, and are restarted (up to MAX_RESTARTS times
+    each) if they die while work is left.
+    """
+    
+    STATUS_INTERVAL = 5
+    MAX_RESTARTS = 3
+    
+    def __init__(self, checker: BrokenLinkChecker):
+        self.checker = checker
+        self.config = checker.config.get('distributed', {})
+        self.workers = self.config.get('workers', 4)
+
+    def run(self, start_pages: List[Tuple[str, int]]):
+        checker = self.checker
+        store = open_crawl_store(self.config.get('store', 'link_checker_crawl.sqlite'))
+        try:
+            store.reset()
+            store.enqueue([(checker.normalize_url(url), url, 'page', 'link', host_partition(url, self.workers))
+                           for url, _ in start_pages if checker.should_crawl_url(url)])
+            
+            processes = []
+            restarts = [0] * self.workers
+            if self.config.get('spawn_workers', True):
+                processes = [self.spawn_worker(index) for index in range(self.workers)]
+            else:
+                checker.console.log(NOTICE, f"⏳ Waiting for workers 0-{self.workers - 1} (start them with --worker INDEX)")
+            
+            while True:
+                if processes:
+                    for process in processes:
+                        process.join(self.STATUS_INTERVAL / len(processes))
+                    for index, process in enumerate(processes):
+                        if process.exitcode and restarts[index] < self.MAX_RESTARTS and store.unfinished():
+                            checker.logger.warning(f"Worker {index} died (exit code {process.exitcode}) - restarting it")
+                            restarts[index] += 1
+                            store.release(index)
+                            processes[index] = self.spawn_worker(index)
+                    if not any(process.is_alive() for process in processes):
+                        break
+                else:
+                    time.sleep(self.STATUS_INTERVAL)
+                unfinished = store.unfinished()
+                if unfinished == 0 and not processes:
+                    break
+                checker.console.log(NOTICE, f"⏳ {unfinished} pages and links still queued or in progress")
+            
+            self.merge(store)
+        finally:
+            store.close()
+
+    def spawn_worker(self, index: int) -> multiprocessing.Process:
+        checker = self.checker
+        process = multiprocessing.Process(
+            target=run_distributed_worker,
+            args=(checker.config_file, index, checker.use_cache, checker.console.level, checker.config, checker.site))
+        process.start()
+        return process
+
+    def merge(self, store):
+        """Fill in the checker's crawl statistics, broken and redirected links and anchors from the store."""
+        checker = self.checker
+        for url_key, url, kind in store.items():
+            if kind == 'page':
+                checker.visited_urls.add(url_key)
+            elif not checker.url_filter.is_internal(url):
+                checker.checked_external_links.add(url_key)
+        checker.pages_crawled = len(checker.visited_urls)
+        for source_page, url, text, title, link_type, reason, status_code in store.broken_occurrences():
+            link_data = {'url': url, 'text': text, 'title': title, 'type': link_type}
+            checker.broken_links.add(checker.broken_link_record(source_page, link_data, reason, status_code))
+        for source_page, url, text, title, link_type, redirect in store.redirect_occurrences():
+            if checker.url_filter.is_internal(url):
+                link_data = {'url': url, 'text': text, 'title': title, 'type': link_type}
+                checker.record_redirected_link(source_page, link_data, redirect)
+        if checker.check_anchors:
+            # Resolved against each other by check_fragment_links once the crawl is done
+            for url_key, anchors in store.page_anchors():
+                checker.page_anchors[url_key] = frozenset(anchors)
+            for source_page, url, text, title, link_type, status_code in store.fragment_occurrences():
+                link_data = {'url': url, 'text': text, 'title': title, 'type': link_type}
+                checker.record_fragment_link(source_page, link_data, status_code)
+
+
+class DistributedWorker:
+    """One shard of a distributed crawl: the pages and links whose hosts hash to its index.
+    
+    Claims work from the shared store, checks each URL (and crawls it if it
+    is a page), and writes back the result, the links found on the page and
+    any new work. When its own partition is empty it takes over items whose
+    lease ran out, since their worker died. Exits once no work is left
+    anywhere.
+    """
+    
+    POLL_SECONDS = 0.5
+    
+    def __init__(self, checker: BrokenLinkChecker, index: int):
+        self.checker = checker
+        self.index = index
+        config = checker.config.get('distributed', {})
+        self.store = open_crawl_store(config.get('store', 'link_checker_crawl.sqlite'))
+        self.workers = config.get('workers', 4)
+        self.batch_size = config.get('batch_size', 20)
+        self.lease = config.get('lease_seconds', 600)
+        # Guards the checker's counters, which the worker's threads update
+        self.lock = threading.Lock()
+
+    def run(self):
+        checker = self.checker
+        checker.console.log(NOTICE, f"👷 Worker {self.index} of {self.workers} started")
+        in_flight = set()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=checker.config['max_workers']) as pool:
+                while True:
+                    if len(in_flight) < self.batch_size:
+                        items = self.store.claim(self.index, self.batch_size - len(in_flight), self.lease)
+                        if not items and not in_flight:
+                            items = self.store.claim_expired(self.batch_size, self.lease)
+                        in_flight |= {pool.submit(self.process, item) for item in items}
+                    if not in_flight:
+                        if self.store.unfinished() == 0:
+                            break
+                        time.sleep(self.POLL_SECONDS)
+                        continue
+                    _, in_flight = concurrent.futures.wait(in_flight, timeout=self.POLL_SECONDS,
+                                                           return_when=concurrent.futures.FIRST_COMPLETED)
+        finally:
+            self.store.close()
+        checker.console.log(NOTICE, f"👷 Worker {self.index} finished: {checker.pages_crawled} pages crawled, "
+                                    f"{checker.cache_misses} links checked")
+
+    def process(self, item: Tuple[str, str, str, str]):
+        url_key, url, kind, link_type = item
+        checker = self.checker
+        try:
+            # For pages this is the crawl fetch too: crawl_page reuses the response
+            result = checker.check_link(url, '', link_type)
+            with self.lock:
+                checker.cache_misses += 1
+            self.store.put_result(url_key, result)
+            if url_key in checker.redirect_chains:
+                self.store.put_redirect(url_key, checker.redirect_chains[url_key])
+            css_links = checker.stylesheet_links.pop(url_key, None)
+            if css_links:
+                self.queue_links(url, css_links, crawl_pages=False)
+            if kind == 'page':
+                with self.lock:
+                    checker.pages_crawled += 1
+                checker.console.info(f"\n📄 [worker {self.index}] Crawling: {url}")
+                self.queue_links(url, checker.crawl_page(url))
+                # crawl_page keeps the page's anchor names (under its final URL) for the coordinator
+                for page_key in list(checker.page_anchors):
+                    anchors = checker.page_anchors.pop(page_key, None)
+                    if anchors is not None:
+                        self.store.put_anchors(page_key, anchors)
+        except Exception as e:
+            checker.logger.error(f"Error processing {url}: {e}")
+        finally:
+            # Only after new work is queued, so the store never looks finished too early
+            self.store.complete(url_key, kind)
+
+    def queue_links(self, page_url: str, links: List[Dict[str, str]], crawl_pages: bool = True):
+        """Record where each link was found and queue every new URL on its host's partition.
+        
+        With crawl_pages off (a stylesheet's references) the links are only checked.
+        """
+        checker = self.checker
+        occurrences = []
+        items = []
+        for link_data in links:
+            link_url = link_data['url']
+            crawl = crawl_pages and checker.should_crawl_url(link_url)
+            check = checker.should_check_url(link_url) and (
+                self.checker.config['include_external_links'] or checker.url_filter.is_internal(link_url))
+            if not (check or crawl):
+                continue
+            url_key = checker.normalize_url(link_url)
+            if check:
+                occurrences.append((page_url, url_key, link_url, link_data['text'], link_data['title'], link_data['type']))
+            items.append((url_key, link_url, 'page' if crawl else 'check', link_data['type'],
+                          host_partition(link_url, self.workers)))
+        self.store.enqueue(items)
+        self.store.add_occurrences(occurrences)
+
+
+def run_distributed_worker(config_file: str, index: int, use_cache: bool = True, console_level: Optional[int] = None,
+                           config: Optional[Dict] = None, site: Optional[str] = None,
+                           configure: Optional[Callable[['BrokenLinkChecker'], None]] = None):
+    """Entry point for a distributed crawl worker process.
+    
+    Spawned workers get the coordinator's resolved config (and, in batch
+    runs, its site slug); workers started with --worker load config_file and
+    apply the command line with configure.
+    """
+    checker = BrokenLinkChecker(config_file, use_cache=use_cache, config=config, site=site)
+    if configure:
+        configure(checker)
+    if console_level:
+        checker.console.setLevel(console_level)
+    if checker.verdict_cache:
+        # The other workers write to the same cache file; a batch of uncommitted
+        # writes would keep them waiting for its lock until they time out
+        checker.verdict_cache.commit_every = 1
+    try:
+        DistributedWorker(checker, index).run()
+    finally:
+        checker.close()
+
+
+class BatchRunner:
+    """Crawls several sites concurrently in one process, each from its own config.
+    
+    Every site gets its own crawl, report and email, while connections, rate
+    limits and link verdicts are shared through BatchResources. The batch
+    file lists the site configs (relative to the batch file) and the shared
+    settings:
+    
+        {"sites": ["site_a.json", "site_b.json"], "concurrent_sites": 4,
+         "connection_pools": 100, "rate_limits": {...}, "cache": {...}}
+    """
+    
+    def __init__(self, batch_file: str, use_cache: bool = True):
+        with open(batch_file, 'r') as f:
+            self.config = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(batch_file))
+        self.site_configs = [os.path.join(base_dir, path) for path in self.config.get('sites', [])]
+        self.concurrent_sites = max(1, min(self.config.get('concurrent_sites', 4), len(self.site_configs) or 1))
+        self.use_cache = use_cache
+
+    def pool_maxsize(self) -> int:
+        """Connections per host: enough for every worker of the busiest sites at once."""
+        max_workers = []
+        for path in self.site_configs:
+            try:
+                with open(path, 'r') as f:
+                    max_workers.append(json.load(f).get('max_workers', 3))
+            except (OSError, ValueError):
+                max_workers.append(3)
+        busiest = sorted(max_workers, reverse=True)[:self.concurrent_sites]
+        return sum(busiest) + self.concurrent_sites
+
+    def site_slugs(self) -> List[str]:
+        """Per-site slugs for output file names, from the config name and start URL (host and path)."""
+        slugs = []
+        for path in self.site_configs:
+            try:
+                with open(path, 'r') as f:
+                    start_url = urlparse(json.load(f).get('start_url', ''))
+            except (OSError, ValueError):
+                start_url = urlparse('')
+            name = os.path.splitext(os.path.basename(path))[0]
+            slug = re.sub(r'[^\w.-]+', '_', f"{name}_{start_url.netloc}{start_url.path}").strip('_.')
+            # Two configs with the same name and start URL in different directories
+            if slug in slugs:
+                slug = f"{slug}_{len(slugs) + 1}"
+            slugs.append(slug)
+        return slugs
+
+    def run(self, configure: Optional[Callable[[BrokenLinkChecker], None]] = None):
+        """Crawl every site; configure, if given, adjusts each checker before it runs."""
+        shared = BatchResources(self.config, self.use_cache, self.pool_maxsize())
+        console = shared.console
+        console.log(NOTICE, f"📚 Checking {len(self.site_configs)} sites, {self.concurrent_sites} at a time")
+        
+        def check_site(config_file: str, site: str) -> Tuple[str, Optional[BrokenLinkChecker], Optional[str]]:
+            try:
+                checker = BrokenLinkChecker(config_file, use_cache=self.use_cache, shared=shared, site=site)
+                if configure:
+                    configure(checker)
+                checker.run()
+                return config_file, checker, None
+            except Exception as e:
+                return config_file, None, str(e)
+        
+        results = []
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrent_sites) as pool:
+                for config_file, checker, error in pool.map(check_site, self.site_configs, self.site_slugs()):
+                    if error:
+                        console.log(NOTICE, f"❌ {config_file}: {error}")
+                    else:
+                        console.log(NOTICE, f"✅ {checker.config['start_url']}: {checker.pages_crawled} pages, "
+                                            f"{len(checker.broken_links)} broken links")
+                    results.append((config_file, checker, error))
+            
+            console.log(NOTICE, f"\n📚 Batch complete: {sum(1 for _, _, error in results if not error)} of "
+                                f"{len(results)} sites checked, {len(shared.link_results)} unique links verified")
+        finally:
+            shared.close()
+        return results
+
 
 def main():
     parser = argparse.ArgumentParser(description='Check website for broken links')
     parser.add_argument('--config', default='link_checker_config.json', 
                        help='Configuration file path')
+    parser.add_argument('--batch', metavar='BATCH_FILE',
+                       help='Check every site listed in BATCH_FILE, sharing connections and link verdicts')
+    parser.add_argument('--engine', choices=['threads', 'async', 'distributed'],
+                       help='Crawl engine (overrides the "engine" config setting)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Seed the crawl from sitemap.xml and skip parsing unchanged pages')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                       help='Write crawl checkpoints to PATH so the run can be resumed')
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                       help='Resume an interrupted crawl from its checkpoint file')
+    parser.add_argument('--check-external-anchors', action='store_true',
+                       help='Also fetch external pages to check that linked #anchors exist')
+    parser.add_argument('--max-pages', type=int, metavar='N',
+                       help='Stop after crawling N pages and report partial coverage')
+    parser.add_argument('--max-depth', type=int, metavar='N',
+                       help='Only crawl pages up to N links away from the start URL')
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                       help='Stop crawling after SECONDS and report partial coverage')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore and don\'t update the persistent link verdict cache')
+    parser.add_argument('--quiet', action='store_true',
+                       help='Only show a live progress line and the final summary')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Also show the result of every link check')
+    parser.add_argument('--workers', type=int,
+                       help='Number of workers for the distributed engine')
+    parser.add_argument('--worker', type=int, metavar='INDEX',
+                       help='Run only distributed worker INDEX against the configured crawl store')
+    parser.add_argument('--metrics', metavar='PATH',
+                       help='Write request timings and throughput metrics to PATH as JSON')
+    parser.add_argument('--profile', metavar='PATH',
+                       help='Profile the run with cProfile and save the stats to PATH')
     args = parser.parse_args()
     
-    checker = BrokenLinkChecker(args.config)
-    checker.run()
+    def configure(checker: BrokenLinkChecker):
+        if args.engine:
+            checker.config['engine'] = args.engine
+        if args.incremental:
+            checker.config.setdefault('incremental', {})['enabled'] = True
+        if args.checkpoint or args.resume:
+            checkpoint_config = checker.config.setdefault('checkpoint', {})
+            checkpoint_config['enabled'] = True
+            checkpoint_config['path'] = args.resume or args.checkpoint
+            checkpoint_config['resume'] = bool(args.resume)
+        if args.check_external_anchors:
+            checker.config.setdefault('anchors', {})['external'] = True
+        for setting, value in (('max_pages', args.max_pages), ('max_depth', args.max_depth),
+                               ('max_seconds', args.time_limit)):
+            if value is not None:
+                checker.config.setdefault('budget', {})[setting] = value
+        if args.metrics:
+            checker.config.setdefault('metrics', {})['json_path'] = args.metrics
+        if args.workers:
+            checker.config.setdefault('distributed', {})['workers'] = args.workers
+        if args.quiet:
+            checker.console.setLevel(NOTICE)
+        elif args.verbose:
+            checker.console.setLevel(logging.DEBUG)
+    
+    if args.worker is not None:
+        run_distributed_worker(args.config, args.worker, not args.no_cache, configure=configure)
+        return
+    
+    if args.batch:
+        if args.checkpoint or args.resume or args.metrics:
+            parser.error('--checkpoint, --resume and --metrics are set per site in batch mode')
+        BatchRunner(args.batch, use_cache=not args.no_cache).run(configure)
+        return
+    
+    checker = BrokenLinkChecker(args.config, use_cache=not args.no_cache)
+    configure(checker)
+    
+    if args.profile:
+        # Only the main thread is profiled; with the threads engine link checks run elsewhere
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            checker.run()
+        finally:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved: {args.profile} (view with: python -m pstats {args.profile})")
+    else:
+        checker.run()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,78 @@
+"""Tests for the async crawl engine."""
+
+import http.server
+import json
+import threading
+
+import pytest
+
+from broken_link_checker import BrokenLinkChecker
+
+pytest.importorskip('aiohttp')
+
+SITE = {
+    '/': '<a href="/a">A</a><a href="/missing">Missing</a><img src="/logo.png">',
+    '/a': '<a href="/">Home</a><img src="/logo.png">',
+}
+
+
+class SiteHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path in SITE:
+            body = SITE[self.path].encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+        elif self.path == '/logo.png':
+            body = b'png'
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+        else:
+            body = b''
+            self.send_response(404)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+@pytest.fixture
+def site():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_unexpected_error_is_recorded_and_the_crawl_finishes(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({
+        'start_url': site, 'engine': 'async', 'delay_between_requests': 0, 'timeout': 5,
+        'email': {'enabled': False}
+    }))
+    checker = BrokenLinkChecker(str(config_file), use_cache=False)
+    store_resource_response = checker.store_resource_response
+
+    def failing_store(url, status_code, content_type):
+        if url.endswith('/logo.png'):
+            raise RuntimeError('store is gone')
+        store_resource_response(url, status_code, content_type)
+
+    monkeypatch.setattr(checker, 'store_resource_response', failing_store)
+    crawl = threading.Thread(target=checker.crawl_website, daemon=True)
+    try:
+        crawl.start()
+        crawl.join(30)
+        assert not crawl.is_alive()
+        broken = sorted((record['source_page'], record['broken_link'], record['status_code'])
+                        for record in checker.broken_links.records())
+        assert broken == [(site, site + 'logo.png', 0), (site, site + 'missing', 404),
+                          (site + 'a', site + 'logo.png', 0)]
+    finally:
+        checker.close()
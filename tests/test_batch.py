@@ -0,0 +1,40 @@
+"""Tests for batch runs: every site writes its own output files."""
+
+import json
+
+from broken_link_checker import BatchRunner, BrokenLinkChecker
+
+
+def write_batch(tmp_path, sites):
+    for name, start_url in sites:
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(json.dumps({'start_url': start_url, 'results': {'sink': 'jsonl'},
+                                    'checkpoint': {'enabled': True}}))
+    batch_file = tmp_path / 'batch.json'
+    batch_file.write_text(json.dumps({'sites': [name for name, _ in sites]}))
+    return BatchRunner(str(batch_file))
+
+
+def test_site_slugs_are_unique(tmp_path):
+    runner = write_batch(tmp_path, [
+        ('shop.json', 'https://example.com/shop/'),
+        ('blog.json', 'https://example.com/blog/'),
+        ('other/blog.json', 'https://example.com/blog/'),
+    ])
+    assert runner.site_slugs() == ['shop_example.com_shop', 'blog_example.com_blog', 'blog_example.com_blog_3']
+
+
+def test_site_output_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = write_batch(tmp_path, [('shop.json', 'https://example.com/shop/')])
+    checker = BrokenLinkChecker(runner.site_configs[0], use_cache=False, site='shop_example.com_shop')
+    try:
+        assert checker.config['checkpoint']['path'] == 'link_checker_checkpoint_shop_example.com_shop.jsonl'
+        assert checker.config['incremental']['path'] == 'link_checker_pages_shop_example.com_shop.sqlite'
+        assert checker.config['distributed']['store'] == 'link_checker_crawl_shop_example.com_shop.sqlite'
+        assert (tmp_path / 'broken_links_shop_example.com_shop.jsonl').exists()
+        assert (tmp_path / 'link_checker_shop_example.com_shop.log').exists()
+        assert checker.output_path('redis://localhost/0') == 'redis://localhost/0'
+    finally:
+        checker.close()
@@ -0,0 +1,86 @@
+"""Tests for the crawl checkpoint log used by --resume."""
+
+import json
+
+from broken_link_checker import BrokenLinkChecker, CrawlCheckpoint
+
+
+def normalize(url):
+    return url.rstrip('/')
+
+
+def test_queued_pages_keep_their_depth(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = CrawlCheckpoint(path)
+    checkpoint.log('start', start_url='http://a/')
+    checkpoint.log('queued', url='http://a/', depth=0)
+    checkpoint.log('queued', url='http://a/docs/', depth=1)
+    checkpoint.log('queued', url='http://a/docs/deep', depth=2)
+    checkpoint.log('queued', url='http://a/docs', depth=3)
+    checkpoint.log('done', url='http://a/')
+    checkpoint.close()
+    # A log written before depths were recorded
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'e': 'queued', 'url': 'http://a/old'}) + '\n')
+
+    state = CrawlCheckpoint.load(path, normalize)
+    assert state['queued'] == {
+        'http://a': ('http://a/', 0),
+        'http://a/docs': ('http://a/docs/', 1),
+        'http://a/docs/deep': ('http://a/docs/deep', 2),
+        'http://a/old': ('http://a/old', 0),
+    }
+    assert state['done'] == {'http://a'}
+
+
+def test_resume_keeps_anchors_of_finished_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / 'checkpoint.jsonl')
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'start_url': 'http://a/', 'email': {'enabled': False}}))
+    link = {'url': 'http://a/docs#nowhere', 'text': 'Nowhere', 'title': '', 'type': 'link'}
+
+    checker = BrokenLinkChecker(str(config_file), use_cache=False)
+    checker.checkpoint = CrawlCheckpoint(path)
+    checker.store_page_anchors('http://a/docs', {'intro'})
+    checker.record_fragment_link('http://a/', link, 200)
+    checker.record_fragment_link('http://a/unfinished', link, 200)
+    checker.page_done('http://a/')
+    checker.page_done('http://a/docs')
+    checker.close()
+
+    resumed = BrokenLinkChecker(str(config_file), use_cache=False)
+    try:
+        resumed.restore_checkpoint(CrawlCheckpoint.load(path, resumed.normalize_url))
+        resumed.check_fragment_links()
+        assert (resumed.checked_anchors, resumed.missing_anchors) == (1, 1)
+        assert [(record['source_page'], record['broken_link']) for record in resumed.broken_links.records()] == [
+            ('http://a/', 'http://a/docs#nowhere')]
+    finally:
+        resumed.close()
+
+
+def test_resume_keeps_redirected_links_of_finished_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / 'checkpoint.jsonl')
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'start_url': 'http://a/', 'email': {'enabled': False}}))
+    link = {'url': 'http://a/old', 'text': 'Old', 'title': '', 'type': 'link'}
+    redirect = {'hops': [('http://a/old', 301)], 'final_url': 'http://a/new'}
+
+    checker = BrokenLinkChecker(str(config_file), use_cache=False)
+    checker.checkpoint = CrawlCheckpoint(path)
+    checker.record_redirected_link('http://a/', link, redirect)
+    checker.record_redirected_link('http://a/unfinished', link, redirect)
+    checker.page_done('http://a/')
+    checker.close()
+
+    resumed = BrokenLinkChecker(str(config_file), use_cache=False)
+    try:
+        resumed.restore_checkpoint(CrawlCheckpoint.load(path, resumed.normalize_url))
+        assert resumed.redirected_links == {'http://a/old': {
+            'url': 'http://a/old', 'text': 'Old', 'hops': [('http://a/old', 301)], 'final_url': 'http://a/new',
+            'pages': {'http://a/': 'Old'}
+        }}
+    finally:
+        resumed.close()
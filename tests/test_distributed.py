@@ -0,0 +1,236 @@
+"""Tests for the distributed engine's crawl stores and workers.
+
+Each store test runs against SQLiteCrawlStore and against RedisCrawlStore
+on a fakeredis server, the in-process stand-in for Redis.
+"""
+
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+from broken_link_checker import (BrokenLinkChecker, DistributedCoordinator, DistributedWorker, RedisCrawlStore,
+                                 SQLiteCrawlStore)
+
+
+def redis_store(server):
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisCrawlStore(fakeredis.FakeRedis(server=server))
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def open_store(request, tmp_path):
+    """Factory for clients of one shared store, as each worker process would open it."""
+    if request.param == 'sqlite':
+        return lambda: SQLiteCrawlStore(str(tmp_path / 'crawl.sqlite'))
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    return lambda: redis_store(server)
+
+
+def item(url: str, kind: str = 'page', partition: int = 0):
+    return (url, url, kind, 'link', partition)
+
+
+def drain(store, partition: int = 0):
+    """Claim and complete everything in a partition; returns the claimed items."""
+    claimed = []
+    while True:
+        items = store.claim(partition, 10, lease=600)
+        if not items:
+            return claimed
+        for url_key, url, kind, link_type in items:
+            store.complete(url_key, kind)
+        claimed.extend(items)
+
+
+def test_enqueue_dedupes_and_partitions(open_store):
+    store = open_store()
+    store.enqueue([item('http://a/1'), item('http://a/2'), item('http://b/1', partition=1)])
+    store.enqueue([item('http://a/1')])
+    assert store.unfinished() == 3
+    assert [claimed[0] for claimed in drain(store, 0)] == ['http://a/1', 'http://a/2']
+    assert store.unfinished() == 1
+    assert [claimed[0] for claimed in drain(store, 1)] == ['http://b/1']
+    assert store.unfinished() == 0
+
+
+def test_check_is_upgraded_to_page(open_store):
+    store = open_store()
+    store.enqueue([item('http://a/style.png', kind='check')])
+    store.enqueue([item('http://a/style.png', kind='page')])
+    assert any(kind == 'page' for _, _, kind, _ in drain(store))
+    assert store.unfinished() == 0
+
+
+def test_check_in_progress_is_upgraded_to_page(open_store):
+    store = open_store()
+    store.enqueue([item('http://a/page', kind='check')])
+    [(url_key, _, kind, _)] = store.claim(0, 10, lease=600)
+    store.enqueue([item('http://a/page', kind='page')])
+    store.complete(url_key, kind)
+    # The page still has to be crawled
+    assert store.unfinished() == 1
+    assert [claimed[2] for claimed in drain(store)] == ['page']
+    assert store.unfinished() == 0
+
+
+def test_done_check_is_upgraded_to_page(open_store):
+    store = open_store()
+    store.enqueue([item('http://a/page', kind='check')])
+    drain(store)
+    store.enqueue([item('http://a/page', kind='page')])
+    assert [claimed[2] for claimed in drain(store)] == ['page']
+
+
+def test_release_hands_out_claimed_items_again(open_store):
+    store = open_store()
+    store.enqueue([item('http://a/1'), item('http://a/2')])
+    assert len(store.claim(0, 10, lease=600)) == 2
+    assert store.claim(0, 10, lease=600) == []
+    store.release(0)
+    assert sorted(claimed[0] for claimed in drain(store)) == ['http://a/1', 'http://a/2']
+    assert store.unfinished() == 0
+
+
+def test_any_worker_reclaims_expired_leases(open_store):
+    dead_worker, live_worker = open_store(), open_store()
+    dead_worker.enqueue([item('http://a/1', partition=0), item('http://b/1', partition=1)])
+    assert len(dead_worker.claim(0, 10, lease=600)) == 1
+    # The other partition's worker has nothing of its own, and the lease hasn't run out yet
+    drain(live_worker, 1)
+    assert live_worker.claim_expired(10, lease=600) == []
+    time.sleep(0.05)
+    reclaimed = live_worker.claim_expired(10, lease=0.01)
+    assert [claimed[0] for claimed in reclaimed] == ['http://a/1']
+    # Reclaiming renews the lease, so nobody else takes it over
+    assert dead_worker.claim_expired(10, lease=0.01) == []
+    live_worker.complete(reclaimed[0][0], reclaimed[0][2])
+    assert live_worker.unfinished() == 0
+
+
+def test_reclaimed_item_completed_twice_counts_once(open_store):
+    dead_worker, live_worker = open_store(), open_store()
+    dead_worker.enqueue([item('http://a/1'), item('http://a/2')])
+    assert len(dead_worker.claim(0, 1, lease=600)) == 1
+    time.sleep(0.05)
+    [(url_key, _, kind, _)] = live_worker.claim_expired(10, lease=0.01)
+    live_worker.complete(url_key, kind)
+    # The first worker wasn't dead after all, and finishes the item too
+    dead_worker.complete(url_key, kind)
+    assert live_worker.unfinished() == 1
+
+
+def test_concurrent_claims_hand_out_each_item_once(open_store):
+    open_store().enqueue([item(f"http://a/{index}") for index in range(200)])
+    stores = [open_store() for _ in range(4)]
+    claimed = [[] for _ in stores]
+
+    def claim_all(store, into):
+        while True:
+            items = store.claim(0, 5, lease=600)
+            if not items:
+                return
+            into.extend(items)
+
+    threads = [threading.Thread(target=claim_all, args=(store, into)) for store, into in zip(stores, claimed)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    url_keys = [claimed_item[0] for into in claimed for claimed_item in into]
+    assert len(url_keys) == len(set(url_keys)) == 200
+
+
+def test_anchors_and_fragment_links(open_store):
+    store = open_store()
+    store.put_anchors('http://a/page', {'top', 'end'})
+    store.put_result('http://a/page', (True, 'OK', 200))
+    store.put_result('http://a/gone', (False, 'Not found', 404))
+    store.add_occurrences([('http://a/', 'http://a/page', 'http://a/page#top', 'Top', '', 'link'),
+                           ('http://a/', 'http://a/page', 'http://a/page', 'Page', '', 'link'),
+                           ('http://a/', 'http://a/gone', 'http://a/gone#top', 'Gone', '', 'link')])
+    assert [(url_key, sorted(anchors)) for url_key, anchors in store.page_anchors()] == [('http://a/page',
+                                                                                         ['end', 'top'])]
+    assert list(map(tuple, store.fragment_occurrences())) == [
+        ('http://a/', 'http://a/page#top', 'Top', '', 'link', 200)]
+
+
+SITE = {
+    '/': '<a href="/a">A</a><a href="/b">B</a><a href="/missing">Missing</a><img src="/logo.png">',
+    '/a': '<h1 id="intro">A</h1><a href="/">Home</a><a href="/b">B</a><a href="/gone">Gone</a>',
+    '/b': '<a href="/a">A</a><a href="/a#intro">Intro</a><a href="/a#nowhere">Nowhere</a>',
+}
+
+
+class SiteHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path in SITE:
+            body = SITE[self.path].encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+        elif self.path == '/logo.png':
+            body = b'png'
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+        else:
+            body = b''
+            self.send_response(404)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+@pytest.fixture
+def site():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_workers_share_a_fakeredis_store(site, tmp_path, monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    monkeypatch.chdir(tmp_path)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({
+        'start_url': site, 'delay_between_requests': 0, 'timeout': 5, 'email': {'enabled': False},
+        'distributed': {'store': 'redis://unused', 'workers': 2, 'spawn_workers': False}
+    }))
+    server = fakeredis.FakeServer()
+    store = redis_store(server)
+    checker = BrokenLinkChecker(str(config_file), use_cache=False)
+    store.enqueue([(checker.normalize_url(site), site, 'page', 'link', 0), ])
+
+    # Each worker opens its own client, as separate processes would
+    monkeypatch.setattr('broken_link_checker.open_crawl_store', lambda location: redis_store(server))
+    workers = [DistributedWorker(BrokenLinkChecker(str(config_file), use_cache=False), index) for index in range(2)]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert store.unfinished() == 0
+
+    for worker in workers:
+        worker.checker.close()
+
+    try:
+        DistributedCoordinator(checker).merge(store)
+        checker.check_fragment_links()
+        broken = sorted((record['source_page'], record['broken_link'], record['status_code'])
+                        for record in checker.broken_links.records())
+        assert broken == [(site, site + 'missing', 404), (site + 'a', site + 'gone', 404),
+                          (site + 'b', site + 'a#nowhere', 200)]
+        assert (checker.checked_anchors, checker.missing_anchors) == (2, 1)
+        assert checker.pages_crawled == 6
+    finally:
+        checker.close()
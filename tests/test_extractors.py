@@ -0,0 +1,125 @@
+"""Parity tests for the link extractor backends.
+
+Every backend is run over the HTML fixtures in fixtures/extractors and
+compared with bs4, the reference implementation. The differences listed in
+KNOWN_DIFFERENCES are documented in extract_links_bs4 and checked by the
+tests at the end instead.
+"""
+
+import importlib
+from pathlib import Path
+
+import pytest
+
+from broken_link_checker import LINK_EXTRACTORS
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'extractors'
+BASE_URL = 'http://example.com/dir/page.html'
+
+# (fixture, extractor) pairs whose output differs from bs4 by design
+KNOWN_DIFFERENCES = {
+    ('nested_anchors.html', 'lxml'),
+    ('nested_anchors.html', 'selectolax'),
+    ('unclosed_anchors.html', 'selectolax'),
+    ('template.html', 'selectolax'),
+    ('attribute_entities.html', 'lxml'),
+    ('attribute_entities.html', 'selectolax'),
+}
+
+
+def extract(extractor: str, fixture: str):
+    """Run an extractor over a fixture, skipping the test if its parser isn't installed."""
+    function, module = LINK_EXTRACTORS[extractor]
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        pytest.skip(f"{module} is not installed")
+    return function((FIXTURES / fixture).read_text(encoding='utf-8'), BASE_URL)
+
+
+def urls(links):
+    return [link['url'] for link in links]
+
+
+@pytest.mark.parametrize('fixture', sorted(path.name for path in FIXTURES.glob('*.html')))
+@pytest.mark.parametrize('extractor', [name for name in LINK_EXTRACTORS if name != 'bs4'])
+def test_matches_reference(extractor, fixture):
+    if (fixture, extractor) in KNOWN_DIFFERENCES:
+        pytest.skip("known difference, checked separately")
+    assert extract(extractor, fixture) == extract('bs4', fixture)
+
+
+def test_reference_finds_every_link_type():
+    links, anchors = extract('bs4', 'all_link_types.html')
+    by_url = {link['url']: link for link in links}
+
+    assert anchors == {'top', 'legacy-anchor', 'section-2', 'footer'}
+    assert by_url['http://example.com/about'] == {
+        'url': 'http://example.com/about', 'text': 'About', 'title': 'About us', 'type': 'link'
+    }
+    assert by_url['http://example.com/dir/contact.html']['text'] == 'Contactustoday'
+    assert by_url['http://example.com/with-script']['text'] == 'Visible'
+    assert by_url['http://example.com/refreshed']['type'] == 'link'
+    assert by_url['http://example.com/css/site.css']['type'] == 'stylesheet'
+    assert by_url['http://example.com/js/app.js']['type'] == 'script'
+    assert by_url['http://example.com/embed/map.html']['type'] == 'iframe'
+    assert by_url['http://example.com/media/poster.jpg']['type'] == 'image'
+    assert by_url['http://example.com/media/captions.vtt']['type'] == 'media'
+    for srcset_url in ('photo-2x.jpg', 'photo-3x.jpg', 'a.jpg', 'b.jpg', 'wide.webp', 'narrow.webp'):
+        assert f'http://example.com/img/{srcset_url}' in by_url
+    # Links without a URL, data: URLs and markup inside <script> are left out
+    assert len(links) == 32
+    assert not any(url.startswith('data:') or url.endswith('/not-a-link') for url in by_url)
+    # Anchors first, then the other tags in LINK_ATTRIBUTES order
+    assert [link['type'] for link in links][:13] == ['link'] * 13
+
+
+@pytest.mark.parametrize('extractor', list(LINK_EXTRACTORS))
+def test_markup_in_text_only_tags_is_ignored(extractor):
+    links, anchors = extract(extractor, 'text_only_tags.html')
+    assert urls(links) == ['http://example.com/real']
+    assert 'not-an-anchor' not in anchors
+
+
+@pytest.mark.parametrize('extractor', ['lxml', 'selectolax'])
+def test_nested_anchor_closes_outer_link(extractor):
+    links, anchors = extract(extractor, 'nested_anchors.html')
+    reference, reference_anchors = extract('bs4', 'nested_anchors.html')
+    assert urls(links) == urls(reference)
+    assert anchors == reference_anchors
+    assert links[0]['text'] == 'Outer'
+    assert reference[0]['text'] == 'OuterInnertail'
+
+
+def test_selectolax_unclosed_anchors_find_the_same_urls():
+    links, _ = extract('selectolax', 'unclosed_anchors.html')
+    reference, _ = extract('bs4', 'unclosed_anchors.html')
+    assert set(urls(links)) == set(urls(reference))
+    assert [link['text'] for link in links][:2] == ['One', 'Two']
+
+
+@pytest.mark.parametrize('extractor', ['bs4', 'scanner', 'lxml'])
+def test_template_links_have_no_text(extractor):
+    links, anchors = extract(extractor, 'template.html')
+    assert [(link['url'], link['text']) for link in links] == [
+        ('http://example.com/before', 'Before'),
+        ('http://example.com/in-template', '[No text]'),
+        ('http://example.com/after', 'After'),
+    ]
+    assert anchors == {'row-template', 'inside-template'}
+
+
+def test_selectolax_misses_template_content():
+    links, anchors = extract('selectolax', 'template.html')
+    assert urls(links) == ['http://example.com/before', 'http://example.com/after']
+    assert anchors == {'row-template'}
+
+
+@pytest.mark.parametrize('extractor', list(LINK_EXTRACTORS))
+def test_attribute_entities(extractor):
+    links, _ = extract(extractor, 'attribute_entities.html')
+    assert urls(links)[:2] == ['http://example.com/search?q=1&lang=en', 'http://example.com/search?a=1&b=2']
+    if LINK_EXTRACTORS[extractor][1] in ('bs4', 'html.parser'):
+        assert urls(links)[2] == 'http://example.com/search?page=2©=3¶=4'
+    else:
+        assert urls(links)[2] == 'http://example.com/search?page=2&copy=3&para=4'
@@ -0,0 +1,18 @@
+"""Tests for the crawl frontier."""
+
+from broken_link_checker import Frontier, VisitedSet
+
+
+def normalize(url):
+    return url.split('#')[0].rstrip('/')
+
+
+def test_reprioritized_page_keeps_its_queued_url():
+    frontier = Frontier(VisitedSet(), normalize, prioritized=True)
+    frontier.push('http://a/first', depth=1, priority=1.0)
+    frontier.push('http://a/page', depth=2, priority=2.0)
+    # A link with a fragment moves the page up, but doesn't replace its URL
+    frontier.reprioritize('http://a/page#nope', 0.5)
+    assert frontier.pop() == ('http://a/page', 2)
+    assert frontier.pop() == ('http://a/first', 1)
+    assert frontier.in_memory() == 0
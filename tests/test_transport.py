@@ -0,0 +1,159 @@
+"""Tests for the transport layer: connection counting, the DNS cache and the HTTP/2 adapter."""
+
+import http.server
+import socket
+import threading
+
+import pytest
+import requests
+from urllib3.util.retry import Retry
+
+from broken_link_checker import DNSCache, HTTP2Adapter, HTTP2Body, TransportStats, create_session
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Answers /ok, /flaky (500 until the third request) and /broken (always 500); records request paths."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.paths.append(self.path)
+        status = 200
+        if self.path.endswith('/broken') or (self.path.endswith('/flaky') and server.paths.count(self.path) < 3):
+            status = 500
+        body = b'x' * 1000
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+
+
+def test_connections_are_counted(server):
+    stats = TransportStats()
+    session = create_session(10, 2, stats)
+    for _ in range(3):
+        assert session.get(server.url + '/ok').status_code == 200
+    session.close()
+    assert stats.connections == {f"127.0.0.1:{server.server_port}": 1}
+
+
+def test_connect_time_is_kept_for_the_request_that_connected(server):
+    stats = TransportStats()
+    session = create_session(10, 2, stats)
+    stats.reset_connect_time()
+    session.get(server.url + '/ok')
+    assert stats.connect_time() > 0
+    # The pooled connection is reused
+    stats.reset_connect_time()
+    session.get(server.url + '/ok')
+    assert stats.connect_time() is None
+    session.close()
+
+
+def test_errors_keep_urllib3_class_names():
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+    session = create_session(10, 2, TransportStats())
+    session.adapters['http://'].max_retries = Retry(0)
+    with pytest.raises(requests.exceptions.ConnectionError) as error:
+        session.get(f"http://127.0.0.1:{port}/")
+    session.close()
+    assert str(error.value).startswith(f"HTTPConnectionPool(host='127.0.0.1', port={port})")
+    assert 'Counting' not in str(error.value)
+
+
+def test_dns_cache_is_bounded_and_uninstalled(monkeypatch):
+    lookups = []
+
+    def resolver(host, port, *args):
+        lookups.append(host)
+        if host == 'missing.invalid':
+            raise socket.gaierror(-2, 'Name or service not known')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', port))]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', resolver)
+    monkeypatch.setattr(DNSCache, 'MAX_ENTRIES', 2)
+    stats = TransportStats()
+    cache = DNSCache(300, stats)
+    cache.install()
+    try:
+        for host in ('a.test', 'a.test', 'b.test', 'c.test', 'a.test'):
+            socket.getaddrinfo(host, 80)
+        for _ in range(2):
+            with pytest.raises(socket.gaierror):
+                socket.getaddrinfo('missing.invalid', 80)
+    finally:
+        cache.uninstall()
+    # a.test was dropped to make room for c.test; the failed lookup is cached too
+    assert lookups == ['a.test', 'b.test', 'c.test', 'a.test', 'missing.invalid']
+    assert len(cache.entries) == 2
+    assert (stats.dns_lookups, stats.dns_cache_hits) == (5, 2)
+    assert socket.getaddrinfo is resolver
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def iter_bytes(self):
+        yield from self.chunks
+
+    def close(self):
+        pass
+
+
+def test_http2_body_reads_amt_bytes():
+    body = HTTP2Body(FakeStream([b'abc', b'defgh', b'ij']))
+    assert body.read(2) == b'ab'
+    assert body.read(4) == b'cdef'
+    assert list(body.stream(3)) == [b'ghi', b'j']
+    assert body.read(5) == b''
+    assert HTTP2Body(FakeStream([b'abc', b'def'])).read() == b'abcdef'
+
+
+@pytest.fixture
+def http2_session():
+    pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    session = requests.Session()
+    session.mount('http://', HTTP2Adapter(TransportStats(), 10, Retry(total=3, backoff_factor=0,
+                                                                       status_forcelist=[500])))
+    yield session
+    session.close()
+
+
+def test_http2_adapter_retries_error_statuses(server, http2_session):
+    response = http2_session.get(server.url + '/flaky')
+    assert response.status_code == 200
+    assert len(response.content) == 1000
+    assert server.paths == ['/flaky'] * 3
+    with pytest.raises(requests.exceptions.RetryError):
+        http2_session.get(server.url + '/broken')
+    assert server.paths.count('/broken') == 4
+
+
+def test_http2_adapter_uses_proxies_and_verify(server, http2_session):
+    response = http2_session.get('http://example.invalid/ok', proxies={'http': server.url})
+    assert response.status_code == 200
+    assert server.paths == ['http://example.invalid/ok']
+    http2_session.get(server.url + '/ok', verify=False)
+    adapter = http2_session.adapters['http://']
+    # verify may be a CA bundle path, from REQUESTS_CA_BUNDLE
+    assert sorted((verify is False, proxy) for verify, _, proxy in adapter.clients) == [(False, server.url),
+                                                                                       (True, None)]